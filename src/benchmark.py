@@ -0,0 +1,277 @@
+"""无头基准测试：在 Qt offscreen 平台下用合成负载驱动 EffectLayer。
+
+逐帧计时 tick 与把覆盖窗口 paintEvent 渲染到 QImage 的耗时，输出可在不同
+运行之间对比的 JSON。用法：
+
+    python src/benchmark.py --out bench.json
+    python src/benchmark.py --quick --compare bench.json
+    python src/benchmark.py --backend tiled --compare bench.json   # 多线程分瓦片光栅化
+    python src/benchmark.py --session recordings/session-xxx.mfxr   # 附加回放真实会话
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+# 必须在导入 PySide6 之前选择平台插件
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+import PySide6
+from PySide6 import QtCore, QtGui, QtWidgets
+
+from effects import EffectLayer
+from metrics import RollingHistogram
+from particles import SHAPE_NAMES, SHAPE_TEXT
+from session import SessionReplayer, SteppedClock, read_session
+
+# 模拟步长（毫秒），与 EffectLayer 的定时器间隔一致
+STEP_MS = 10
+EFFECT_TYPES = ('heart', 'star', 'ripple', 'confetti', 'coin')
+DENSITIES = (3, 8, 16)
+SWEEP_COUNTS = (100, 500, 1000, 2000)
+
+
+def _load_config() -> dict:
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    cfg = config.setdefault('effects', {})
+    cfg.update(enabled=True, trailEnabled=True, adaptiveQuality=False, overlayMode='virtual')
+    return config
+
+
+class Bench:
+    def __init__(self, seed: int = 1234, mode: str = 'integrate', backend: str = 'painter'):
+        self.seed = seed
+        self.mode = mode
+        self.backend = backend
+
+    def _layer(self, overrides: dict = None) -> EffectLayer:
+        config = _load_config()
+        config['effects']['renderBackend'] = self.backend
+        config['effects'].update(overrides or {})
+        config.setdefault('simulation', {}).update(fixedStep=True, stepMs=STEP_MS, seed=self.seed, mode=self.mode,
+                                                     thread=False)
+        layer = EffectLayer(config)
+        layer.last_ts = SteppedClock(STEP_MS)
+        layer.show()
+        return layer
+
+    @staticmethod
+    def _dispose(layer: EffectLayer):
+        layer.timer.stop()
+        layer.hide()
+        for w in layer.windows:
+            w.deleteLater()
+        layer.deleteLater()
+        QtWidgets.QApplication.processEvents()
+
+    def _run(self, layer: EffectLayer, frames: int, inject=None) -> dict:
+        """逐帧注入输入、tick 并整窗渲染，返回耗时与粒子数统计。"""
+        window = layer.windows[0]
+        img = QtGui.QImage(window.size(), QtGui.QImage.Format_ARGB32_Premultiplied)
+        tick_ms = RollingHistogram(frames)
+        paint_ms = RollingHistogram(frames)
+        alive = RollingHistogram(frames)
+        # 逐帧累积模拟状态摘要：粒子最终全部消失时也能比对整个过程
+        state = hashlib.sha1()
+        for frame in range(frames):
+            if inject is not None:
+                inject(layer, frame)
+            t0 = time.perf_counter()
+            layer.tick()
+            t1 = time.perf_counter()
+            img.fill(0)
+            window.render(img)
+            t2 = time.perf_counter()
+            tick_ms.add((t1 - t0) * 1000.0)
+            paint_ms.add((t2 - t1) * 1000.0)
+            alive.add(layer.particles.count)
+            state.update(layer.particles.digest().encode())
+        return {
+            'frames': frames,
+            'tickMs': tick_ms.summary(),
+            'paintMs': paint_ms.summary(),
+            'alive': alive.summary(),
+            'spawned': layer.particles.spawned,
+            'evicted': layer.budget.evicted,
+            # 同一种子、同一负载下应完全一致，可用于确认优化没有改变模拟结果
+            'stateDigest': state.hexdigest(),
+        }
+
+    # ---- 负载 ----
+    def click(self, kind: str, density: int, frames: int) -> dict:
+        layer = self._layer({'types': [kind], 'density': density})
+        cx = layer.windows[0].width() // 2
+        cy = layer.windows[0].height() // 3
+
+        def inject(layer, frame):
+            if frame == 0:
+                layer.spawn(cx, cy)
+        try:
+            return self._run(layer, frames, inject)
+        finally:
+            self._dispose(layer)
+
+    def click_storm(self, frames: int, every: int = 2) -> dict:
+        layer = self._layer({'types': list(EFFECT_TYPES), 'randomPick': True})
+        rng = np.random.default_rng(self.seed)
+        w, h = layer.windows[0].width(), layer.windows[0].height()
+
+        def inject(layer, frame):
+            if frame % every == 0:
+                layer.spawn(int(rng.integers(0, w)), int(rng.integers(0, h // 2)))
+        try:
+            return self._run(layer, frames, inject)
+        finally:
+            self._dispose(layer)
+
+    def drag(self, mode: str, frames: int, clicks_every: int = 0) -> dict:
+        layer = self._layer({'trailMode': mode, 'types': list(EFFECT_TYPES)})
+        w, h = layer.windows[0].width(), layer.windows[0].height()
+
+        def inject(layer, frame):
+            # 李萨如曲线拖拽，每帧 3 个光标采样
+            for k in range(3):
+                t = (frame * 3 + k) * STEP_MS / 3000.0
+                x = w * (0.5 + 0.4 * math.sin(1.3 * t * math.tau * 0.25))
+                y = h * (0.5 + 0.4 * math.sin(2.1 * t * math.tau * 0.25))
+                layer.spawn_trail(x, y, t)
+            if clicks_every and frame % clicks_every == 0:
+                layer.spawn(int(w * 0.5), int(h * 0.3))
+        try:
+            return self._run(layer, frames, inject)
+        finally:
+            self._dispose(layer)
+
+    def replay(self, path: str) -> dict:
+        """回放录制的真实会话：每帧先送入到期的输入记录，记录送完后再多跑 3 秒让粒子消散。"""
+        layer = self._layer()
+        _, records = read_session(path)
+        replayer = SessionReplayer(layer, records)
+        frames = int(replayer.duration * 1000 / STEP_MS) + 300
+
+        def inject(layer, frame):
+            replayer.feed_until((frame + 1) * STEP_MS / 1000.0)
+        try:
+            return self._run(layer, frames, inject)
+        finally:
+            self._dispose(layer)
+
+    def shape_sweep(self, shape: int, count: int, frames: int) -> dict:
+        """直接向粒子存储写入 count 个同形状粒子（寿命足够长、不受预算限制），测单位开销。"""
+        layer = self._layer({'renderBudget': 1e9})
+        store = layer.particles
+        rng = np.random.default_rng(self.seed)
+        w, h = layer.windows[0].width(), layer.windows[0].height()
+        colors = layer._color_ids
+        glyph = rng.choice(store.glyph_ids(['❤', '$']), count) if shape == SHAPE_TEXT else -1
+        store.emit(count, rng.uniform(0, w, count), rng.uniform(0, h * 0.3, count),
+                   rng.uniform(-60, 60, count), rng.uniform(-120, 0, count), 30.0,
+                   rng.uniform(10, 28, count), shape, rng.choice(colors, count), glyph=glyph,
+                   rotation=rng.uniform(0, 360, count), spin=rng.uniform(-180, 180, count))
+        try:
+            result = self._run(layer, frames)
+        finally:
+            self._dispose(layer)
+        result['tickUsPerParticle'] = round(result['tickMs']['mean'] * 1000.0 / count, 3)
+        result['paintUsPerParticle'] = round(result['paintMs']['mean'] * 1000.0 / count, 3)
+        return result
+
+    def run_all(self, quick: bool = False, sessions=()) -> dict:
+        frames = 60 if quick else 300
+        densities = DENSITIES[:1] if quick else DENSITIES
+        counts = SWEEP_COUNTS[:2] if quick else SWEEP_COUNTS
+        workloads = {}
+        for kind in EFFECT_TYPES:
+            for d in densities:
+                workloads[f'click-{kind}@d{d}'] = self.click(kind, d, frames)
+        workloads['click-storm'] = self.click_storm(frames)
+        workloads['drag-particles'] = self.drag('particles', frames)
+        workloads['drag-ribbon'] = self.drag('ribbon', frames)
+        workloads['mixed'] = self.drag('particles', frames, clicks_every=15)
+        for path in sessions:
+            workloads['replay:' + os.path.basename(path)] = self.replay(path)
+        sweep = {}
+        for shape, name in enumerate(SHAPE_NAMES):
+            sweep[name] = {str(n): self.shape_sweep(shape, n, max(20, frames // 10)) for n in counts}
+        screen = QtGui.QGuiApplication.primaryScreen()
+        return {
+            'meta': {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'qt': QtCore.qVersion(),
+                'pyside': PySide6.__version__,
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'qpa': QtGui.QGuiApplication.platformName(),
+                'screen': [screen.size().width(), screen.size().height()] if screen else None,
+                'stepMs': STEP_MS,
+                'seed': self.seed,
+                'mode': self.mode,
+                'backend': self.backend,
+                'quick': quick,
+            },
+            'workloads': workloads,
+            'shapeSweep': sweep,
+        }
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """逐项对比 tick/paint 耗时中位数（不受首帧建图集等预热影响），返回可打印的文本行（负数表示变快）。"""
+    lines = [f"{'workload':<28}{'tick p50':>12}{'Δ%':>8}{'paint p50':>12}{'Δ%':>8}"]
+
+    def row(name, cur, base):
+        cols = []
+        for key in ('tickMs', 'paintMs'):
+            c = cur.get(key, {}).get('p50')
+            b = base.get(key, {}).get('p50') if base else None
+            delta = f"{(c - b) / b * 100:+.1f}" if c is not None and b else '-'
+            cols.append(f"{c if c is not None else float('nan'):>12.3f}{delta:>8}")
+        lines.append(f"{name:<28}" + ''.join(cols))
+
+    for name, cur in current.get('workloads', {}).items():
+        row(name, cur, baseline.get('workloads', {}).get(name))
+    for shape, counts in current.get('shapeSweep', {}).items():
+        for n, cur in counts.items():
+            row(f'{shape}×{n}', cur, baseline.get('shapeSweep', {}).get(shape, {}).get(n))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MouseFX 无头基准测试')
+    parser.add_argument('--out', help='结果 JSON 输出路径（默认打印到标准输出）')
+    parser.add_argument('--compare', help='与之前的结果 JSON 对比')
+    parser.add_argument('--quick', action='store_true', help='缩短帧数与负载组合，用于快速检查')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--mode', choices=('integrate', 'analytic'), default='integrate',
+                        help='粒子推进方式（simulation.mode）')
+    # offscreen 平台没有 OpenGL，基准测试只比较两种 QPainter 路径
+    parser.add_argument('--backend', choices=('painter', 'tiled'), default='painter',
+                        help='渲染后端（effects.renderBackend）')
+    parser.add_argument('--session', action='append', default=[], help='附加回放录制的输入会话（可多次指定）')
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    result = Bench(args.seed, args.mode, args.backend).run_all(args.quick, args.session)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print('\n'.join(compare(result, baseline)), file=sys.stderr)
+    del app
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
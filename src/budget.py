@@ -0,0 +1,55 @@
+import numpy as np
+
+# 各形状的绘制开销（渲染单位，按 shape 编号索引）：
+# 文字需按字形分组贴图且带旋转，花朵贴图面积最大（原先为 5 个渐变花瓣），光点最廉价
+SHAPE_COST = np.array([3.0, 1.0, 2.0, 4.0, 0.5, 1.0], dtype=np.float32)
+
+
+class ParticleBudget:
+    """按渲染开销计量的粒子预算。
+
+    每个粒子按形状计入 ``SHAPE_COST`` 个渲染单位，总量超过 ``units`` 时按保留价值
+    由低到高淘汰：屏幕外的粒子最先淘汰，其次是最淡、最接近寿命终点的粒子。
+    新的点击爆发至少可获得 ``min_share`` 比例的预算，即使当前已超支，
+    也会挤掉旧粒子而不是整簇丢弃。
+    """
+
+    def __init__(self, units: float = 600.0, min_share: float = 0.15):
+        self.units = 600.0
+        self.min_share = 0.15
+        self.evicted = 0  # 累计淘汰粒子数
+        self.configure(units, min_share)
+
+    def configure(self, units: float, min_share: float):
+        self.units = max(1.0, float(units))
+        self.min_share = max(0.0, min(1.0, float(min_share)))
+
+    def used(self, store) -> float:
+        """当前存活粒子占用的渲染单位。"""
+        n = store.count
+        return float(SHAPE_COST[store.shape[:n]].sum()) if n else 0.0
+
+    def burst_allowance(self, store) -> float:
+        """新爆发可使用的渲染单位：剩余预算与保底份额取较大者。"""
+        return max(self.units - self.used(store), self.units * self.min_share)
+
+    def evict(self, store, on_screen: np.ndarray = None) -> int:
+        """超支时按保留价值由低到高淘汰粒子，返回淘汰个数。"""
+        n = store.count
+        if n == 0:
+            return 0
+        cost = SHAPE_COST[store.shape[:n]]
+        excess = float(cost.sum()) - self.units
+        if excess <= 0:
+            return 0
+        # 保留价值 = 透明度 × 剩余寿命比例；屏幕外粒子价值最低
+        value = store.opacity[:n] * (1.0 - np.minimum(store.age[:n] / store.life[:n], 1.0))
+        if on_screen is not None:
+            value = np.where(on_screen, value, -1.0)
+        order = np.argsort(value, kind='stable')
+        k = int(np.searchsorted(np.cumsum(cost[order]), excess)) + 1
+        keep = np.ones(n, dtype=bool)
+        keep[order[:k]] = False
+        store.compact(keep)
+        self.evicted += k
+        return k
@@ -1,447 +1,1308 @@
 from PySide6 import QtCore, QtGui, QtWidgets
-import random
-import math
+import time
 import logging
+import threading
+import numpy as np
+
+from particles import ParticleStore, SHAPE_TEXT, SHAPE_CIRCLE, SHAPE_FLOWER, SHAPE_TRAIL
+from input_queue import InputRingBuffer, KIND_PRESS, KIND_RELEASE, KIND_MOVE
+from trail import TrailEmitter, RibbonTrail
+from budget import ParticleBudget
+from governor import QualityGovernor
+from metrics import Metrics, HudWindow
+from tracing import traced, tracer
+from spec import compile_spec, SpecError
+from emitters import BurstKernel
+from sprites import SpriteAtlas, GlyphCache, GlyphAtlas, draw_fragments, LOD_FULL, LOD_SIMPLE, LOD_DOT
+from gl_renderer import GLOverlayWindow, opengl_available, pack_instances
+from tiles import TileRasterizer, FragmentLayer
+from frames import FrameSnapshot, FrameMailbox, SimulationWorker
 
 logger = logging.getLogger(__name__)
 
-# 粒子结构
-class Particle:
-    def __init__(self, pos: QtCore.QPointF, vel: QtCore.QPointF, life: float,
-                 color: QtGui.QColor, text: str = "", size: float = 16.0, shape: str = "text"):
-        self.pos = QtCore.QPointF(pos)
-        self.vel = QtCore.QPointF(vel)
-        self.life = life
-        self.age = 0.0
-        self.color = QtGui.QColor(color)
-        self.text = text
-        self.size = size
-        self.shape = shape  # text|circle|star|flower|trail|rect|coin
-        self.rotation = random.uniform(0, 360)
-        self.spin = random.uniform(-180, 180)
-        self.opacity = 1.0
-
-    def update(self, dt: float):
-        self.age += dt
-        t = min(self.age / self.life, 1.0)
-        # 重力与阻力
-        self.vel.setY(self.vel.y() + 300 * dt)
-        self.vel *= 0.98
-        self.pos += self.vel * dt
-        self.opacity = max(0.0, 1.0 - t)
-        self.rotation += self.spin * dt
-
-    def is_dead(self):
-        return self.age >= self.life or self.opacity <= 0.05  # 提高死亡阈值，更早清除半透明粒子
-
-
-class EffectLayer(QtWidgets.QWidget):
-    def __init__(self, config):
+class OverlayWindow(QtWidgets.QWidget):
+    """覆盖单块屏幕（或整个虚拟桌面）的透明窗口。
+
+    窗口本身不持有粒子：绘制委托给 EffectLayer，按窗口左上角把全局坐标平移到本地，
+    各窗口使用自己所在屏幕的设备像素比。
+    """
+
+    def __init__(self, layer, screen: QtGui.QScreen = None, pooled: bool = False):
         super().__init__(None, QtCore.Qt.FramelessWindowHint | QtCore.Qt.Tool | QtCore.Qt.WindowStaysOnTopHint)
         self.setAttribute(QtCore.Qt.WA_TranslucentBackground, True)
-        # 输入透明（允许鼠标穿透）
+        # 输入透明（允许鼠标穿透）；池化窗口会频繁显示，不抢占焦点
         self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents, True)
+        self.setAttribute(QtCore.Qt.WA_ShowWithoutActivating, True)
         try:
             self.setWindowFlag(QtCore.Qt.WindowTransparentForInput, True)
         except Exception:
             pass
-        # 覆盖整个虚拟桌面（包含所有显示器），避免多屏时偏移
-        self._set_virtual_geometry()
-        self.setMouseTracking(True)
+        self.layer = layer
+        # None 表示覆盖整个虚拟桌面（overlayMode = virtual）
+        self.target_screen = screen
+        # 池化小窗口的几何由 EffectLayer 按区域设置，只绘制 group 对应的粒子（None 表示全部）
+        self.pooled = pooled
+        self.group = None
+        self.sync_geometry()
+
+    def sync_geometry(self):
+        if self.pooled:
+            return
+        try:
+            if self.target_screen is not None:
+                rect = self.target_screen.geometry()
+                try:
+                    self.setScreen(self.target_screen)
+                except Exception:
+                    pass
+            else:
+                rect = EffectLayer.virtual_desktop_rect()
+            if rect is not None and rect.isValid():
+                self.setGeometry(rect)
+        except Exception:
+            # 兜底：保留现有几何
+            pass
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        try:
+            hwnd = int(self.winId())
+            logger.debug("OverlayWindow.showEvent hwnd=%s screen=%s", hwnd,
+                         self.target_screen.name() if self.target_screen is not None else '*')
+        except Exception:
+            pass
+        # 保障在显示时也按所在屏幕布局
+        self.sync_geometry()
+
+    def paintEvent(self, ev: QtGui.QPaintEvent):
+        self.layer.paint(self, ev)
+
+
+class EffectLayer(QtCore.QObject):
+    """特效层：持有共享的粒子集合与模拟定时器，并管理覆盖窗口。
+
+    粒子坐标为全局逻辑坐标。overlayMode 为 perScreen（默认）时每块屏幕一个覆盖窗口，
+    随 screenAdded/screenRemoved 创建与销毁，每个窗口只绘制与自身相交的粒子；
+    为 virtual 时沿用单个覆盖整个虚拟桌面的窗口；为 pooled 时每个爆发簇/拖拽笔画
+    从窗口池取一个贴身小窗口，区域过多或过大时回退为每屏一个整屏窗口。
+    renderBackend 为 opengl 时整屏窗口改用 GLOverlayWindow 实例化绘制（池化小窗口仍用 QPainter）；
+    为 tiled 时仍用 QPainter，但损伤区域切成瓦片由线程池并行光栅化。
+
+    模拟（输入处理、发射、推进、剔除、淘汰）每步结束后发布一份只读的 FrameSnapshot，
+    损伤区域、窗口池与绘制只读快照。simulation.thread 开启时模拟在 SimulationWorker 的专用线程中运行，
+    GUI 线程卡顿不会冻结物理，模拟负载也不会推迟绘制；配置更新与模拟步之间以 _sim_lock 互斥。
+    """
+
+    # 跨线程唤醒：非 GUI 线程调用 wake() 时经队列连接转到 GUI 线程启动定时器
+    _wake_requested = QtCore.Signal()
+
+    # 最后一个粒子消失后继续运行的宽限时间（毫秒），随后停表进入空闲
+    IDLE_GRACE_MS = 300
+
+    def __init__(self, config):
+        super().__init__()
+        # 当前在用的覆盖窗口，以及它们共同覆盖的虚拟桌面范围
+        self.windows = []
+        self._shown = False
+        # 整屏覆盖窗口（perScreen 每屏一个，virtual 仅一个；pooled 模式下作为回退）
+        self._screen_windows = []
+        # pooled 模式的窗口池：空闲窗口与 {区域键: 窗口}
+        self._pool_idle = []
+        self._pool_active = {}
+        self._pool_fallback = False
+        self._next_group = 0
+        # 当前点击爆发与拖拽笔画所属的簇编号
+        self._burst_group = 0
+        self._trail_group = self._new_group()
+        self._desktop = self.virtual_desktop_rect() or QtCore.QRect(0, 0, 1, 1)
+        # 物理 -> 逻辑坐标换算用的屏幕参数，由 GUI 线程在桌面变化时整体替换
+        self._native_screens = self._native_screen_table()
         # 初始化粒子与定时器
-        self.particles = []
+        self.particles = ParticleStore()
+        # 输入队列：监听线程只写入记录，模拟每步统一取出处理
+        self.input_queue = InputRingBuffer()
+        # 模拟发布的帧快照；_presented 为 GUI 线程已据其请求重绘的一帧，绘制只读它
+        self.frames = FrameMailbox()
+        self._presented = self.frames.latest()
+        self._present_pending = False
+        self._frame_seq = 0
+        # 模拟步与配置更新互斥（模拟线程开启时二者在不同线程）
+        self._sim_lock = threading.RLock()
+        self._worker = None
+        # 粒子随机数发生器（批量采样）；配置 simulation.seed 后每次运行结果一致
+        self._seed = self._resolve_seed(config)
+        self._rng = np.random.default_rng(self._seed)
+        # 固定步长模拟：累积实际经过的时间，按固定步长推进，绘制时在相邻两步之间插值；
+        # 解析模式则只推进时钟，由发射记录直接求出当前状态
+        self._sim_mode = None
+        self._configure_simulation(config)
+        self._accum = 0.0
+        self._alpha = 1.0
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.tick)
-        # 上一帧的损伤区域集合（使用 QRegion 以减少整屏重绘）
-        self._last_damage_region = None
+        # 上一帧粒子覆盖的损伤瓦片（本帧与上一帧取并集后只重绘这些区域）
+        self._last_damage_tiles = None
         # 文字基准字体（减少频繁构造）
         self._base_font = QtGui.QFont()
+        # 精灵图集：形状 × 颜色 × 尺寸档预渲染，仅在颜色/尺寸范围变化时重建；
+        # 不同屏幕的设备像素比可能不同，按设备像素比各保留一份
+        self._atlases = {}
+        # 文字粒子的字形缓存（符号 × 颜色 × 尺寸档），同样按 (设备像素比, 逻辑 DPI) 区分
+        self._glyph_caches = {}
+        # OpenGL 后端把字形拼成纹理图集，键同字形缓存
+        self._glyph_atlases = {}
 
-        # 配置与可见性
+        # 配置与可见性；热路径只读编译后的 spec
         self.config = config
         self.visible_effects = True
+        try:
+            spec = compile_spec(config)
+        except SpecError as e:
+            logger.error("%s\n已改用默认特效参数", e)
+            spec = compile_spec({})
+        self._apply_spec(spec)
 
-        # 轨迹节流
-        self._trail_clock = QtCore.QElapsedTimer()
-        self._trail_clock.start()
-        self._last_trail_ms = 0
-
-        # 定期清理计时器，用于处理偶发残留
+        # 空闲计时
         self._cleanup_clock = QtCore.QElapsedTimer()
         self._cleanup_clock.start()
-        self._last_cleanup_ms = 0
 
-        # 性能模式与阈值
-        self.performance_mode = config.get('effects', {}).get('performanceMode', False)
-        self.max_particles = 200 if self.performance_mode else 300
+        # 运行指标与可选的性能面板
+        self.metrics = Metrics()
+        self._hud = None
+        # 画质调节器：按实测帧耗时在档位间切换，以下各项阈值均按其 scale 缩放
+        self.governor = QualityGovernor()
+        self._configure_governor(spec)
+        # 渲染开销预算：超支时按优先级淘汰粒子，新爆发保底一定份额
+        self.budget = ParticleBudget()
+        self._base_render_budget, self._burst_min_share = spec.render_budget, spec.burst_min_share
+        self._overlay_mode = spec.overlay_mode
+        self._backend = self._resolve_backend(spec)
+        # tiled 后端的瓦片光栅化线程池
+        self._rasterizer = TileRasterizer()
+        self._configure_raster(spec)
+        # pooled 模式参数：活动区域数超过池大小，或区域总面积超过虚拟桌面面积的该比例时回退为整屏窗口
+        self._pool_limits = spec.overlay_pool
+        # 细节层级阈值
+        self._base_lod = spec.lod
+        # 轨迹发射器：按空间间距沿插值路径放置光点，每帧按预算发射
+        self._trail = TrailEmitter()
+        # 丝带模式：拖拽点存入环形缓冲，整条轨迹一次填充
+        self._ribbon = RibbonTrail()
+        self._configure_trail(spec)
+        self._apply_quality()
 
         # 根据性能模式设置刷新间隔（10ms更流畅，33ms更省资源）
         self.last_ts = QtCore.QElapsedTimer()
         self.last_ts.start()
-        # 使用高精度定时器与固定 10ms 刷新，优先保证帧率稳定
+        # 使用高精度定时器与固定 10ms 刷新，优先保证帧率稳定；
+        # 定时器只在有粒子时运行，空闲时完全停止，由 spawn/spawn_trail/wake 重新唤醒
         try:
             self.timer.setTimerType(QtCore.Qt.PreciseTimer)
         except Exception:
             pass
-        self.timer.start(10)
+        self.timer.setInterval(10)
+        self._idle_since_ms = -1
+        self._wake_requested.connect(self._start_timer, QtCore.Qt.QueuedConnection)
 
-    def showEvent(self, event):
-        super().showEvent(event)
-        try:
-            hwnd = int(self.winId())
-            logger.debug("EffectLayer.showEvent hwnd=%s", hwnd)
-        except Exception:
-            pass
-        # 保障在显示时也按虚拟桌面布局
-        self._set_virtual_geometry()
+        # 屏幕热插拔与分辨率/缩放变化时重建或调整覆盖窗口
+        app = QtGui.QGuiApplication.instance()
+        if app is not None:
+            app.screenAdded.connect(self._on_screen_added)
+            app.screenRemoved.connect(self._on_screen_removed)
+            for screen in QtGui.QGuiApplication.screens():
+                self._watch_screen(screen)
+        self._rebuild_windows()
+        self._configure_worker()
+
+    # ---- 覆盖窗口管理 ----
+    @staticmethod
+    def virtual_desktop_rect():
+        """所有屏幕逻辑几何的外接矩形；没有屏幕时返回 None。"""
+        rect = None
+        for s in QtGui.QGuiApplication.screens():
+            r = s.geometry()
+            rect = r if rect is None else rect.united(r)
+        return rect
+
+    def _resolve_backend(self, spec) -> str:
+        """renderBackend：painter（QPainter 光栅化，默认）| tiled（多线程分瓦片光栅化）| opengl（实例化绘制）。
+
+        OpenGL 不可用（无法创建上下文或版本过低）时回退为 painter。
+        """
+        backend = spec.render_backend
+        if backend == 'opengl' and not opengl_available():
+            logger.warning("OpenGL unavailable, falling back to painter backend")
+            return 'painter'
+        return backend
+
+    def _configure_raster(self, spec):
+        """tiled 后端参数：rasterThreads（0 表示按 CPU 核数）与瓦片边长 rasterTileSize。"""
+        self._rasterizer.configure(*spec.raster)
+
+    def _new_screen_window(self, screen: QtGui.QScreen = None):
+        """按渲染后端创建整屏覆盖窗口。"""
+        if self._backend == 'opengl':
+            w = GLOverlayWindow(self, screen)
+            w.failed.connect(self._on_gl_failed)
+            return w
+        return OverlayWindow(self, screen)
+
+    def _on_gl_failed(self):
+        """GL 窗口初始化失败（着色器编译等）：整体改用 QPainter 窗口。"""
+        if self._backend != 'opengl':
+            return
+        self._backend = 'painter'
+        self._rebuild_windows()
+
+    def _rebuild_windows(self):
+        """按当前 overlayMode 与屏幕列表重建覆盖窗口。"""
+        for w in self._screen_windows + self._pool_idle + list(self._pool_active.values()):
+            w.hide()
+            w.deleteLater()
+        self._pool_idle = []
+        self._pool_active = {}
+        self._pool_fallback = False
+        if self._overlay_mode == 'virtual':
+            self._screen_windows = [self._new_screen_window()]
+        else:
+            self._screen_windows = [self._new_screen_window(s) for s in QtGui.QGuiApplication.screens()]
+        self._refresh_window_list()
+        self._on_desktop_changed()
+        if self._shown:
+            for w in self.windows:
+                w.show()
+
+    def _screen_windows_active(self) -> bool:
+        """整屏覆盖窗口是否在用：非 pooled 模式，或 pooled 模式已回退。"""
+        return self._overlay_mode != 'pooled' or self._pool_fallback
+
+    def _refresh_window_list(self):
+        self.windows = list(self._screen_windows) if self._screen_windows_active() else list(self._pool_active.values())
+
+    def _watch_screen(self, screen: QtGui.QScreen):
+        screen.geometryChanged.connect(self._on_screen_geometry_changed)
+        screen.physicalDotsPerInchChanged.connect(self._on_screen_geometry_changed)
+
+    def _on_screen_added(self, screen: QtGui.QScreen):
+        logger.debug("EffectLayer: screen added %s", screen.name())
+        self._watch_screen(screen)
+        if self._overlay_mode == 'virtual':
+            self._on_screen_geometry_changed()
+            return
+        w = self._new_screen_window(screen)
+        self._screen_windows.append(w)
+        self._refresh_window_list()
+        if self._shown and self._screen_windows_active():
+            w.show()
+        self._on_desktop_changed()
+
+    def _on_screen_removed(self, screen: QtGui.QScreen):
+        logger.debug("EffectLayer: screen removed %s", screen.name())
+        if self._overlay_mode == 'virtual':
+            self._on_screen_geometry_changed()
+            return
+        for w in [w for w in self._screen_windows if w.target_screen is screen]:
+            self._screen_windows.remove(w)
+            w.hide()
+            w.deleteLater()
+        self._refresh_window_list()
+        self._on_desktop_changed()
+
+    def _on_screen_geometry_changed(self, *args):
+        for w in self._screen_windows:
+            w.sync_geometry()
+        self._on_desktop_changed()
+
+    def _on_desktop_changed(self):
+        self._desktop = self.virtual_desktop_rect() or QtCore.QRect(0, 0, 1, 1)
+        # 各屏幕的 (x0, y0, x1, y1)，用于判断粒子是否落在屏幕之间的空隙中
+        self._screen_rects = np.array([(g.x(), g.y(), g.x() + g.width(), g.y() + g.height())
+                                       for g in (s.geometry() for s in QtGui.QGuiApplication.screens())],
+                                      dtype=np.float32).reshape(-1, 4)
+        self._native_screens = self._native_screen_table()
+        # 设备像素比可能随之变化：精灵图集按设备像素比分别缓存，字形缓存在下次绘制时按需重建
+        self._glyph_caches.clear()
+        self._glyph_atlases.clear()
+        self._repaint_all()
+
+    # ---- pooled 模式：每个活动区域一个贴身小窗口 ----
+    # 丝带轨迹所占区域的键（爆发簇与笔画的编号均为正数）
+    RIBBON_GROUP = -1
+
+    def _new_group(self) -> int:
+        self._next_group += 1
+        return self._next_group
+
+    def _active_regions(self, frame: FrameSnapshot) -> dict:
+        """按爆发簇/拖拽笔画求包围盒，对齐到损伤瓦片后返回 {键: 全局 QRect}。"""
+        boxes = []
+        keys = []
+        if frame.count:
+            x0, y0, x1, y1 = frame.x0, frame.y0, frame.x1, frame.y1
+            ids, inv = np.unique(frame.group, return_inverse=True)
+            gx0 = np.full(ids.size, np.inf)
+            gy0 = np.full(ids.size, np.inf)
+            gx1 = np.full(ids.size, -np.inf)
+            gy1 = np.full(ids.size, -np.inf)
+            np.minimum.at(gx0, inv, x0)
+            np.minimum.at(gy0, inv, y0)
+            np.maximum.at(gx1, inv, x1)
+            np.maximum.at(gy1, inv, y1)
+            boxes.append((gx0, gy0, gx1, gy1))
+            keys.extend(ids.tolist())
+        if frame.ribbon_bounds is not None:
+            rx0, ry0, rx1, ry1 = frame.ribbon_bounds
+            boxes.append(([rx0.min()], [ry0.min()], [rx1.max()], [ry1.max()]))
+            keys.append(self.RIBBON_GROUP)
+        if not boxes:
+            return {}
+        x0, y0, x1, y1 = (np.concatenate(c) for c in zip(*boxes))
+        # 向外对齐到瓦片网格并裁剪到虚拟桌面，区域小幅变化时窗口几何保持不变
+        tile = self.DAMAGE_TILE
+        desk = self._desktop
+        ox, oy = desk.x(), desk.y()
+        left = np.maximum(np.floor((x0 - ox) / tile) * tile, 0).astype(np.int64) + ox
+        top = np.maximum(np.floor((y0 - oy) / tile) * tile, 0).astype(np.int64) + oy
+        right = np.minimum(np.ceil((x1 - ox) / tile) * tile, desk.width()).astype(np.int64) + ox
+        bottom = np.minimum(np.ceil((y1 - oy) / tile) * tile, desk.height()).astype(np.int64) + oy
+        regions = {}
+        for key, l, t, r, b in zip(keys, left.tolist(), top.tolist(), right.tolist(), bottom.tolist()):
+            if r > l and b > t:
+                regions[key] = QtCore.QRect(l, t, r - l, b - t)
+        return regions
+
+    def _sync_pool(self, frame: FrameSnapshot):
+        """pooled 模式下按活动区域分配、移动与回收小窗口；区域过多或过大时回退为整屏覆盖。"""
+        if self._overlay_mode != 'pooled':
+            return
+        regions = self._active_regions(frame)
+        pool_size, max_area = self._pool_limits
+        desk = self._desktop
+        area = sum(r.width() * r.height() for r in regions.values())
+        limit = max_area * desk.width() * desk.height()
+        if self._pool_fallback:
+            # 回退后需降到阈值一半以下才切回小窗口，避免在阈值附近来回切换
+            fallback = len(regions) > pool_size or area > limit * 0.5
+        else:
+            fallback = len(regions) > pool_size or area > limit
+        if fallback != self._pool_fallback:
+            logger.debug("EffectLayer: pooled overlay fallback=%s regions=%d", fallback, len(regions))
+            self._pool_fallback = fallback
+            for key in list(self._pool_active):
+                self._release_pool_window(key)
+            for w in self._screen_windows:
+                if fallback and self._shown:
+                    w.show()
+                else:
+                    w.hide()
+            self._repaint_all()
+        if not fallback:
+            for key in [k for k in self._pool_active if k not in regions]:
+                self._release_pool_window(key)
+            for key, rect in regions.items():
+                w = self._pool_active.get(key)
+                if w is None:
+                    w = self._acquire_pool_window(key)
+                if w.geometry() != rect:
+                    w.setGeometry(rect)
+                    w.update()
+                if self._shown and not w.isVisible():
+                    w.show()
+        self._refresh_window_list()
+
+    def _acquire_pool_window(self, key: int) -> OverlayWindow:
+        w = self._pool_idle.pop() if self._pool_idle else OverlayWindow(self, pooled=True)
+        w.group = key
+        self._pool_active[key] = w
+        return w
+
+    def _release_pool_window(self, key: int):
+        """粒子消失后隐藏窗口并放回池中复用。"""
+        w = self._pool_active.pop(key)
+        w.hide()
+        w.group = None
+        self._pool_idle.append(w)
+
+    def _update_windows(self, region: QtGui.QRegion = None):
+        """请求重绘：region 为全局坐标的损伤区域，None 表示全部窗口整窗重绘。
+
+        与损伤区域不相交的窗口不会收到重绘请求。
+        """
+        for w in self.windows:
+            if region is None:
+                w.update()
+                continue
+            geo = w.geometry()
+            local = region.intersected(geo)
+            if not local.isEmpty():
+                w.update(local.translated(-geo.x(), -geo.y()))
+
+    def show(self):
+        self._shown = True
+        for w in self.windows:
+            w.show()
+
+    def hide(self):
+        self._shown = False
+        for w in self.windows:
+            w.hide()
 
     def toggle(self):
         self.visible_effects = not self.visible_effects
+        # 可见性变化时整窗重绘一次，确保隐藏后不留残影
+        self._repaint_all()
         
     def update_config(self, config):
-        """更新配置并应用性能模式"""
-        self.config = config
-        self.performance_mode = config.get('effects', {}).get('performanceMode', False)
-        self.max_particles = 200 if self.performance_mode else 300
+        """更新配置并重置画质调节；特效配置无效时抛出 SpecError，当前参数保持不变。"""
+        spec = compile_spec(config)
+        with self._sim_lock:
+            self.config = config
+            seed = self._resolve_seed(config)
+            if seed != self._seed:
+                self._seed = seed
+                self._rng = np.random.default_rng(seed)
+            self._apply_spec(spec)
+            self._configure_governor(spec)
+            self._base_render_budget, self._burst_min_share = spec.render_budget, spec.burst_min_share
+            self._base_lod = spec.lod
+            self._configure_trail(spec)
+            self._configure_simulation(config)
+            self._apply_quality()
+        self._configure_raster(spec)
+        self._configure_worker()
+        # 精灵图集只在颜色或尺寸范围变化时由 ensure 重建
+        self._glyph_caches.clear()
+        self._glyph_atlases.clear()
         # 保持 10ms 刷新，确保视觉平滑
         try:
             self.timer.setTimerType(QtCore.Qt.PreciseTimer)
         except Exception:
             pass
         self.timer.setInterval(10)
-        # 屏幕可能变化，刷新覆盖区域
-        self._set_virtual_geometry()
+        # 覆盖模式或渲染后端变化时重建窗口，否则只按屏幕可能的变化刷新覆盖区域
+        self._pool_limits = spec.overlay_pool
+        mode = spec.overlay_mode
+        backend = self._resolve_backend(spec)
+        if mode != self._overlay_mode or backend != self._backend:
+            self._overlay_mode = mode
+            self._backend = backend
+            self._rebuild_windows()
+        else:
+            self._on_screen_geometry_changed()
 
-    def _global_to_local(self, x: int, y: int) -> QtCore.QPointF:
-        pt = self.mapFromGlobal(QtCore.QPoint(int(x), int(y)))
-        return QtCore.QPointF(pt)
+    def metrics_snapshot(self) -> dict:
+        """汇总滚动直方图与各模块的累计计数，供性能面板与快照文件使用。"""
+        return self.metrics.snapshot({
+            'spawned': self.particles.spawned,
+            'evicted': self.budget.evicted,
+            'input': self.input_queue.stats(),
+            'qualityLevel': self.governor.level,
+            'frameCostMs': round(self.governor.cost_ms, 3),
+            'renderBudget': round(self.budget.units, 1),
+            'overlayWindows': len(self.windows),
+            'renderBackend': self._backend,
+            'rasterThreads': self._rasterizer.threads,
+            'idle': self.is_idle(),
+            'simulationThread': self._worker is not None,
+        })
 
-    def _set_virtual_geometry(self):
-        try:
-            screens = QtGui.QGuiApplication.screens()
-            if not screens:
-                return
-            rect = None
-            for s in screens:
-                r = s.geometry()
-                rect = r if rect is None else rect.united(r)
-            if rect is not None:
-                # 将窗口放到虚拟桌面原点并设置覆盖范围
-                self.setGeometry(rect)
-        except Exception:
-            # 兜底：保留现有几何
-            pass
+    def toggle_hud(self):
+        """显示/隐藏性能面板（独立的小窗口，不参与粒子损伤重绘）。"""
+        if self._hud is None:
+            self._hud = HudWindow(self.metrics_snapshot)
+        self._hud.setVisible(not self._hud.isVisible())
 
-    def spawn(self, x: int, y: int):
-        # 性能优化：如果粒子过多，跳过新的特效
-        if len(self.particles) > self.max_particles:
+    def wake(self):
+        """唤醒模拟与绘制循环；可从任意线程调用。"""
+        if self._worker is not None:
+            self._worker.wake()
             return
-            
-        if not self.visible_effects or not self.config['effects']['enabled']:
+        if self.timer.isActive():
             return
-        cfg = self.config['effects']
-        # 基于配置的密度；在性能模式下做进一步限制
-        density = int(cfg.get('density', 6))
-        if self.performance_mode:
-            density = min(density, 4)
+        if QtCore.QThread.currentThread() == self.thread():
+            self._start_timer()
         else:
-            density = min(density, 24)  # 给流畅模式更高上限
-        duration = float(cfg.get('duration', 1.6))
-        colors = [QtGui.QColor(c) for c in cfg.get('colors', ['#FF5252'])]
-        size_min, size_max = cfg.get('sizeRange', [14, 28])
-        speed_min, speed_max = cfg.get('speedRange', [150, 420])
-        types = cfg.get('types', ['heart'])
-
-        picked = [random.choice(types)] if cfg.get('randomPick', True) else types
-        for t in picked:
-            if t == 'heart':
-                self._spawn_text_burst(x, y, '❤', density, duration, colors, size_min, size_max, speed_min, speed_max)
-            elif t == 'star':
-                self._spawn_star(x, y, density, duration, colors, size_min, size_max, speed_min, speed_max)
-            elif t == 'ripple':
-                self._spawn_flower(x, y, max(4, int(density)), duration, colors, size_min, size_max, speed_min, speed_max)
-            elif t == 'confetti':
-                self._spawn_confetti(x, y, int(density * 1.5), duration, colors, size_min, size_max, speed_min, speed_max)
-            elif t == 'coin':
-                self._spawn_coin(x, y, max(4, int(density)), duration, colors, size_min, size_max, speed_min, speed_max)
-
-    def spawn_trail(self, x: int, y: int):
-        """左键长按滑动的固定轨迹特效。"""
-        # 性能优化：如果粒子过多，跳过轨迹特效
-        if len(self.particles) > self.max_particles * 0.8:  # 80%时开始限制轨迹
+            self._wake_requested.emit()
+
+    def is_idle(self) -> bool:
+        if self._worker is not None:
+            return not self._worker.running
+        return not self.timer.isActive()
+
+    def has_pending_work(self) -> bool:
+        """还有粒子、丝带或未处理的输入。"""
+        return bool(self.particles or self._ribbon or len(self.input_queue))
+
+    def resume_clock(self):
+        """重置帧间计时与步长累积，避免空闲时长被当作一帧的 dt。"""
+        self.last_ts.restart()
+        self._accum = 0.0
+
+    def _start_timer(self):
+        if self.timer.isActive() or self._worker is not None:
+            return
+        self.resume_clock()
+        self.timer.start()
+        logger.debug("EffectLayer: timer resumed")
+
+    def _configure_worker(self):
+        """按 simulation.thread 启停模拟线程；关闭时回到 GUI 线程定时器驱动。"""
+        if self._threaded and self._worker is None:
+            self.timer.stop()
+            self._worker = SimulationWorker(self, self.timer.interval())
+            self._worker.frame_ready.connect(self._present, QtCore.Qt.QueuedConnection)
+            self._worker.start()
+            logger.debug("EffectLayer: simulation thread started")
+        elif not self._threaded and self._worker is not None:
+            self._worker.shutdown()
+            self._worker = None
+            logger.debug("EffectLayer: simulation thread stopped")
+            if self.has_pending_work():
+                self._start_timer()
+
+    def shutdown(self):
+        """退出前停止模拟线程与定时器。"""
+        self.timer.stop()
+        if self._worker is not None:
+            self._worker.shutdown()
+            self._worker = None
+
+    def submit_input(self, records):
+        """从 GUI 线程提交输入记录（会话回放）：模拟线程开启时经输入队列转交，否则直接处理。"""
+        if self._worker is None:
+            self.apply_input(records)
             return
-            
-        if not self.visible_effects or not self.config['effects'].get('enabled', True):
+        for t, x, y, kind in records:
+            self.input_queue.push(t, x, y, kind)
+        self.wake()
+
+    def _enter_idle_if_done(self):
+        """粒子清空且残影已擦除，超过宽限时间后停表。"""
+        if self.particles or self._ribbon:
+            self._idle_since_ms = -1
             return
-        cfg = self.config.get('effects', {})
-        if not cfg.get('trailEnabled', True):
+        now = self._cleanup_clock.elapsed()
+        if self._idle_since_ms < 0:
+            self._idle_since_ms = now
             return
-        # 读取参数
-        min_interval = int(cfg.get('trailMinIntervalMs', 18))
-        # 性能模式下增加间隔
-        if self.performance_mode:
-            min_interval = max(min_interval, 40)
-            
-        now = self._trail_clock.elapsed()
-        if (now - self._last_trail_ms) < max(1, min_interval):
+        if now - self._idle_since_ms >= self.IDLE_GRACE_MS and not self._last_damage_tiles.any():
+            self.timer.stop()
+            self._idle_since_ms = -1
+            # 停表后再检查一次输入队列：监听线程可能恰好在停表前写入并看到定时器仍在运行
+            if len(self.input_queue):
+                self._start_timer()
+                return
+            logger.debug("EffectLayer: idle, timer stopped")
+
+    def _apply_spec(self, spec):
+        """切换到新的特效参数，并把选用的发射定义编译为批量发射核（含爆发模板库）。"""
+        self.spec = spec
+        self._kernel = BurstKernel(spec, self.particles, self._rng)
+        self._color_ids = self._kernel.color_ids
+
+    @staticmethod
+    def _resolve_seed(config):
+        seed = config.get('simulation', {}).get('seed')
+        try:
+            return None if seed is None else int(seed)
+        except (TypeError, ValueError):
+            return None
+
+    def reseed(self, seed=None):
+        """重新设定随机数种子（回放/基准测试在同一特效层上多次运行时使用）。"""
+        with self._sim_lock:
+            self._seed = seed
+            self._rng = np.random.default_rng(seed)
+            # 爆发模板由随机数生成，换种子后一并重建，保证同一种子的结果一致
+            self._apply_spec(self.spec)
+
+    def _configure_simulation(self, config):
+        """mode 为 integrate（逐步积分）或 analytic（闭式解求值）。
+
+        integrate 模式下 fixedStep 开启时按 stepMs 固定步长推进，单帧最多补 maxStepsPerFrame 步；
+        analytic 模式每帧只推进时钟，单帧最多前进 stepMs × maxStepsPerFrame。
+        thread 开启时模拟在专用线程中运行。
+        """
+        cfg = config.get('simulation', {})
+        try:
+            step_ms = float(cfg.get('stepMs', 10))
+            max_steps = int(cfg.get('maxStepsPerFrame', 5))
+        except (TypeError, ValueError):
+            step_ms, max_steps = 10.0, 5
+        self._fixed_step = bool(cfg.get('fixedStep', True))
+        self._threaded = bool(cfg.get('thread', False))
+        self._step = max(0.001, step_ms / 1000.0)
+        self._max_steps = max(1, max_steps)
+        mode = str(cfg.get('mode', 'integrate'))
+        if mode not in ('integrate', 'analytic'):
+            logger.warning("unknown simulation.mode %r, falling back to integrate", mode)
+            mode = 'integrate'
+        # 两种模式对列的解释不同（积分模式会改写速度），切换时清空现有粒子
+        if self._sim_mode is not None and mode != self._sim_mode:
+            self.particles.clear()
+        self._sim_mode = mode
+
+    def _configure_governor(self, spec):
+        """按帧预算、自适应开关与起始档位重置画质调节器。"""
+        self.governor.configure(spec.frame_budget_ms, spec.adaptive_quality, spec.start_level)
+
+    def _apply_quality(self):
+        """按画质档位换算渲染预算、发射速率与细节层级阈值。"""
+        scale = self.governor.scale
+        self.budget.configure(self._base_render_budget * scale, self._burst_min_share)
+        self._trail_budget = max(1, int(self._base_trail_budget * scale))
+        # 档位越低，越早降级为简化形状/圆点（透明度阈值不超过 1）
+        bias = 2.0 - scale
+        simple_size, simple_opacity, dot_size, dot_opacity = self._base_lod
+        self._lod = (simple_size * bias, min(1.0, simple_opacity * bias),
+                     dot_size * bias, min(1.0, dot_opacity * bias))
+
+    def _configure_trail(self, spec):
+        self._trail.configure(spec.trail_spacing, spec.trail_interpolation)
+        # 满画质下每帧最多发射的轨迹点数，实际预算由画质档位缩放
+        self._base_trail_budget = spec.trail_frame_budget
+        # 轨迹样式：particles（逐个光点粒子）| ribbon（丝带）
+        self._trail_mode = spec.trail_mode
+        self._trail_life = spec.trail_life
+        self._ribbon_width = spec.ribbon_width
+        self._ribbon_sparkles = spec.ribbon_sparkles
+        self._ribbon_colors = list(spec.colors)
+        if self._trail_mode != 'ribbon':
+            self._ribbon.clear()
+
+    def _lod_tiers(self, size: np.ndarray, opacity: np.ndarray) -> np.ndarray:
+        """按当前尺寸与透明度为每个粒子选择细节层级。"""
+        simple_size, simple_opacity, dot_size, dot_opacity = self._lod
+        tier = np.full(size.shape, LOD_FULL, dtype=np.int8)
+        tier[(size < simple_size) | (opacity < simple_opacity)] = LOD_SIMPLE
+        tier[(size < dot_size) | (opacity < dot_opacity)] = LOD_DOT
+        return tier
+
+    @staticmethod
+    def _native_screen_table() -> tuple:
+        """各屏幕的 (x, y, 物理宽, 物理高, 设备像素比)；只能在 GUI 线程调用。"""
+        screens = []
+        for s in QtGui.QGuiApplication.screens():
+            g = s.geometry()
+            dpr = s.devicePixelRatio() or 1.0
+            screens.append((g.x(), g.y(), g.width() * dpr, g.height() * dpr, dpr))
+        return tuple(screens)
+
+    def _native_to_logical_mapper(self):
+        """返回把 pynput 物理像素坐标换算为 Qt 逻辑坐标的函数。
+
+        Qt 6 中各屏幕逻辑几何的左上角与物理坐标一致，屏内偏移按该屏的设备像素比缩放。
+        模拟线程也会调用，因此只读 GUI 线程发布的屏幕参数元组，不访问 QScreen。
+        """
+        screens = self._native_screens
+        if not screens:
+            return lambda x, y: (x, y)
+
+        def mapper(x, y):
+            for sx, sy, sw, sh, dpr in screens:
+                if sx <= x < sx + sw and sy <= y < sy + sh:
+                    return sx + (x - sx) / dpr, sy + (y - sy) / dpr
+            sx, sy, _, _, dpr = screens[0]
+            return sx + (x - sx) / dpr, sy + (y - sy) / dpr
+        return mapper
+
+    @traced('drain_input')
+    def _drain_input(self):
+        """取出监听线程写入的全部输入记录并生成特效（在推进模拟的线程中执行）。"""
+        records = self.input_queue.drain()
+        if records:
+            self.apply_input(records)
+
+    def apply_input(self, records):
+        """按顺序处理 (时间戳, 物理 x, 物理 y, 类型) 记录：按下触发点击特效，移动追加轨迹。
+
+        输入队列与会话回放共用此入口。
+        """
+        to_logical = self._native_to_logical_mapper()
+        for t, x, y, kind in records:
+            lx, ly = to_logical(x, y)
+            if kind == KIND_PRESS:
+                self._end_stroke()
+                self.spawn(int(lx), int(ly))
+            elif kind == KIND_MOVE:
+                self.spawn_trail(lx, ly, t)
+            elif kind == KIND_RELEASE:
+                self._end_stroke()
+
+    def _end_stroke(self):
+        """结束当前拖拽笔画：下一次拖拽的轨迹不与本次相连。"""
+        self._trail.reset()
+        self._ribbon.break_stroke()
+        self._trail_group = self._new_group()
+
+    @traced('spawn')
+    def spawn(self, x: int, y: int):
+        spec = self.spec
+        if not self.visible_effects or not spec.enabled or not spec.emitters:
             return
-        self._last_trail_ms = now
-        colors = [QtGui.QColor(c) for c in cfg.get('colors', ['#FF5252', '#FFC107', '#40C4FF'])]
-        base_trail_density = int(cfg.get('trailDensity', 2))
-        if self.performance_mode:
-            density = max(1, min(base_trail_density, 2))
+        # 基于配置的密度，按画质档位缩放
+        density = max(1, int(round(spec.density * self.governor.scale)))
+
+        self.wake()
+        # 同一次点击的所有粒子归为一簇；预算已满时仍保底一定份额，多出的部分在 tick 中挤掉旧粒子
+        self._burst_group = self._new_group()
+        allowance = self.budget.burst_allowance(self.particles)
+        kernel = self._kernel
+        if spec.random_pick:
+            picked = self._rng.integers(kernel.size, size=1)
         else:
-            density = max(1, min(base_trail_density, 6))
-            
-        life = float(cfg.get('trailLife', 0.5))
-        size_min, size_max = cfg.get('trailSizeRange', [5, 10])
-        flower_chance = float(cfg.get('trailFlowerChance', 0.15))  # 降低花瓣概率
-        flower_size_min, flower_size_max = cfg.get('trailFlowerSizeRange', [8, 14])
-        pos = self._global_to_local(x, y)
-        # 小光点
-        for _ in range(max(1, density)):
-            c = random.choice(colors)
-            size = random.uniform(size_min, size_max)
-            jitter = QtCore.QPointF(random.uniform(-3, 3), random.uniform(-3, 3))
-            p = Particle(pos + jitter, QtCore.QPointF(0, 0), life, c, text='', size=size, shape='trail')
-            p.opacity = 0.85
-            self.particles.append(p)
+            picked = np.arange(kernel.size)
+        counts = kernel.counts(picked, density, allowance)
+        kernel.emit(self.particles, self._rng, x, y, picked, counts, self._burst_group)
+
+    @traced('spawn_trail')
+    def spawn_trail(self, x, y, t: float = None):
+        """左键长按滑动的轨迹特效：记录光标采样，实际发射在每帧 tick 中按空间间距进行。"""
+        if not self.visible_effects or not self.spec.enabled or not self.spec.trail_enabled:
+            return
+        self._trail.add_point(float(x), float(y), time.perf_counter() if t is None else t)
+        self.wake()
+
+    @traced('emit_trail')
+    def _emit_trail(self):
+        """按帧预算取出轨迹发射点，批量生成光点与偶发的小花瓣。"""
+        pts = self._trail.take(self._trail_budget)
+        if not len(pts):
+            return
+        # 丝带只写入环形缓冲，不占用粒子上限
+        if self._trail_mode == 'ribbon':
+            self._ribbon.push(pts)
+            if not self._ribbon_sparkles:
+                return
+        # 性能优化：渲染预算用到 80% 时暂停轨迹光点，把余量留给点击爆发
+        if self.budget.used(self.particles) > self.budget.units * 0.8:
+            return
+        spec = self.spec
+        density = max(1, int(round(spec.trail_density * self.governor.scale)))
+        life = spec.trail_life
+        size_min, size_max = spec.trail_size_range
+        flower_size_min, flower_size_max = spec.trail_flower_size_range
+        xs = pts[:, 0]
+        ys = pts[:, 1]
+        store = self.particles
+        rng = self._rng
+        color_ids = self._color_ids
+        # 小光点：每个发射点 density 个，带轻微抖动（丝带模式下由丝带代替）
+        if self._trail_mode != 'ribbon':
+            n = len(pts) * density
+            store.emit(n, np.repeat(xs, density) + rng.uniform(-3, 3, n), np.repeat(ys, density) + rng.uniform(-3, 3, n),
+                       0.0, 0.0, life, rng.uniform(size_min, size_max, n), SHAPE_TRAIL,
+                       rng.choice(color_ids, n), opacity=0.85,
+                       rotation=rng.uniform(0, 360, n), spin=rng.uniform(-180, 180, n), group=self._trail_group)
         # 偶尔小花瓣
-        if random.random() < max(0.0, min(1.0, flower_chance)):
-            c = random.choice(colors)
-            size = random.uniform(flower_size_min, flower_size_max)
-            vel = QtCore.QPointF(random.uniform(-20, 20), random.uniform(-10, -30))
-            p = Particle(pos, vel, 0.8, c, text='', size=size, shape='flower')
-            p.opacity = 0.9
-            self.particles.append(p)
-
-    def _rand_vel(self, speed_min, speed_max):
-        ang = random.uniform(0, math.tau)
-        spd = random.uniform(speed_min, speed_max)
-        return QtCore.QPointF(math.cos(ang) * spd, math.sin(ang) * spd - spd * 0.2)
-
-    def _spawn_text_burst(self, x, y, text, count, life, colors, size_min, size_max, speed_min, speed_max):
-        for _ in range(int(count)):
-            vel = self._rand_vel(speed_min, speed_max)
-            size = random.uniform(size_min, size_max)
-            color = random.choice(colors)
-            pos = self._global_to_local(x, y)
-            self.particles.append(Particle(pos, vel, life, color, text=text, size=size, shape='text'))
-
-    def _spawn_star(self, x, y, count, life, colors, size_min, size_max, speed_min, speed_max):
-        for _ in range(int(count)):
-            vel = self._rand_vel(speed_min, speed_max)
-            size = random.uniform(size_min, size_max)
-            color = random.choice(colors)
-            pos = self._global_to_local(x, y)
-            p = Particle(pos, vel, life, color, text='', size=size, shape='star')
-            self.particles.append(p)
-
-
-    def _spawn_flower(self, x, y, count, life, colors, size_min, size_max, speed_min, speed_max):
-        for _ in range(int(count)):
-            vel = self._rand_vel(speed_min * 0.6, speed_max * 0.9)
-            size = random.uniform(size_min * 1.1, size_max * 1.6)
-            color = random.choice(colors)
-            pos = self._global_to_local(x, y)
-            p = Particle(pos, vel, life * 1.1, color, text='', size=size, shape='flower')
-            p.opacity = 0.9
-            self.particles.append(p)
-
-    def _spawn_confetti(self, x, y, count, life, colors, size_min, size_max, speed_min, speed_max):
-        for _ in range(int(count)):
-            vel = self._rand_vel(speed_min, speed_max * 1.2)
-            size = random.uniform(size_min * 0.8, size_max * 1.2)
-            color = random.choice(colors)
-            pos = self._global_to_local(x, y)
-            p = Particle(pos, vel, life * 1.1, color, text='', size=size, shape='rect')
-            self.particles.append(p)
-
-    def _spawn_coin(self, x, y, count, life, colors, size_min, size_max, speed_min, speed_max):
-        # 钱币，支持多种货币符号
-        symbols = ['￥', '$', '€', '£']
-        for _ in range(int(count)):
-            vel = self._rand_vel(speed_min * 0.7, speed_max * 0.9)
-            size = random.uniform(size_min * 1.1, size_max * 1.6)
-            symbol = random.choice(symbols)
-            color = random.choice(colors)
-            pos = self._global_to_local(x, y)
-            p = Particle(pos, vel, life * 1.2, color, text=symbol, size=size, shape='text')
-            # 动态属性
-            p.opacity = 0.95
-            p.spin = random.uniform(-120, 120)  # coin 旋转稍慢，显得更有分量
-            self.particles.append(p)
+        flowers = np.flatnonzero(rng.random(len(pts)) < spec.trail_flower_chance)
+        k = flowers.size
+        if k:
+            store.emit(k, xs[flowers], ys[flowers], rng.uniform(-20, 20, k), rng.uniform(-30, -10, k),
+                       0.8, rng.uniform(flower_size_min, flower_size_max, k), SHAPE_FLOWER,
+                       rng.choice(color_ids, k), opacity=0.9,
+                       rotation=rng.uniform(0, 360, k), spin=rng.uniform(-180, 180, k), group=self._trail_group)
 
+    @traced('tick')
     def tick(self):
+        """单线程模式的一帧：推进模拟并立即在 GUI 线程呈现（基准测试与会话回放也直接调用）。"""
+        self.step_simulation()
+        self._present()
+        self._enter_idle_if_done()
+
+    @traced('simulate')
+    def step_simulation(self):
+        """推进一帧模拟并发布快照；单线程模式在 GUI 线程、模拟线程开启时在模拟线程调用。"""
+        with self._sim_lock:
+            self._simulate()
+
+    def _simulate(self):
+        started = time.perf_counter()
         now = self.last_ts.elapsed() / 1000.0
         self.last_ts.restart()
-        # 收紧 dt 上限，避免延迟累积导致的位移跳变（卡顿感）
-        dt = max(0.001, min(now, 0.033))
-        
-        # 移除所有局部清理逻辑，统一全窗口重绘以确保无拖尾
-        # 原代码：
-        # cleanup_now = self._cleanup_clock.elapsed()
-        # if (cleanup_now - self._last_cleanup_ms) > 3000:
-        #     self.update()
-        #     self._last_cleanup_ms = cleanup_now
-        # if self._last_damage_region is not None and not self._last_damage_region.isEmpty():
-        #     self.update(self._last_damage_region)
-        
-        # 批量更新粒子，并收集逐粒子的重绘区域（前后包围盒）
-        alive_particles = []
-        for p in self.particles:
-            p.update(dt)
-            if not p.is_dead():
-                alive_particles.append(p)
-
-        # 当粒子数量超过上限时，截断多余粒子以优化性能
-        if len(alive_particles) > self.max_particles:
-            alive_particles = alive_particles[-self.max_particles:]
-        self.particles = alive_particles
-        
-        # 改为每次tick()统一全窗口重绘，确保立即清除所有残留
-        self.update()
-        self._last_damage_region = None
+
+        # 先处理本帧积累的输入
+        self._drain_input()
+        self._emit_trail()
+
+        # 整列批量推进
+        store = self.particles
+        if self._sim_mode == 'analytic':
+            # 解析模式：只推进时钟，本帧的状态按闭式解一次求出，供剔除、损伤区域与绘制共用
+            dt = min(now, self._step * self._max_steps)
+            store.time += dt
+            store.evaluate(store.time)
+            self._ribbon.update(dt, self._trail_life)
+            self._alpha = 1.0
+        elif self._fixed_step:
+            # 固定步长：每步物理计算量恒定，与定时器抖动无关；掉帧时补步保证运动速度正确，
+            # 累积量封顶防止卡顿后一次补算过多
+            step = self._step
+            self._accum = min(self._accum + now, step * self._max_steps)
+            while self._accum >= step:
+                store.time += step
+                store.update(step)
+                self._ribbon.update(step, self._trail_life)
+                self._accum -= step
+            self._alpha = self._accum / step
+        else:
+            # 收紧 dt 上限，避免延迟累积导致的位移跳变（卡顿感）
+            dt = max(0.001, min(now, 0.033))
+            store.time += dt
+            store.update(dt)
+            self._ribbon.update(dt, self._trail_life)
+            self._alpha = 1.0
+
+        # 死亡粒子与已落出虚拟桌面（下方或左右两侧）的粒子一并剔除：
+        # 水平速度只会衰减、垂直方向持续受重力，出界后不会再回到可见区域
+        keep = store.alive_mask()
+        if store.count:
+            desk = self._desktop
+            x0, y0, x1, _ = self._particle_bounds()
+            keep &= (y0 < desk.y() + desk.height()) & (x1 > desk.x()) & (x0 < desk.x() + desk.width())
+        store.compact(keep)
+
+        # 渲染开销超出预算时，优先淘汰屏幕外、最淡、最接近寿命终点的粒子
+        self.budget.evict(store, self._on_screen_mask())
+
+        self.frames.publish(self._capture())
+        # 本帧模拟耗时与上一帧以来的绘制耗时交给画质调节器，档位变化时重新换算各项阈值
+        tick_ms = (time.perf_counter() - started) * 1000.0
+        self.metrics.record_tick(tick_ms, now * 1000.0, self.timer.interval(), store.count)
+        if self.governor.end_frame(tick_ms):
+            tracer.instant(f'quality:level{self.governor.level}')
+            self._apply_quality()
 
         # 减少日志输出频率
         if len(self.particles) > 0 and len(self.particles) % 50 == 0:
             logger.debug("tick: particles=%d", len(self.particles))
 
-    def _particle_bounds(self, p: 'Particle') -> QtCore.QRect:
-        # 近似包围盒：半径按尺寸放大一点，考虑旋转带来的边界增长
-        if p.shape in ('text', 'star', 'rect'):
-            radius = max(5.0, p.size * 0.9)
-        elif p.shape == 'flower':
-            radius = max(6.0, p.size * 1.2)
-        elif p.shape in ('circle',):
-            radius = max(5.0, p.size * 1.2)
-        elif p.shape in ('trail',):
-            radius = max(5.0, p.size * 1.4)
-        else:
-            radius = max(4.0, p.size)
+    def _capture(self) -> FrameSnapshot:
+        """把存活粒子的绘制所需列（插值后的位置与角度、包围盒）与丝带轮廓复制为只读快照。"""
+        store = self.particles
+        n = store.count
+        self._frame_seq += 1
+        ribbon = ()
+        ribbon_bounds = None
+        if self._ribbon:
+            ribbon = tuple(self._ribbon.polygons(self._ribbon_width, self._trail_life))
+            ribbon_bounds = self._ribbon.bounds(self._ribbon_width * 0.5 + 15)
+        if n == 0:
+            return FrameSnapshot(self._frame_seq, ribbon=ribbon, ribbon_bounds=ribbon_bounds)
+        pos, rotation = self._render_state()
+        columns = {
+            'pos': np.array(pos, dtype=np.float32),
+            'rotation': np.array(rotation, dtype=np.float32),
+            'size': store.size[:n].copy(),
+            'opacity': store.opacity[:n].copy(),
+            'shape': store.shape[:n].copy(),
+            'color': store.color[:n].copy(),
+            'glyph': store.glyph[:n].copy(),
+            'group': store.group[:n].copy(),
+        }
+        return FrameSnapshot(self._frame_seq, n, columns, self._particle_bounds(), tuple(store.glyphs),
+                             tuple(store.palette), ribbon, ribbon_bounds)
+
+    def request_present(self) -> bool:
+        """模拟线程发布新快照后调用：GUI 线程还没处理上一次呈现请求时返回 False。"""
+        if self._present_pending:
+            return False
+        self._present_pending = True
+        return True
+
+    @traced('present')
+    def _present(self):
+        """GUI 线程：取最新快照，调整窗口池并请求损伤区域重绘；耗时计入画质调节器。"""
+        self._present_pending = False
+        started = time.perf_counter()
+        frame = self.frames.latest()
+        self._presented = frame
+        self._sync_pool(frame)
+        self._update_damage(frame)
+        self.governor.add_paint((time.perf_counter() - started) * 1000.0)
+
+    # 各形状包围半径系数与下限（按 shape 编号索引），考虑旋转带来的边界增长；
+    # 文字以基线左端为旋转中心，字形最远处约为字号的 1.6 倍像素
+    _BOUND_SCALE = np.array([1.7, 1.2, 0.9, 1.2, 1.4, 0.9], dtype=np.float32)
+    _BOUND_MIN = np.array([5.0, 5.0, 5.0, 6.0, 5.0, 5.0], dtype=np.float32)
+
+    def _on_screen_mask(self) -> np.ndarray:
+        """包围盒与任一屏幕相交的粒子；没有屏幕信息时视为全部可见。"""
+        n = self.particles.count
+        rects = self._screen_rects
+        if n == 0 or not len(rects):
+            return None
+        x0, y0, x1, y1 = self._particle_bounds()
+        hit = ((x1[:, None] > rects[:, 0]) & (x0[:, None] < rects[:, 2])
+               & (y1[:, None] > rects[:, 1]) & (y0[:, None] < rects[:, 3]))
+        return hit.any(axis=1)
+
+    def _particle_bounds(self):
+        """批量计算存活粒子的近似包围盒，返回 (x0, y0, x1, y1) 数组。"""
+        store = self.particles
+        n = store.count
+        shape = store.shape[:n]
+        radius = np.maximum(self._BOUND_MIN[shape], store.size[:n] * self._BOUND_SCALE[shape])
         # 加上更大的移动裕量，降低因位移/抗锯齿导致的未完全覆盖
-        margin = 15  # 进一步增大到15像素，确保完全覆盖拖尾残留
-        x = int(p.pos.x() - radius - margin)
-        y = int(p.pos.y() - radius - margin)
-        w = int(radius * 2 + margin * 2)
-        h = int(radius * 2 + margin * 2)
-        return QtCore.QRect(x, y, w, h)
+        radius += 15
+        # 覆盖上一步到当前步的整段位移，插值绘制的位置总在其中
+        pos = store.pos[:n]
+        prev = store.prev[:n]
+        lo = np.minimum(pos, prev)
+        hi = np.maximum(pos, prev)
+        return lo[:, 0] - radius, lo[:, 1] - radius, hi[:, 0] + radius, hi[:, 1] + radius
 
-    def paintEvent(self, ev: QtGui.QPaintEvent):
-        painter = QtGui.QPainter(self)
+    # 损伤瓦片边长（像素）
+    DAMAGE_TILE = 64
+
+    def _empty_damage(self) -> np.ndarray:
+        """覆盖整个虚拟桌面的空瓦片网格。"""
+        tile = self.DAMAGE_TILE
+        return np.zeros((self._desktop.height() // tile + 1, self._desktop.width() // tile + 1), dtype=bool)
+
+    def _repaint_all(self):
+        """整窗重绘全部窗口（可见性、窗口布局或桌面几何变化时），损伤记录从空网格重新开始。"""
+        self._last_damage_tiles = self._empty_damage()
+        self._update_windows()
+
+    def _damage_tiles(self, frame: FrameSnapshot) -> np.ndarray:
+        """把当前所有粒子与丝带点的包围盒标记到粗粒度瓦片网格上（二维差分 + 前缀和）。
+
+        网格覆盖整个虚拟桌面，原点为虚拟桌面左上角。
+        """
+        tile = self.DAMAGE_TILE
+        desk = self._desktop
+        w, h = desk.width(), desk.height()
+        gw = w // tile + 1
+        gh = h // tile + 1
+        boxes = []
+        if frame.count:
+            boxes.append((frame.x0, frame.y0, frame.x1, frame.y1))
+        if frame.ribbon_bounds is not None:
+            boxes.append(frame.ribbon_bounds)
+        if not boxes:
+            return self._empty_damage()
+        x0, y0, x1, y1 = (np.concatenate(c) for c in zip(*boxes))
+        # 换算到以虚拟桌面左上角为原点的网格坐标
+        x0 = x0 - desk.x()
+        x1 = x1 - desk.x()
+        y0 = y0 - desk.y()
+        y1 = y1 - desk.y()
+        inside = (x1 >= 0) & (y1 >= 0) & (x0 < w) & (y0 < h)
+        tx0 = np.clip(x0[inside] // tile, 0, gw - 1).astype(np.intp)
+        ty0 = np.clip(y0[inside] // tile, 0, gh - 1).astype(np.intp)
+        tx1 = np.clip(x1[inside] // tile, 0, gw - 1).astype(np.intp) + 1
+        ty1 = np.clip(y1[inside] // tile, 0, gh - 1).astype(np.intp) + 1
+        diff = np.zeros((gh + 1, gw + 1), dtype=np.int32)
+        np.add.at(diff, (ty0, tx0), 1)
+        np.add.at(diff, (ty0, tx1), -1)
+        np.add.at(diff, (ty1, tx0), -1)
+        np.add.at(diff, (ty1, tx1), 1)
+        return diff.cumsum(axis=0).cumsum(axis=1)[:gh, :gw] > 0
+
+    def _tiles_to_region(self, tiles: np.ndarray) -> QtGui.QRegion:
+        """把瓦片掩码按行合并成水平条带，组成全局坐标的 QRegion。"""
+        tile = self.DAMAGE_TILE
+        ox, oy = self._desktop.x(), self._desktop.y()
+        padded = np.zeros((tiles.shape[0], tiles.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = tiles
+        edges = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        region = QtGui.QRegion()
+        for r, a, b in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+            region += QtCore.QRect(ox + a * tile, oy + r * tile, (b - a) * tile, tile)
+        return region
+
+    def _update_damage(self, frame: FrameSnapshot):
+        """只重绘本帧与上一帧粒子覆盖区域的并集：旧位置被清除，新位置被绘制。
+
+        空闲后的第一帧也只重绘新粒子所在的瓦片；窗口布局变化时由 _repaint_all 整窗重绘。
+        """
+        tiles = self._damage_tiles(frame)
+        last = self._last_damage_tiles
+        self._last_damage_tiles = tiles
+        if last is None or last.shape != tiles.shape:
+            last = np.zeros_like(tiles)
+        dirty = tiles | last
+        if dirty.any():
+            self._update_windows(self._tiles_to_region(dirty))
+
+    def _atlas_for(self, dpr: float, palette) -> SpriteAtlas:
+        """取指定设备像素比的精灵图集；调色板或尺寸范围变化时由 ensure 重建，否则直接复用。"""
+        atlas = self._atlases.get(dpr)
+        if atlas is None:
+            atlas = self._atlases[dpr] = SpriteAtlas()
+        atlas.ensure(palette, self.spec.sprite_size_ranges(), dpr)
+        return atlas
+
+    def _glyphs_for(self, dpr: float, logical_dpi: float) -> GlyphCache:
+        key = (dpr, logical_dpi)
+        cache = self._glyph_caches.get(key)
+        if cache is None:
+            cache = GlyphCache(self._base_font)
+            cache.configure(dpr, logical_dpi)
+            self._glyph_caches[key] = cache
+        return cache
+
+    def _glyph_atlas_for(self, dpr: float, logical_dpi: float) -> GlyphAtlas:
+        key = (dpr, logical_dpi)
+        atlas = self._glyph_atlases.get(key)
+        if atlas is None:
+            atlas = GlyphAtlas(self._glyphs_for(dpr, logical_dpi))
+            self._glyph_atlases[key] = atlas
+        return atlas
+
+    def _render_state(self):
+        """绘制用的位置与角度：固定步长模式下在上一步与当前步之间按累积余量插值。"""
+        store = self.particles
+        n = store.count
+        a = self._alpha
+        if a >= 1.0:
+            return store.pos[:n], store.rotation[:n]
+        prev = store.prev[:n]
+        pos = prev + (store.pos[:n] - prev) * a
+        rotation = store.rotation[:n] - store.spin[:n] * (self._step * (1.0 - a))
+        return pos, rotation
+
+    def _sprite_batch(self, frame: FrameSnapshot, atlas: SpriteAtlas, idx: np.ndarray, lod: np.ndarray,
+                      dot_idx: np.ndarray):
+        """查出所有图集片段的参数：返回 (粒子下标, 源矩形, 缩放, 角度, 透明度)。
+
+        idx 为完整/简化层级的图形粒子，dot_idx 为降级为圆点的粒子（含文字粒子）。
+        QPainter 与 OpenGL 两个后端共用。
+        """
+        store = frame
+        shape = store.shape[idx]
+        rects, scale = atlas.lookup(shape, store.color[idx], store.size[idx], lod[idx])
+        # 对称形状与简化后的花朵无需旋转
+        still = (shape == SHAPE_TRAIL) | (shape == SHAPE_CIRCLE) | ((shape == SHAPE_FLOWER) & (lod[idx] == LOD_SIMPLE))
+        rotation = np.where(still, 0.0, store.rotation[idx])
+        dot_rects, dot_scale = atlas.lookup_dot(store.color[dot_idx], store.size[dot_idx])
+
+        idx = np.concatenate([idx, dot_idx])
+        shape = store.shape[idx]
+        rects = np.concatenate([rects, dot_rects])
+        scale = np.concatenate([scale, dot_scale])
+        rotation = np.concatenate([rotation, np.zeros(dot_idx.size, dtype=rotation.dtype)])
+        opacity = store.opacity[idx]
+        # 光点渐变原本叠乘一次透明度，圆形整体再乘 0.9，与逐粒子绘制保持一致
+        opacity = np.where(shape == SHAPE_TRAIL, opacity * opacity,
+                           np.where(shape == SHAPE_CIRCLE, opacity * 0.9, opacity))
+        return idx, rects, scale, rotation, opacity
+
+    def _draw_sprites(self, painter: QtGui.QPainter, frame: FrameSnapshot, atlas: SpriteAtlas,
+                      idx: np.ndarray, lod: np.ndarray, dot_idx: np.ndarray):
+        """用一次 drawPixmapFragments 绘制所有图集片段（每个片段自带旋转/缩放/透明度）。"""
+        idx, rects, scale, rotation, opacity = self._sprite_batch(frame, atlas, idx, lod, dot_idx)
+        pos = frame.pos
+        create = QtGui.QPainter.PixmapFragment.create
+        QPointF = QtCore.QPointF
+        QRectF = QtCore.QRectF
+        fragments = [
+            create(QPointF(x, y), QRectF(r[0], r[1], r[2], r[3]), sc, sc, rot, op)
+            for x, y, r, sc, rot, op in zip(pos[idx, 0].tolist(), pos[idx, 1].tolist(),
+                                            rects.tolist(), scale.tolist(), rotation.tolist(),
+                                            opacity.tolist())
+        ]
+        draw_fragments(painter, fragments, atlas.pixmap)
+
+    def _draw_ribbon(self, painter: QtGui.QPainter, polygons):
+        """每笔丝带一次填充：轮廓由新到旧收窄，沿笔画方向的渐变由不透明淡出到透明。"""
+        colors = self._ribbon_colors or [QtGui.QColor('#FF5252')]
+        painter.setPen(QtCore.Qt.NoPen)
+        QPointF = QtCore.QPointF
+        for outline, path in polygons:
+            grad = QtGui.QLinearGradient(QPointF(path[0, 0], path[0, 1]), QPointF(path[-1, 0], path[-1, 1]))
+            n = len(colors)
+            for i, c in enumerate(colors):
+                pos = i / (n - 1) if n > 1 else 1.0
+                stop = QtGui.QColor(c)
+                stop.setAlphaF(0.85 * pos)
+                grad.setColorAt(pos, stop)
+            painter.setBrush(QtGui.QBrush(grad))
+            painter.drawPolygon(QtGui.QPolygonF([QPointF(x, y) for x, y in outline.tolist()]))
+
+    @traced('paint')
+    def paint(self, window: OverlayWindow, ev: QtGui.QPaintEvent):
+        """绘制一个覆盖窗口并把耗时计入画质调节器。"""
+        started = time.perf_counter()
+        self._paint_window(window, ev)
+        elapsed = (time.perf_counter() - started) * 1000.0
+        self.governor.add_paint(elapsed)
+        self.metrics.record_paint(elapsed)
+
+    @traced('paint_gl')
+    def paint_gl(self, window: GLOverlayWindow):
+        """OpenGL 后端的一帧（窗口已清空），耗时同样计入画质调节器。"""
+        started = time.perf_counter()
+        self._paint_gl(window)
+        elapsed = (time.perf_counter() - started) * 1000.0
+        self.governor.add_paint(elapsed)
+        self.metrics.record_paint(elapsed)
+
+    def _select_particles(self, frame: FrameSnapshot, group, bounds: QtCore.QRect):
+        """选出快照中要提交的粒子：与 bounds（全局坐标）相交、属于 group（None 表示全部）且不过淡。
+
+        返回 (细节层级, 图形粒子下标, 圆点下标, 文字粒子下标)。
+        """
+        # 粒子总开销已由渲染预算限制，这里不再截断绘制数量
+        # 跳过透明度过低的粒子，避免绘制几乎看不见的残留
+        visible = frame.opacity >= 0.05
+        # 与损伤区域外接矩形不相交的粒子（包括其他屏幕上的粒子）无需提交绘制
+        visible &= ((frame.x1 >= bounds.left()) & (frame.x0 <= bounds.right() + 1)
+                    & (frame.y1 >= bounds.top()) & (frame.y0 <= bounds.bottom() + 1))
+        if group is not None:
+            visible &= frame.group == group
+        is_text = frame.shape == SHAPE_TEXT
+
+        # 细节层级：小而淡的粒子降级为简化形状或纯色圆点
+        lod = self._lod_tiers(frame.size, frame.opacity)
+        is_dot = lod == LOD_DOT
+        sprite_idx = np.flatnonzero(visible & ~is_text & ~is_dot)
+        dot_idx = np.flatnonzero(visible & is_dot)
+        text_idx = np.flatnonzero(visible & is_text & ~is_dot)
+        return lod, sprite_idx, dot_idx, text_idx
+
+    def _paint_window(self, window: OverlayWindow, ev: QtGui.QPaintEvent):
+        """只提交与该窗口本次损伤区域相交的粒子。"""
+        painter = QtGui.QPainter(window)
         painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
-        
-        # 强制清空整个重绘区域，使用最可靠的清除方式
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform, True)
+
+        # 只清空本次损伤区域，避免每帧擦除整个窗口
+        region = ev.region()
         painter.setCompositionMode(QtGui.QPainter.CompositionMode_Clear)
-        painter.fillRect(self.rect(), QtCore.Qt.transparent)  # 清空整个窗口
+        for rect in region:
+            painter.fillRect(rect, QtCore.Qt.transparent)
         painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
 
+        # 绘制只读已呈现的快照，不触碰模拟线程正在写的粒子存储
+        frame = self._presented
         # 若当前不可见或无粒子，仅执行清理后返回
-        if not self.visible_effects or not self.particles:
+        if not self.visible_effects or not (frame or frame.ribbon):
             painter.end()
             return
 
-        # 性能优化：限制绘制的粒子数量
-        max_draw_particles = 150 if self.performance_mode else 250
-        particles_to_draw = self.particles[:min(len(self.particles), max_draw_particles)]
+        # 粒子为全局坐标：平移到窗口本地，损伤区域换算回全局坐标用于裁剪
+        origin = window.geometry().topLeft()
+        painter.translate(-origin.x(), -origin.y())
+        bounds = region.boundingRect().translated(origin)
 
-        for p in particles_to_draw:
-            # 跳过透明度过低的粒子，避免绘制几乎看不见的残留
-            if p.opacity < 0.05:
-                continue
-                
-            if p.shape == 'text':
-                painter.save()
-                painter.translate(p.pos)
-                painter.rotate(p.rotation)
-                painter.setOpacity(p.opacity)
-                font = painter.font()
-                font.setPointSizeF(p.size)
-                painter.setFont(font)
-                painter.setPen(QtGui.QPen(p.color, 1))
-                painter.drawText(QtCore.QPointF(0, 0), p.text)
-                painter.restore()
-            elif p.shape == 'star':
-                painter.save()
-                painter.translate(p.pos)
-                painter.rotate(p.rotation)
-                painter.setOpacity(p.opacity)
-                painter.setBrush(p.color)
-                painter.setPen(QtCore.Qt.NoPen)
-                path = QtGui.QPainterPath()
-                r = p.size
-                for i in range(5):
-                    angle = i * 72
-                    angle2 = angle + 36
-                    x1 = math.cos(math.radians(angle)) * r
-                    y1 = math.sin(math.radians(angle)) * r
-                    x2 = math.cos(math.radians(angle2)) * (r * 0.5)
-                    y2 = math.sin(math.radians(angle2)) * (r * 0.5)
-                    if i == 0:
-                        path.moveTo(x1, y1)
-                    else:
-                        path.lineTo(x1, y1)
-                    path.lineTo(x2, y2)
-                path.closeSubpath()
-                painter.drawPath(path)
-                painter.restore()
-            elif p.shape == 'circle':
-                painter.save()
-                painter.translate(p.pos)
-                painter.setOpacity(p.opacity * 0.9)
-                painter.setBrush(QtGui.QBrush(p.color.lighter(120)))
-                painter.setPen(QtGui.QPen(p.color, 1))
-                painter.drawEllipse(QtCore.QPointF(0, 0), p.size, p.size)
-                painter.restore()
-            elif p.shape == 'flower':
-                painter.save()
-                painter.translate(p.pos)
-                painter.rotate(p.rotation)
-                painter.setOpacity(p.opacity)
-                petal_count = 5
-                r = max(4.0, p.size * 0.6)
-                petal_w = r * 0.9
-                petal_h = r * 1.2
-                base = QtGui.QColor(p.color)
-                center_color = QtGui.QColor(base).lighter(120)
-                for i in range(petal_count):
-                    painter.save()
-                    angle = i * (360.0 / petal_count)
-                    painter.rotate(angle)
-                    grad = QtGui.QRadialGradient(QtCore.QPointF(r * 0.2, 0), petal_h)
-                    grad.setColorAt(0.0, base.lighter(150))
-                    grad.setColorAt(1.0, base.darker(110))
-                    painter.setBrush(QtGui.QBrush(grad))
-                    painter.setPen(QtCore.Qt.NoPen)
-                    rect = QtCore.QRectF(r * 0.2, -petal_w * 0.5, petal_h, petal_w)
-                    painter.drawEllipse(rect)
-                    painter.restore()
-                painter.setBrush(center_color)
-                painter.setPen(QtCore.Qt.NoPen)
-                painter.drawEllipse(QtCore.QPointF(0, 0), r * 0.25, r * 0.25)
-                painter.restore()
-            elif p.shape == 'trail':
-                painter.save()
-                painter.translate(p.pos)
-                painter.setOpacity(p.opacity)
-                grad = QtGui.QRadialGradient(QtCore.QPointF(0, 0), p.size)
-                c1 = QtGui.QColor(p.color)
-                c1.setAlphaF(0.9 * p.opacity)
-                c2 = QtGui.QColor(p.color)
-                c2.setAlphaF(0.0)
-                grad.setColorAt(0.0, c1)
-                grad.setColorAt(1.0, c2)
-                painter.setBrush(QtGui.QBrush(grad))
-                painter.setPen(QtCore.Qt.NoPen)
-                painter.drawEllipse(QtCore.QPointF(0, 0), p.size, p.size)
-                painter.restore()
-            elif p.shape == 'rect':
-                painter.save()
-                painter.translate(p.pos)
-                painter.rotate(p.rotation)
-                painter.setOpacity(p.opacity)
-                painter.setBrush(p.color)
-                painter.setPen(QtCore.Qt.NoPen)
-                painter.drawRect(-p.size * 0.4, -p.size * 0.1, p.size, p.size * 0.2)
-                painter.restore()
+        # 丝带轨迹画在最底层，花瓣等粒子叠在其上；池化小窗口只画自己的区域，
+        # 避免相互重叠的窗口把同一粒子画两遍
+        group = window.group
+        if frame.ribbon and group in (None, self.RIBBON_GROUP):
+            self._draw_ribbon(painter, frame.ribbon)
+        if not frame or group == self.RIBBON_GROUP:
+            painter.end()
+            return
+
+        lod, sprite_idx, dot_idx, text_idx = self._select_particles(frame, group, bounds)
+        dpr = window.devicePixelRatioF()
+        if (self._backend == 'tiled' and self._rasterizer.threads > 1
+                and sprite_idx.size + dot_idx.size + text_idx.size >= self.TILED_MIN_PARTICLES):
+            self._draw_tiled(painter, window, frame, region, origin, dpr, lod, sprite_idx, dot_idx, text_idx)
+            painter.end()
+            return
+        # 图形类粒子与圆点走精灵图集，一次批量提交
+        if sprite_idx.size or dot_idx.size:
+            atlas = self._atlas_for(dpr, frame.palette)
+            if atlas.pixmap is not None:
+                self._draw_sprites(painter, frame, atlas, sprite_idx, lod, dot_idx)
+
+        # 文字类粒子（爱心/钱币）走字形缓存，按符号/颜色/尺寸档分组批量贴图；简化层级不再旋转
+        if text_idx.size:
+            pos = frame.pos
+            rotation = np.where(lod[text_idx] == LOD_SIMPLE, 0.0, frame.rotation[text_idx])
+            glyph_cache = self._glyphs_for(dpr, window.logicalDpiY())
+            glyph_cache.draw(painter, pos[text_idx, 0], pos[text_idx, 1],
+                             frame.glyph[text_idx], frame.color[text_idx], frame.size[text_idx],
+                             rotation, frame.opacity[text_idx],
+                             frame.glyphs, frame.palette)
         painter.end()
+
+    # 可见粒子少于此数时 tiled 后端直接在 GUI 线程绘制，分瓦片的调度开销得不偿失
+    TILED_MIN_PARTICLES = 200
+
+    def _draw_tiled(self, painter: QtGui.QPainter, window: OverlayWindow, frame: FrameSnapshot,
+                    region: QtGui.QRegion, origin: QtCore.QPoint, dpr: float, lod, sprite_idx, dot_idx, text_idx):
+        """tiled 后端：在 GUI 线程备好片段（图集与字形均取 QImage 版本，工作线程不接触 QPixmap），
+        线程池把各瓦片光栅化到独立的 QImage，最后按原位置合成到窗口。"""
+        store = frame
+        pos = frame.pos
+        x0, y0, x1, y1 = frame.x0, frame.y0, frame.x1, frame.y1
+        layers = []
+        if sprite_idx.size or dot_idx.size:
+            atlas = self._atlas_for(dpr, frame.palette)
+            if atlas.image is not None:
+                idx, rects, scale, rotation, opacity = self._sprite_batch(frame, atlas, sprite_idx, lod, dot_idx)
+                layers.append(FragmentLayer(atlas.image, pos[idx, 0], pos[idx, 1], rects, scale, rotation, opacity,
+                                            (x0[idx], y0[idx], x1[idx], y1[idx])))
+        if text_idx.size:
+            rotation = np.where(lod[text_idx] == LOD_SIMPLE, 0.0, store.rotation[text_idx])
+            glyph_cache = self._glyphs_for(dpr, window.logicalDpiY())
+            for image, sel, scale in glyph_cache.groups(store.glyph[text_idx], store.color[text_idx],
+                                                        store.size[text_idx], store.glyphs, store.palette,
+                                                        images=True):
+                idx = text_idx[sel]
+                rects = np.tile(np.array([0.0, 0.0, image.width(), image.height()], dtype=np.float32),
+                                (idx.size, 1))
+                layers.append(FragmentLayer(image, pos[idx, 0], pos[idx, 1], rects, scale, rotation[sel],
+                                            store.opacity[idx], (x0[idx], y0[idx], x1[idx], y1[idx])))
+        tiles = self._rasterizer.tiles(region, origin, window.size())
+        for rect, image in self._rasterizer.render(tiles, dpr, layers):
+            painter.drawImage(rect.topLeft(), image)
+
+    def _paint_gl(self, window: GLOverlayWindow):
+        """OpenGL 后端：GL 窗口每帧整窗重绘，粒子打包为实例数据，每张图集纹理一次实例化绘制。
+
+        丝带仍用 QPainter 画在最底层，粒子在原生绘制段中叠在其上。
+        """
+        frame = self._presented
+        if not self.visible_effects or not (frame or frame.ribbon):
+            return
+        geo = window.geometry()
+        ox, oy = geo.x(), geo.y()
+        painter = None
+        if frame.ribbon:
+            painter = QtGui.QPainter(window)
+            painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+            painter.translate(-ox, -oy)
+            self._draw_ribbon(painter, frame.ribbon)
+            painter.beginNativePainting()
+        try:
+            batches = []
+            if frame:
+                batches = self._gl_batches(window, frame, geo, ox, oy)
+            window.draw_instances(batches)
+        finally:
+            if painter is not None:
+                painter.endNativePainting()
+                painter.end()
+
+    def _gl_batches(self, window: GLOverlayWindow, frame: FrameSnapshot, geo: QtCore.QRect, ox: int,
+                    oy: int) -> list:
+        """[(纹理键, 图集 QImage, 实例数据)]：图形与圆点共用精灵图集，文字粒子使用字形图集。"""
+        store = frame
+        pos = frame.pos
+        lod, sprite_idx, dot_idx, text_idx = self._select_particles(frame, None, geo)
+        dpr = window.devicePixelRatioF()
+        batches = []
+        if sprite_idx.size or dot_idx.size:
+            atlas = self._atlas_for(dpr, frame.palette)
+            if atlas.image is not None:
+                idx, rects, scale, rotation, opacity = self._sprite_batch(frame, atlas, sprite_idx, lod, dot_idx)
+                batches.append(('sprites', atlas.image,
+                                pack_instances(pos[idx, 0] - ox, pos[idx, 1] - oy, rects, scale, rotation,
+                                               opacity, (atlas.image.width(), atlas.image.height()))))
+        if text_idx.size:
+            glyph_atlas = self._glyph_atlas_for(dpr, window.logicalDpiY())
+            rects, scale = glyph_atlas.lookup(store.glyph[text_idx], store.color[text_idx], store.size[text_idx],
+                                              store.glyphs, store.palette)
+            rotation = np.where(lod[text_idx] == LOD_SIMPLE, 0.0, store.rotation[text_idx])
+            image = glyph_atlas.image
+            batches.append(('glyphs', image,
+                            pack_instances(pos[text_idx, 0] - ox, pos[text_idx, 1] - oy, rects, scale, rotation,
+                                           store.opacity[text_idx], (image.width(), image.height()))))
+        return batches
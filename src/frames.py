@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+import numpy as np
+from PySide6 import QtCore
+
+logger = logging.getLogger(__name__)
+
+
+class FrameSnapshot:
+    """一帧模拟结果的只读快照：绘制、损伤区域与窗口池只读这里，不再直接访问粒子存储。
+
+    列为存活粒子的紧凑副本（数组设为只读）：pos/rotation 已按插值系数换算为绘制用的值，
+    x0/y0/x1/y1 为包围盒；glyphs/palette 为当时符号表与调色板的元组副本，
+    ribbon 为各笔丝带的 (轮廓, 笔画点)，ribbon_bounds 为丝带点的包围盒（无丝带时为 None）。
+    """
+
+    __slots__ = ('seq', 'count', 'pos', 'rotation', 'size', 'opacity', 'shape', 'color', 'glyph', 'group',
+                 'x0', 'y0', 'x1', 'y1', 'glyphs', 'palette', 'ribbon', 'ribbon_bounds')
+
+    def __init__(self, seq=0, count=0, columns=None, bounds=None, glyphs=(), palette=(), ribbon=(),
+                 ribbon_bounds=None):
+        self.seq = seq
+        self.count = count
+        columns = columns or {}
+        for name in ('pos', 'rotation', 'size', 'opacity', 'shape', 'color', 'glyph', 'group'):
+            col = columns.get(name)
+            if col is None:
+                col = np.zeros((0, 2) if name == 'pos' else 0, dtype=np.float32)
+            col.flags.writeable = False
+            setattr(self, name, col)
+        empty = np.zeros(0, dtype=np.float32)
+        self.x0, self.y0, self.x1, self.y1 = bounds if bounds is not None else (empty,) * 4
+        self.glyphs = glyphs
+        self.palette = palette
+        self.ribbon = ribbon
+        self.ribbon_bounds = ribbon_bounds
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+
+class FrameMailbox:
+    """模拟 -> 绘制的快照发布：生产者填好一份新的快照后，以一次引用赋值发布。
+
+    快照发布后不再修改，读者拿到引用即可随意读取，读写双方都无需加锁
+    （依赖 CPython 对单个属性赋值的原子性）。旧快照在没有读者引用后自然回收，
+    因而等价于三缓冲：写者永远写新缓冲，读者永远读完整的最新一帧。
+    """
+
+    def __init__(self):
+        self._latest = FrameSnapshot()
+        self.published = 0
+
+    def publish(self, frame: FrameSnapshot):
+        self._latest = frame
+        self.published += 1
+
+    def latest(self) -> FrameSnapshot:
+        return self._latest
+
+
+class SimulationWorker(QtCore.QObject):
+    """在专用线程中按固定间隔推进 EffectLayer 的模拟（输入处理、发射、推进、剔除、淘汰）。
+
+    每步结束后发布快照并发出 ``frame_ready``（排队连接到 GUI 线程做损伤重绘）；
+    没有粒子且超过宽限时间后停表。``wake`` 可从任意线程调用。
+    """
+
+    frame_ready = QtCore.Signal()
+    _wake_requested = QtCore.Signal()
+    _stop_requested = QtCore.Signal()
+
+    def __init__(self, layer, interval_ms: int = 10):
+        super().__init__()
+        self.layer = layer
+        self.interval_ms = interval_ms
+        # 由工作线程维护，其他线程只读；停表前先清零，再复查输入队列
+        self.running = False
+        self._timer = None
+        self._idle_since = -1.0
+        self._thread = QtCore.QThread()
+        self._thread.setObjectName('simulation')
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self._on_started)
+        # 线程结束时在线程内处理延迟删除；线程退出后再 deleteLater 已无事件循环可执行
+        self._thread.finished.connect(self.deleteLater)
+        self._wake_requested.connect(self._start, QtCore.Qt.QueuedConnection)
+        self._stop_requested.connect(self._stop, QtCore.Qt.BlockingQueuedConnection)
+
+    def start(self):
+        self._thread.start()
+
+    def shutdown(self):
+        """停表并结束线程（GUI 线程调用，等待线程退出）；worker 随线程结束一并删除。"""
+        if not self._thread.isRunning():
+            return
+        self._stop_requested.emit()
+        self._thread.quit()
+        self._thread.wait()
+
+    def wake(self):
+        if not self.running:
+            self._wake_requested.emit()
+
+    def _on_started(self):
+        threading.current_thread().name = 'simulation'
+        self._timer = QtCore.QTimer(self)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.setInterval(self.interval_ms)
+        self._timer.timeout.connect(self._step)
+        if self.layer.has_pending_work():
+            self._start()
+
+    def _start(self):
+        if self._timer is None or self._timer.isActive():
+            return
+        self.layer.resume_clock()
+        self._idle_since = -1.0
+        self.running = True
+        self._timer.start()
+        logger.debug("SimulationWorker: resumed")
+
+    def _stop(self):
+        self.running = False
+        if self._timer is not None:
+            self._timer.stop()
+
+    def _step(self):
+        layer = self.layer
+        try:
+            layer.step_simulation()
+        except Exception:
+            logger.exception("simulation step failed")
+        # GUI 线程尚未处理上一次呈现时不再排队，卡顿恢复后只呈现最新一帧
+        if layer.request_present():
+            self.frame_ready.emit()
+        if layer.has_pending_work():
+            self._idle_since = -1.0
+            return
+        now = time.perf_counter()
+        if self._idle_since < 0:
+            self._idle_since = now
+            return
+        if (now - self._idle_since) * 1000.0 >= layer.IDLE_GRACE_MS:
+            self._stop()
+            # 停表后再检查一次输入队列：监听线程可能恰好在停表前写入并看到仍在运行
+            if len(layer.input_queue):
+                self._start()
+                return
+            logger.debug("SimulationWorker: idle, timer stopped")
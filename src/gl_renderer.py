@@ -0,0 +1,329 @@
+"""OpenGL 实例化渲染后端。
+
+每个粒子是一个贴图四边形：粒子属性（位置、尺寸、角度、透明度、图集源矩形）打包进
+实例缓冲，每张图集纹理一次 ``glDrawArraysInstanced`` 提交全部粒子。只依赖 PySide6
+自带的 QtOpenGL 封装，不需要 PyOpenGL。
+
+没有 GPU 的机器可用 Mesa llvmpipe 软件渲染运行与测试：Linux 下设置
+``LIBGL_ALWAYS_SOFTWARE=1``，Windows 下使用 Qt 自带的 opengl32sw.dll
+（见 ``prefer_software_opengl``，对应配置 effects.openglSoftware）。
+上下文创建、版本或着色器不满足要求时，EffectLayer 自动回退到 QPainter 路径。
+"""
+import logging
+import os
+import numpy as np
+from PySide6 import QtCore, QtGui
+from PySide6.QtOpenGL import (QOpenGLWindow, QOpenGLShader, QOpenGLShaderProgram, QOpenGLBuffer,
+                              QOpenGLVertexArrayObject, QOpenGLTexture)
+
+logger = logging.getLogger(__name__)
+
+# 用到的 GL 枚举（避免依赖 PyOpenGL）
+GL_FLOAT = 0x1406
+GL_TRIANGLE_STRIP = 0x0005
+GL_COLOR_BUFFER_BIT = 0x4000
+GL_BLEND = 0x0BE2
+GL_DEPTH_TEST = 0x0B71
+GL_STENCIL_TEST = 0x0B90
+GL_SCISSOR_TEST = 0x0C11
+GL_ONE = 1
+GL_ONE_MINUS_SRC_ALPHA = 0x0303
+GL_RENDERER = 0x1F01
+
+# 每个实例的浮点数：中心 x, y，宽高 w, h，角度（度），透明度，纹理源矩形 u, v, du, dv
+INSTANCE_FLOATS = 10
+_STRIDE = INSTANCE_FLOATS * 4
+# (属性名, 位置, 在实例中的起始浮点下标, 分量数)
+_ATTRIBUTES = (('inst_rect', 1, 0, 4), ('inst_rot_opacity', 2, 4, 2), ('inst_uv', 3, 6, 4))
+
+_VERTEX_SHADER = """
+in vec2 corner;
+in vec4 inst_rect;
+in vec2 inst_rot_opacity;
+in vec4 inst_uv;
+uniform vec2 viewport;
+out vec2 uv;
+out float opacity;
+void main() {
+    float a = radians(inst_rot_opacity.x);
+    float c = cos(a);
+    float s = sin(a);
+    vec2 p = corner * inst_rect.zw;
+    p = vec2(p.x * c - p.y * s, p.x * s + p.y * c) + inst_rect.xy;
+    gl_Position = vec4(p.x / viewport.x * 2.0 - 1.0, 1.0 - p.y / viewport.y * 2.0, 0.0, 1.0);
+    uv = inst_uv.xy + (corner + 0.5) * inst_uv.zw;
+    opacity = inst_rot_opacity.y;
+}
+"""
+
+# QOpenGLTexture 上传的是非预乘的 RGBA8888，在这里预乘后与 (ONE, ONE_MINUS_SRC_ALPHA) 混合
+_FRAGMENT_SHADER = """
+in vec2 uv;
+in float opacity;
+uniform sampler2D atlas;
+out vec4 frag;
+void main() {
+    vec4 c = texture(atlas, uv);
+    frag = vec4(c.rgb * c.a, c.a) * opacity;
+}
+"""
+
+# 单位四边形（以中心为原点），按三角形带顺序
+_QUAD = np.array([-0.5, -0.5, 0.5, -0.5, -0.5, 0.5, 0.5, 0.5], dtype=np.float32)
+
+
+def prefer_software_opengl():
+    """在创建 QApplication 之前调用：改用软件 OpenGL（Mesa llvmpipe / opengl32sw）。"""
+    os.environ.setdefault('LIBGL_ALWAYS_SOFTWARE', '1')
+    try:
+        QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_UseSoftwareOpenGL, True)
+    except Exception:
+        pass
+
+
+def surface_format() -> QtGui.QSurfaceFormat:
+    """带 alpha 通道的表面格式：桌面 GL 3.3 core，或 OpenGL ES 3.0。"""
+    fmt = QtGui.QSurfaceFormat()
+    fmt.setAlphaBufferSize(8)
+    fmt.setDepthBufferSize(0)
+    # 丝带仍由 QPainter 画在 GL 表面上，多边形填充需要模板缓冲
+    fmt.setStencilBufferSize(8)
+    if QtGui.QOpenGLContext.openGLModuleType() == QtGui.QOpenGLContext.LibGLES:
+        fmt.setRenderableType(QtGui.QSurfaceFormat.OpenGLES)
+        fmt.setVersion(3, 0)
+    else:
+        fmt.setRenderableType(QtGui.QSurfaceFormat.OpenGL)
+        fmt.setVersion(3, 3)
+        fmt.setProfile(QtGui.QSurfaceFormat.CoreProfile)
+    return fmt
+
+
+def supports_instancing(ctx: QtGui.QOpenGLContext) -> bool:
+    """实例化绘制与顶点属性除数需要 GL 3.3 或 ES 3.0。"""
+    fmt = ctx.format()
+    version = (fmt.majorVersion(), fmt.minorVersion())
+    return version >= ((3, 0) if ctx.isOpenGLES() else (3, 3))
+
+
+_available = None
+
+
+def opengl_available() -> bool:
+    """用离屏表面试建一次上下文，确认驱动支持实例化绘制；结果在进程内缓存。"""
+    global _available
+    if _available is None:
+        _available = _probe()
+    return _available
+
+
+def _probe() -> bool:
+    try:
+        ctx = QtGui.QOpenGLContext()
+        ctx.setFormat(surface_format())
+        if not ctx.create():
+            logger.warning("OpenGL context creation failed")
+            return False
+        surface = QtGui.QOffscreenSurface()
+        surface.setFormat(ctx.format())
+        surface.create()
+        if not ctx.makeCurrent(surface):
+            logger.warning("OpenGL context could not be made current")
+            return False
+        try:
+            fmt = ctx.format()
+            try:
+                renderer = ctx.functions().glGetString(GL_RENDERER)
+            except Exception:
+                renderer = '?'
+            logger.info("OpenGL %d.%d%s: %s", fmt.majorVersion(), fmt.minorVersion(),
+                        ' ES' if ctx.isOpenGLES() else '', renderer)
+            if not supports_instancing(ctx):
+                logger.warning("OpenGL %d.%d does not support instanced drawing",
+                               fmt.majorVersion(), fmt.minorVersion())
+                return False
+            return True
+        finally:
+            ctx.doneCurrent()
+    except Exception:
+        logger.exception("OpenGL probe failed")
+        return False
+
+
+def pack_instances(x, y, rects, scale, rotation, opacity, tex_size) -> np.ndarray:
+    """把一批图集片段打包为 (N, INSTANCE_FLOATS) 的 float32 实例数据。
+
+    参数与 drawPixmapFragments 的片段一致：(x, y) 为窗口本地的中心点，rects 为图集中的
+    源矩形（像素），scale 为源像素到逻辑像素的缩放，rotation 为角度。
+    """
+    n = len(x)
+    tw, th = float(tex_size[0]), float(tex_size[1])
+    out = np.empty((n, INSTANCE_FLOATS), dtype=np.float32)
+    out[:, 0] = x
+    out[:, 1] = y
+    out[:, 2] = rects[:, 2] * scale
+    out[:, 3] = rects[:, 3] * scale
+    out[:, 4] = rotation
+    out[:, 5] = opacity
+    out[:, 6] = rects[:, 0] / tw
+    out[:, 7] = rects[:, 1] / th
+    out[:, 8] = rects[:, 2] / tw
+    out[:, 9] = rects[:, 3] / th
+    return out
+
+
+class GLOverlayWindow(QOpenGLWindow):
+    """OpenGL 后端的整屏覆盖窗口：透明、置顶、输入穿透。
+
+    对外提供与 OverlayWindow 相同的属性（target_screen、pooled、group、sync_geometry），
+    绘制委托给 ``EffectLayer.paint_gl``。初始化失败时发出 ``failed``，由特效层回退到 QPainter 窗口。
+    """
+
+    failed = QtCore.Signal()
+
+    def __init__(self, layer, screen: QtGui.QScreen = None):
+        super().__init__(QOpenGLWindow.NoPartialUpdate)
+        self.setFormat(surface_format())
+        self.setFlags(QtCore.Qt.FramelessWindowHint | QtCore.Qt.Tool | QtCore.Qt.WindowStaysOnTopHint
+                      | QtCore.Qt.WindowTransparentForInput | QtCore.Qt.WindowDoesNotAcceptFocus)
+        self.layer = layer
+        self.target_screen = screen
+        # GL 窗口只用作整屏覆盖，不参与 pooled 小窗口池
+        self.pooled = False
+        self.group = None
+        self.ready = False
+        self._program = None
+        self._vao = None
+        self._quad = None
+        self._instances = None
+        self._capacity = 0
+        self._textures = {}
+        self.sync_geometry()
+
+    def sync_geometry(self):
+        try:
+            if self.target_screen is not None:
+                rect = self.target_screen.geometry()
+                try:
+                    self.setScreen(self.target_screen)
+                except Exception:
+                    pass
+            else:
+                rect = self.layer.virtual_desktop_rect()
+            if rect is not None and rect.isValid():
+                self.setGeometry(rect)
+        except Exception:
+            pass
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.sync_geometry()
+
+    # ---- GL 资源 ----
+    def initializeGL(self):
+        try:
+            self._init_gl()
+            self.ready = True
+        except Exception as e:
+            logger.warning("OpenGL renderer unavailable (%s), falling back to QPainter", e)
+            self.ready = False
+            QtCore.QTimer.singleShot(0, self.failed.emit)
+
+    def _init_gl(self):
+        ctx = self.context()
+        if ctx is None or not ctx.isValid():
+            raise RuntimeError('no valid OpenGL context')
+        if not supports_instancing(ctx):
+            raise RuntimeError(f'OpenGL {ctx.format().majorVersion()}.{ctx.format().minorVersion()} lacks instancing')
+        self._gl = ctx.extraFunctions()
+        header = '#version 300 es\nprecision mediump float;\n' if ctx.isOpenGLES() else '#version 330 core\n'
+        program = QOpenGLShaderProgram(self)
+        if not program.addShaderFromSourceCode(QOpenGLShader.Vertex, header + _VERTEX_SHADER):
+            raise RuntimeError('vertex shader: ' + program.log())
+        if not program.addShaderFromSourceCode(QOpenGLShader.Fragment, header + _FRAGMENT_SHADER):
+            raise RuntimeError('fragment shader: ' + program.log())
+        program.bindAttributeLocation('corner', 0)
+        for name, loc, _, _ in _ATTRIBUTES:
+            program.bindAttributeLocation(name, loc)
+        if not program.link():
+            raise RuntimeError('link: ' + program.log())
+        self._program = program
+
+        # VAO 记录四边形顶点与实例缓冲的属性布局，绘制时只需绑定
+        self._vao = QOpenGLVertexArrayObject(self)
+        if not self._vao.create():
+            raise RuntimeError('vertex array object unavailable')
+        self._vao.bind()
+        program.bind()
+        self._quad = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self._quad.create()
+        self._quad.bind()
+        self._quad.allocate(_QUAD.tobytes(), _QUAD.nbytes)
+        program.enableAttributeArray(0)
+        program.setAttributeBuffer(0, GL_FLOAT, 0, 2, 0)
+        self._instances = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self._instances.setUsagePattern(QOpenGLBuffer.StreamDraw)
+        self._instances.create()
+        self._instances.bind()
+        self._capacity = 1024
+        self._instances.allocate(self._capacity * _STRIDE)
+        for _, loc, offset, size in _ATTRIBUTES:
+            program.enableAttributeArray(loc)
+            program.setAttributeBuffer(loc, GL_FLOAT, offset * 4, size, _STRIDE)
+            self._gl.glVertexAttribDivisor(loc, 1)
+        self._vao.release()
+        program.release()
+
+    def _texture(self, key, image: QtGui.QImage) -> QOpenGLTexture:
+        """每张图集一份纹理；图像内容变化（cacheKey 改变）后重新上传。"""
+        entry = self._textures.get(key)
+        if entry is not None and entry[0] == image.cacheKey():
+            return entry[1]
+        if entry is not None:
+            entry[1].destroy()
+        tex = QOpenGLTexture(image, QOpenGLTexture.DontGenerateMipMaps)
+        tex.setMinificationFilter(QOpenGLTexture.Linear)
+        tex.setMagnificationFilter(QOpenGLTexture.Linear)
+        tex.setWrapMode(QOpenGLTexture.ClampToEdge)
+        self._textures[key] = (image.cacheKey(), tex)
+        return tex
+
+    # ---- 绘制 ----
+    def paintGL(self):
+        f = self.context().functions()
+        dpr = self.devicePixelRatioF()
+        f.glViewport(0, 0, int(round(self.width() * dpr)), int(round(self.height() * dpr)))
+        f.glClearColor(0.0, 0.0, 0.0, 0.0)
+        f.glClear(GL_COLOR_BUFFER_BIT)
+        if self.ready:
+            self.layer.paint_gl(self)
+
+    def draw_instances(self, batches):
+        """batches 为 [(纹理键, QImage, 实例数据)]：每张纹理一次实例化绘制。"""
+        if not self.ready or not batches:
+            return
+        gl = self._gl
+        gl.glDisable(GL_DEPTH_TEST)
+        gl.glDisable(GL_STENCIL_TEST)
+        gl.glDisable(GL_SCISSOR_TEST)
+        gl.glEnable(GL_BLEND)
+        gl.glBlendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
+        program = self._program
+        program.bind()
+        program.setUniformValue('viewport', QtGui.QVector2D(max(1, self.width()), max(1, self.height())))
+        program.setUniformValue1i('atlas', 0)
+        self._vao.bind()
+        self._instances.bind()
+        for key, image, data in batches:
+            n = len(data)
+            if n == 0:
+                continue
+            if n > self._capacity:
+                while self._capacity < n:
+                    self._capacity *= 2
+                self._instances.allocate(self._capacity * _STRIDE)
+            data = np.ascontiguousarray(data, dtype=np.float32)
+            self._instances.write(0, data.ctypes.data, data.nbytes)
+            self._texture(key, image).bind(0)
+            gl.glDrawArraysInstanced(GL_TRIANGLE_STRIP, 0, 4, n)
+        self._vao.release()
+        program.release()
@@ -0,0 +1,96 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class QualityGovernor:
+    """按实测帧耗时自适应调节画质。
+
+    每帧记录 tick 与各覆盖窗口 paint 的耗时，求和后做指数滑动平均；
+    平均耗时连续超过帧预算则降一档，连续明显低于预算则升一档。
+    降档快、升档慢，且每次换档后有冷却期，避免在阈值附近来回抖动。
+    ``scale`` 为当前档位的缩放系数（1.0 为满画质），由 EffectLayer 换算为
+    粒子上限、发射密度、轨迹发射速率与细节层级阈值。
+
+    模拟线程开启时 ``end_frame`` 在模拟线程、``add_paint`` 在 GUI 线程调用，
+    累加量与计数由锁保护。
+    """
+
+    # 画质档位（由高到低）的缩放系数
+    LEVELS = (1.0, 0.8, 0.65, 0.5, 0.35, 0.25)
+    EMA_ALPHA = 0.1
+    # 连续超预算多少帧后降档
+    DEGRADE_FRAMES = 8
+    # 平均耗时低于预算的该比例、且连续多少帧后升档
+    UPGRADE_RATIO = 0.6
+    UPGRADE_FRAMES = 90
+    # 换档后的冷却帧数
+    COOLDOWN_FRAMES = 30
+
+    def __init__(self, budget_ms: float = 8.0, enabled: bool = True, start_level: int = 0):
+        self.budget_ms = 8.0
+        self.enabled = True
+        self.level = 0
+        self.cost_ms = 0.0
+        self._paint_ms = 0.0
+        self._over = 0
+        self._under = 0
+        self._cooldown = 0
+        self._lock = threading.Lock()
+        self.configure(budget_ms, enabled, start_level)
+
+    def configure(self, budget_ms: float, enabled: bool, start_level: int = 0):
+        with self._lock:
+            self.budget_ms = max(1.0, float(budget_ms))
+            self.enabled = bool(enabled)
+            self.level = max(0, min(len(self.LEVELS) - 1, int(start_level)))
+            self.cost_ms = 0.0
+            self._paint_ms = 0.0
+            self._over = self._under = 0
+            self._cooldown = self.COOLDOWN_FRAMES
+
+    @property
+    def scale(self) -> float:
+        return self.LEVELS[self.level]
+
+    def add_paint(self, ms: float):
+        """累加一次窗口绘制耗时（同一帧可能有多个覆盖窗口绘制）。"""
+        with self._lock:
+            self._paint_ms += ms
+
+    def end_frame(self, tick_ms: float) -> bool:
+        """一帧结束：合并 tick 与上一帧以来的绘制耗时；档位变化时返回 True。"""
+        with self._lock:
+            return self._end_frame(tick_ms)
+
+    def _end_frame(self, tick_ms: float) -> bool:
+        cost = tick_ms + self._paint_ms
+        self._paint_ms = 0.0
+        self.cost_ms += (cost - self.cost_ms) * self.EMA_ALPHA
+        if not self.enabled:
+            return False
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False
+        if self.cost_ms > self.budget_ms:
+            self._over += 1
+            self._under = 0
+        elif self.cost_ms < self.budget_ms * self.UPGRADE_RATIO:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+        if self._over >= self.DEGRADE_FRAMES and self.level < len(self.LEVELS) - 1:
+            return self._shift(1)
+        if self._under >= self.UPGRADE_FRAMES and self.level > 0:
+            return self._shift(-1)
+        return False
+
+    def _shift(self, step: int) -> bool:
+        self.level += step
+        self._over = self._under = 0
+        self._cooldown = self.COOLDOWN_FRAMES
+        logger.debug("QualityGovernor: level=%d scale=%.2f cost=%.2fms budget=%.2fms",
+                     self.level, self.scale, self.cost_ms, self.budget_ms)
+        return True
@@ -0,0 +1,109 @@
+from array import array
+import math
+
+# 输入记录类型
+KIND_PRESS = 1    # 左键按下（触发点击特效）
+KIND_RELEASE = 2  # 左键松开（结束拖拽）
+KIND_MOVE = 3     # 左键按住时的移动（拖拽轨迹）
+
+
+class InputRingBuffer:
+    """pynput 监听线程 -> GUI 线程的单生产者/单消费者有界环形缓冲。
+
+    监听线程只调用 ``push`` 写入紧凑记录 (时间戳, x, y, 类型)，GUI 线程每帧调用
+    一次 ``drain`` 取走全部记录。读写位置各自只由一方修改，且写入字段先于发布
+    写指针，因此无需加锁（依赖 CPython 对单个属性赋值的原子性）。
+
+    溢出策略：缓冲占用达到 ``move_limit``（默认 3/4 容量）后丢弃新的移动记录，
+    为按下/松开记录保留余量；缓冲完全写满时才丢弃按下/松开记录。
+    丢弃与合并次数均有计数，可通过 ``stats()`` 读取。
+    """
+
+    def __init__(self, capacity: int = 1024, coalesce_px: float = 2.0):
+        cap = 1
+        while cap < max(4, int(capacity)):
+            cap <<= 1
+        self.capacity = cap
+        self._mask = cap - 1
+        self.move_limit = cap * 3 // 4
+        self.coalesce_px = float(coalesce_px)
+        self._t = array('d', bytes(8 * cap))
+        self._x = array('i', bytes(4 * cap))
+        self._y = array('i', bytes(4 * cap))
+        self._kind = array('b', bytes(cap))
+        self._head = 0  # 下一个写入序号（仅生产者修改）
+        self._tail = 0  # 下一个读取序号（仅消费者修改）
+        # 计数器：生产者侧
+        self.pushed = 0
+        self.dropped_moves = 0
+        self.dropped_clicks = 0
+        # 计数器：消费者侧
+        self.drained = 0
+        self.coalesced = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, t: float, x: int, y: int, kind: int) -> bool:
+        """写入一条记录（生产者线程）；按溢出策略被丢弃时返回 False。"""
+        head = self._head
+        used = head - self._tail
+        if used >= self.capacity or (kind == KIND_MOVE and used >= self.move_limit):
+            if kind == KIND_MOVE:
+                self.dropped_moves += 1
+            else:
+                self.dropped_clicks += 1
+            return False
+        i = head & self._mask
+        self._t[i] = t
+        self._x[i] = int(x)
+        self._y[i] = int(y)
+        self._kind[i] = kind
+        self.pushed += 1
+        # 字段写完后再发布写指针
+        self._head = head + 1
+        return True
+
+    def drain(self) -> list:
+        """取出全部待处理记录（消费者线程）。
+
+        连续的移动记录中，与上一条保留点距离小于 ``coalesce_px`` 的会被合并，
+        每段连续移动的最后一条总会保留。
+        """
+        tail = self._tail
+        head = self._head
+        if head == tail:
+            return []
+        self.high_water = max(self.high_water, head - tail)
+        mask = self._mask
+        min_dist = self.coalesce_px
+        out = []
+        last_move = None
+        for seq in range(tail, head):
+            i = seq & mask
+            kind = self._kind[i]
+            rec = (self._t[i], self._x[i], self._y[i], kind)
+            if kind == KIND_MOVE:
+                if (last_move is not None and seq + 1 < head and self._kind[(seq + 1) & mask] == KIND_MOVE
+                        and math.hypot(rec[1] - last_move[1], rec[2] - last_move[2]) < min_dist):
+                    self.coalesced += 1
+                    continue
+                last_move = rec
+            else:
+                last_move = None
+            out.append(rec)
+        self._tail = head
+        self.drained += len(out)
+        return out
+
+    def stats(self) -> dict:
+        return {
+            'pushed': self.pushed,
+            'drained': self.drained,
+            'coalesced': self.coalesced,
+            'droppedMoves': self.dropped_moves,
+            'droppedClicks': self.dropped_clicks,
+            'pending': len(self),
+            'highWater': self.high_water,
+        }
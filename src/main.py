@@ -1,11 +1,19 @@
+import copy
 import json
 import sys
 import os
 import logging
+import time
 from PySide6 import QtCore, QtGui, QtWidgets
 from pynput import mouse
 
 from effects import EffectLayer
+from gl_renderer import prefer_software_opengl
+from spec import compile_spec, SpecError, EMITTERS
+from metrics import Metrics
+from tracing import tracer, traced
+from session import SessionRecorder, BUTTON_CODES, BUTTON_NONE
+from input_queue import KIND_PRESS, KIND_RELEASE, KIND_MOVE
 from win_util import set_window_click_through, WM_HOTKEY, RegisterHotKey, UnregisterHotKey, parse_hotkey_to_vk
 
 # logging 配置：默认 WARNING 以上，允许通过 config.json 的 debug 字段开启 DEBUG
@@ -73,11 +81,20 @@ class SettingsWindow(QtWidgets.QWidget):
         self.eff_enabled = QtWidgets.QCheckBox("启用点击特效")
         self.eff_enabled.setChecked(config['effects'].get('enabled', True))
         eff_layout.addRow(self.eff_enabled)
-        self.eff_performance = QtWidgets.QCheckBox("性能优化模式（降低特效质量以提升性能）")
-        self.eff_performance.setChecked(config['effects'].get('performanceMode', True))
-        eff_layout.addRow(self.eff_performance)
+        self.eff_adaptive = QtWidgets.QCheckBox("自适应画质（按实际帧耗时自动调节特效质量）")
+        self.eff_adaptive.setChecked(config['effects'].get('adaptiveQuality', True))
+        eff_layout.addRow(self.eff_adaptive)
+        self.eff_frame_budget = QtWidgets.QDoubleSpinBox()
+        self.eff_frame_budget.setRange(1.0, 33.0)
+        self.eff_frame_budget.setSingleStep(0.5)
+        self.eff_frame_budget.setValue(float(config['effects'].get('frameBudgetMs', 8.0)))
+        eff_layout.addRow("帧预算(ms)", self.eff_frame_budget)
         self.eff_types = {}
-        type_defs = [("heart", "爱心"), ("star", "星星"), ("ripple", "小花"), ("confetti", "彩纸"), ("coin", "钱币")]
+        # 可选类型来自内置与 effects.emitters 中的发射定义
+        try:
+            type_defs = list(compile_spec(config).catalog)
+        except SpecError:
+            type_defs = [(k, em.label) for k, em in EMITTERS.items()]
         default_types = [k for k, _ in type_defs]
         type_layout = QtWidgets.QHBoxLayout()
         for key, label in type_defs:
@@ -104,6 +121,14 @@ class SettingsWindow(QtWidgets.QWidget):
         self.trail_enabled = QtWidgets.QCheckBox("启用拖拽轨迹")
         self.trail_enabled.setChecked(config['effects'].get('trailEnabled', True))
         trail_layout.addRow(self.trail_enabled)
+        self.trail_mode = QtWidgets.QComboBox()
+        self.trail_mode.addItem("光点粒子", "particles")
+        self.trail_mode.addItem("丝带", "ribbon")
+        self.trail_mode.setCurrentIndex(max(0, self.trail_mode.findData(config['effects'].get('trailMode', 'particles'))))
+        trail_layout.addRow("轨迹样式", self.trail_mode)
+        self.ribbon_sparkles = QtWidgets.QCheckBox("丝带上点缀小花")
+        self.ribbon_sparkles.setChecked(config['effects'].get('ribbonSparkles', True))
+        trail_layout.addRow(self.ribbon_sparkles)
         self.trail_density = QtWidgets.QSpinBox()
         self.trail_density.setRange(1, 20)
         self.trail_density.setValue(config['effects'].get('trailDensity', 2))
@@ -113,10 +138,15 @@ class SettingsWindow(QtWidgets.QWidget):
         self.trail_life.setSingleStep(0.1)
         self.trail_life.setValue(float(config['effects'].get('trailLife', 0.5)))
         trail_layout.addRow("光点寿命(s)", self.trail_life)
-        self.trail_min_interval = QtWidgets.QSpinBox()
-        self.trail_min_interval.setRange(1, 50)
-        self.trail_min_interval.setValue(int(config['effects'].get('trailMinIntervalMs', 18)))
-        trail_layout.addRow("最小间隔(ms)", self.trail_min_interval)
+        self.trail_spacing = QtWidgets.QSpinBox()
+        self.trail_spacing.setRange(2, 60)
+        self.trail_spacing.setValue(int(config['effects'].get('trailSpacing', 8)))
+        trail_layout.addRow("光点间距(px)", self.trail_spacing)
+        self.trail_interp = QtWidgets.QComboBox()
+        self.trail_interp.addItem("平滑曲线", "catmull-rom")
+        self.trail_interp.addItem("直线", "linear")
+        self.trail_interp.setCurrentIndex(max(0, self.trail_interp.findData(config['effects'].get('trailInterpolation', 'catmull-rom'))))
+        trail_layout.addRow("路径插值", self.trail_interp)
         self.trail_size_min = QtWidgets.QSpinBox(); self.trail_size_min.setRange(1, 50)
         self.trail_size_max = QtWidgets.QSpinBox(); self.trail_size_max.setRange(1, 80)
         size_rng = config['effects'].get('trailSizeRange', [5, 10])
@@ -145,6 +175,10 @@ class SettingsWindow(QtWidgets.QWidget):
         hot_layout.addRow("特效开关", self.hk_toggle)
         self.hk_quit = QtWidgets.QLineEdit(config['hotkeys'].get('quit', 'ctrl+alt+q'))
         hot_layout.addRow("退出程序", self.hk_quit)
+        self.hk_hud = QtWidgets.QLineEdit(config['hotkeys'].get('toggleHud', 'ctrl+alt+p'))
+        hot_layout.addRow("性能面板", self.hk_hud)
+        self.hk_trace = QtWidgets.QLineEdit(config['hotkeys'].get('dumpTrace', 'ctrl+alt+t'))
+        hot_layout.addRow("导出追踪", self.hk_trace)
         layout.addWidget(group_hotkey)
 
         # 保存按钮
@@ -157,33 +191,78 @@ class SettingsWindow(QtWidgets.QWidget):
     # 壁纸选择功能已移除
 
     def save(self):
-    # 更新配置（壁纸功能已移除）
-        self.config['effects']['enabled'] = self.eff_enabled.isChecked()
-        self.config['effects']['performanceMode'] = self.eff_performance.isChecked()
-        self.config['effects']['types'] = [t for t, cb in self.eff_types.items() if cb.isChecked()]
-        self.config['effects']['density'] = self.eff_density.value()
-        self.config['effects']['duration'] = self.eff_duration.value()
-        self.config['effects']['colors'] = [c.strip() for c in self.eff_colors.text().split(",") if c.strip()]
+        # 在副本上更新配置（壁纸功能已移除），校验通过后才写回共享配置与文件
+        config = copy.deepcopy(self.config)
+        config['effects']['enabled'] = self.eff_enabled.isChecked()
+        config['effects'].pop('performanceMode', None)
+        config['effects']['adaptiveQuality'] = self.eff_adaptive.isChecked()
+        config['effects']['frameBudgetMs'] = float(self.eff_frame_budget.value())
+        config['effects']['types'] = [t for t, cb in self.eff_types.items() if cb.isChecked()]
+        config['effects']['density'] = self.eff_density.value()
+        config['effects']['duration'] = self.eff_duration.value()
+        config['effects']['colors'] = [c.strip() for c in self.eff_colors.text().split(",") if c.strip()]
         # 拖拽轨迹参数
-        self.config['effects']['trailEnabled'] = self.trail_enabled.isChecked()
-        self.config['effects']['trailDensity'] = self.trail_density.value()
-        self.config['effects']['trailLife'] = float(self.trail_life.value())
-        self.config['effects']['trailMinIntervalMs'] = self.trail_min_interval.value()
-        self.config['effects']['trailSizeRange'] = [self.trail_size_min.value(), self.trail_size_max.value()]
-        self.config['effects']['trailFlowerChance'] = float(self.trail_flower_chance.value())
-        self.config['effects']['trailFlowerSizeRange'] = [self.trail_flower_min.value(), self.trail_flower_max.value()]
-        self.config['hotkeys']['toggleEffects'] = self.hk_toggle.text()
-        self.config['hotkeys']['quit'] = self.hk_quit.text()
+        config['effects']['trailEnabled'] = self.trail_enabled.isChecked()
+        config['effects']['trailMode'] = self.trail_mode.currentData()
+        config['effects']['ribbonSparkles'] = self.ribbon_sparkles.isChecked()
+        config['effects']['trailDensity'] = self.trail_density.value()
+        config['effects']['trailLife'] = float(self.trail_life.value())
+        config['effects'].pop('trailMinIntervalMs', None)
+        config['effects']['trailSpacing'] = self.trail_spacing.value()
+        config['effects']['trailInterpolation'] = self.trail_interp.currentData()
+        config['effects']['trailSizeRange'] = [self.trail_size_min.value(), self.trail_size_max.value()]
+        config['effects']['trailFlowerChance'] = float(self.trail_flower_chance.value())
+        config['effects']['trailFlowerSizeRange'] = [self.trail_flower_min.value(), self.trail_flower_max.value()]
+        config['hotkeys']['toggleEffects'] = self.hk_toggle.text()
+        config['hotkeys']['quit'] = self.hk_quit.text()
+        config['hotkeys']['toggleHud'] = self.hk_hud.text()
+        config['hotkeys']['dumpTrace'] = self.hk_trace.text()
+        # 先校验特效配置，无效时提示具体问题且不写入文件
+        try:
+            compile_spec(config)
+        except SpecError as e:
+            QtWidgets.QMessageBox.warning(self, "设置", str(e))
+            return
         # 保存到 config.json
-        exe_dir = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.dirname(__file__))
-        cfg_path = os.path.join(exe_dir, 'config.json')
+        cfg_path = os.path.join(_app_dir(), 'config.json')
         with open(cfg_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        # 原地替换：App 与设置窗口共用同一个配置字典
+        self.config.clear()
+        self.config.update(config)
         QtWidgets.QMessageBox.information(self, "设置", "设置已保存并应用！")
         self.on_save()
         self.close()
 
 
+def _app_dir() -> str:
+    """运行目录：打包后为可执行文件所在目录，源码运行时为仓库根目录。"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(__file__))
+
+
+def _config_path() -> str:
+    """配置文件路径：优先使用可执行文件所在目录，其次 _MEIPASS，最后源码根目录。"""
+    exe_dir = _app_dir()
+    cfg_path = os.path.join(exe_dir, 'config.json')
+    if not os.path.exists(cfg_path):
+        base_dir = getattr(sys, '_MEIPASS', exe_dir)
+        cfg_path = os.path.join(base_dir, 'config.json')
+    return cfg_path
+
+
+def _configure_opengl():
+    """OpenGL 后端开启 openglSoftware 时改用软件渲染（Mesa llvmpipe），需在 QApplication 创建前设置。"""
+    try:
+        with open(_config_path(), 'r', encoding='utf-8') as f:
+            cfg = json.load(f).get('effects', {})
+    except Exception:
+        return
+    if cfg.get('renderBackend') == 'opengl' and cfg.get('openglSoftware', False):
+        prefer_software_opengl()
+
+
 class App(QtWidgets.QApplication):
     def __init__(self, argv):
         super().__init__(argv)
@@ -191,16 +270,7 @@ class App(QtWidgets.QApplication):
         QtCore.QCoreApplication.setApplicationName("MouseFX")
         self.setQuitOnLastWindowClosed(False)
 
-        # 加载配置：优先使用可执行文件所在目录，其次 _MEIPASS，最后源码根目录
-        if getattr(sys, 'frozen', False):
-            exe_dir = os.path.dirname(sys.executable)
-        else:
-            exe_dir = os.path.dirname(os.path.dirname(__file__))
-        cfg_path = os.path.join(exe_dir, 'config.json')
-        if not os.path.exists(cfg_path):
-            base_dir = getattr(sys, '_MEIPASS', exe_dir)
-            cfg_path = os.path.join(base_dir, 'config.json')
-        with open(cfg_path, 'r', encoding='utf-8') as f:
+        with open(_config_path(), 'r', encoding='utf-8') as f:
             self.config = json.load(f)
 
         # 应用通用配置（应用名 / 图标 / AppUserModelID）
@@ -237,6 +307,10 @@ class App(QtWidgets.QApplication):
         # 特效层
         self.overlay = EffectLayer(self.config)
         self.overlay.show()
+        # 输入会话录制（供回放复现真实负载）；需在监听线程启动前就绪
+        self.recorder = None
+        if self.config.get('recording', {}).get('enabled', False):
+            self.start_recording()
         # 全局鼠标监听（点击 + 移动）
         self._left_pressed = False
         self.listener = mouse.Listener(on_click=self.on_click, on_move=self.on_move)
@@ -252,6 +326,86 @@ class App(QtWidgets.QApplication):
         # 系统托盘
         self._init_tray()
 
+        # 飞行记录器：持续记录最近的耗时区间，卡顿时通过热键或托盘导出
+        self._configure_tracing()
+
+        # 定期把性能指标快照写入 JSON 文件，便于用户反馈卡顿时附上本机数据
+        self._metrics_timer = QtCore.QTimer(self)
+        self._metrics_timer.timeout.connect(self._write_metrics_snapshot)
+        self._configure_metrics_snapshot()
+
+    def _configure_tracing(self):
+        cfg = self.config.get('tracing', {})
+        try:
+            capacity = int(cfg.get('capacity', 16384))
+        except (TypeError, ValueError):
+            capacity = 16384
+        tracer.configure(capacity, cfg.get('enabled', True))
+
+    def start_recording(self):
+        """开始把收到的鼠标输入录制到 recording.dir 下按时间命名的文件。"""
+        if self.recorder is not None:
+            return
+        folder = self.config.get('recording', {}).get('dir', 'recordings')
+        if not os.path.isabs(folder):
+            folder = os.path.join(_app_dir(), folder)
+        recorder = SessionRecorder(os.path.join(folder, time.strftime('session-%Y%m%d-%H%M%S.mfxr')))
+        try:
+            recorder.start()
+        except Exception:
+            logger.exception("开始录制失败")
+            return
+        self.recorder = recorder
+        tracer.instant('recording:start')
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.stop()
+            tracer.instant('recording:stop')
+
+    def _tray_toggle_recording(self, checked: bool):
+        if checked:
+            self.start_recording()
+        else:
+            self.stop_recording()
+        act = getattr(self, "_tray_actions", {}).get("record")
+        if act:
+            act.setChecked(self.recorder is not None)
+
+    def dump_trace(self):
+        """把飞行记录器中的最近区间导出为 trace JSON（运行目录下按时间命名）。"""
+        path = os.path.join(_app_dir(), time.strftime('trace-%Y%m%d-%H%M%S.json'))
+        try:
+            count = tracer.dump(path)
+        except Exception:
+            logger.exception("导出性能追踪失败")
+            return
+        tray = getattr(self, 'tray', None)
+        if tray is not None:
+            tray.showMessage("性能追踪", f"已导出 {count} 个事件：{path}")
+
+    def _metrics_snapshot_path(self) -> str:
+        path = self.config.get('metrics', {}).get('snapshotFile', 'metrics.json')
+        if not path or os.path.isabs(path):
+            return path
+        return os.path.join(_app_dir(), path)
+
+    def _configure_metrics_snapshot(self):
+        try:
+            interval = float(self.config.get('metrics', {}).get('snapshotIntervalSec', 60))
+        except (TypeError, ValueError):
+            interval = 60.0
+        self._metrics_timer.stop()
+        # 间隔为 0 或未配置文件名时关闭
+        if interval > 0 and self._metrics_snapshot_path():
+            self._metrics_timer.start(int(interval * 1000))
+
+    def _write_metrics_snapshot(self):
+        path = self._metrics_snapshot_path()
+        if path:
+            Metrics.write(path, self.overlay.metrics_snapshot())
+
     def _init_tray(self):
         if not QtWidgets.QSystemTrayIcon.isSystemTrayAvailable():
             logger.warning("系统托盘不可用，托盘功能已禁用")
@@ -264,12 +418,18 @@ class App(QtWidgets.QApplication):
         
         act_toggle.setCheckable(True)
         act_toggle.setChecked(self.overlay.visible_effects)
+        act_trace = menu.addAction("导出性能追踪")
+        act_trace.triggered.connect(self.dump_trace)
+        act_record = menu.addAction("录制鼠标会话")
+        act_record.setCheckable(True)
+        act_record.setChecked(self.recorder is not None)
+        act_record.triggered.connect(self._tray_toggle_recording)
         menu.addSeparator()
         act_quit = menu.addAction("退出")
         act_open.triggered.connect(self.open_settings)
         act_toggle.triggered.connect(self._tray_toggle_effects)
         act_quit.triggered.connect(self.quit)
-        self._tray_actions = {"toggle": act_toggle}
+        self._tray_actions = {"toggle": act_toggle, "record": act_record}
         self.tray.setContextMenu(menu)
         self.tray.activated.connect(self._on_tray_activated)
         try:
@@ -283,7 +443,7 @@ class App(QtWidgets.QApplication):
         icon_cfg = self.config.get('app', {}).get('icon')
         bases = []
         # 运行目录与源码目录作为基准
-        bases.append(os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.dirname(__file__)))
+        bases.append(_app_dir())
         if icon_cfg:
             # 若为绝对路径
             if os.path.isabs(icon_cfg) and os.path.exists(icon_cfg):
@@ -350,6 +510,8 @@ class App(QtWidgets.QApplication):
         self.overlay.update_config(self.config)
         self.overlay.visible_effects = self.config['effects'].get('enabled', True)
         self._sync_tray_state()
+        self._configure_metrics_snapshot()
+        self._configure_tracing()
         # 重新注册热键
         for hid in getattr(self, '_hotkey_ids', {}).keys():
             try:
@@ -369,54 +531,61 @@ class App(QtWidgets.QApplication):
                 self._hotkey_ids[hid] = name
                 hid += 1
 
+    # 以下两个回调运行在 pynput 监听线程：只写入输入队列并唤醒特效层，不触碰任何 Qt 对象状态
+    @traced('on_click')
     def on_click(self, x, y, button, pressed):
-        if not pressed:
-            # 松开时清理按下状态
-            try:
-                is_left = (button.name == 'left')
-            except Exception:
-                is_left = (str(button) == 'Button.left')
-            if is_left:
-                self._left_pressed = False
-            return
-        try:
-            logger.debug("on_click pressed at %s,%s button=%s pressed=%s", x, y, button, pressed)
-        except Exception as e:
-            logger.exception("on_click print error: %s", e)
-        # 左键
+        # 录制全部按键，回放时再按左键规则过滤
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record(KIND_PRESS if pressed else KIND_RELEASE, x, y,
+                            BUTTON_CODES.get(getattr(button, 'name', ''), BUTTON_NONE))
         try:
             is_left = (button.name == 'left')
         except Exception:
             is_left = (str(button) == 'Button.left')
-        if is_left:
-            self._left_pressed = True
-            # 使用 Qt 的全局鼠标位置（逻辑坐标），避免与 pynput 的物理像素产生缩放偏差
-            qpos = QtGui.QCursor.pos()
-            logger.debug("detected left click -> spawning effects at %s,%s (qt=%s,%s)", x, y, qpos.x(), qpos.y())
-            self.overlay.spawn(int(qpos.x()), int(qpos.y()))
-
+        if not is_left:
+            return
+        # 坐标为 pynput 的物理像素，由 GUI 线程换算为 Qt 逻辑坐标
+        self._left_pressed = pressed
+        self.overlay.input_queue.push(time.perf_counter(), x, y, KIND_PRESS if pressed else KIND_RELEASE)
+        if pressed:
+            logger.debug("on_click pressed at %s,%s button=%s", x, y, button)
+            self.overlay.wake()
+
+    @traced('on_move')
     def on_move(self, x, y):
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record(KIND_MOVE, x, y)
         # 左键长按滑动轨迹特效
-        if getattr(self, '_left_pressed', False):
-            # 用 Qt 逻辑坐标保证与绘制坐标系一致
-            qpos = QtGui.QCursor.pos()
-            self.overlay.spawn_trail(int(qpos.x()), int(qpos.y()))
+        if self._left_pressed:
+            self.overlay.input_queue.push(time.perf_counter(), x, y, KIND_MOVE)
+            self.overlay.wake()
 
+    @traced('handle_hotkey')
     def handle_hotkey(self, name: str):
         if name == 'toggleEffects':
             self.overlay.toggle()
             self._sync_tray_state()
+        elif name == 'toggleHud':
+            self.overlay.toggle_hud()
+        elif name == 'dumpTrace':
+            self.dump_trace()
         elif name == 'quit':
             self.quit()
 
     def quit(self):
-        # 清理资源
+        # 清理资源：退出前留一份最终的性能快照
+        if getattr(self, '_metrics_timer', None) is not None and self._metrics_timer.isActive():
+            self._write_metrics_snapshot()
+        self.stop_recording()
         # 反注册
         for hid in getattr(self, '_hotkey_ids', {}).keys():
             try:
                 UnregisterHotKey(0, hid)
             except Exception:
                 pass
+        self.overlay.shutdown()
         super().quit()
 
 
@@ -432,10 +601,12 @@ class _NativeEventFilter(QtCore.QAbstractNativeEventFilter):
         import ctypes
         msg = ctypes.wintypes.MSG.from_address(int(message))
         if msg.message == WM_HOTKEY:
+            started = tracer.begin()
             hid = msg.wParam
             name = self.app._hotkey_ids.get(hid)
             if name:
                 QtCore.QTimer.singleShot(0, lambda n=name: self.app.handle_hotkey(n))
+            tracer.end('native_hotkey', started)
         return False, 0
 
 
@@ -450,5 +621,6 @@ if __name__ == '__main__':
     except Exception:
         pass
     _enable_per_monitor_dpi_awareness()
+    _configure_opengl()
     app = App(sys.argv)
     sys.exit(app.exec())
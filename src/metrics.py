@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import time
+import numpy as np
+from PySide6 import QtCore, QtGui, QtWidgets
+
+logger = logging.getLogger(__name__)
+
+
+class RollingHistogram:
+    """定长滚动窗口：保留最近 size 个样本，统计时求均值与分位数。"""
+
+    def __init__(self, size: int = 600):
+        self._data = np.zeros(max(1, int(size)), dtype=np.float64)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % len(self._data)
+        self._count = min(self._count + 1, len(self._data))
+
+    def summary(self) -> dict:
+        if not self._count:
+            return {'count': 0}
+        data = self._data[:self._count]
+        p50, p95, p99 = np.percentile(data, (50, 95, 99))
+        return {
+            'count': self._count,
+            'mean': round(float(data.mean()), 3),
+            'p50': round(float(p50), 3),
+            'p95': round(float(p95), 3),
+            'p99': round(float(p99), 3),
+            'max': round(float(data.max()), 3),
+        }
+
+
+class Metrics:
+    """特效层运行指标：tick/paint 耗时、帧间隔抖动与存活粒子数的滚动直方图。
+
+    累计计数（发射、淘汰、丢弃的输入等）由各自模块维护，生成快照时一并汇总。
+    """
+
+    def __init__(self, window: int = 600):
+        self.tick_ms = RollingHistogram(window)
+        self.paint_ms = RollingHistogram(window)
+        self.interval_ms = RollingHistogram(window)
+        self.jitter_ms = RollingHistogram(window)
+        self.alive = RollingHistogram(window)
+        self.frames = 0
+        self.started = time.time()
+
+    def record_tick(self, tick_ms: float, interval_ms: float, expected_ms: float, alive: int):
+        self.frames += 1
+        self.tick_ms.add(tick_ms)
+        self.interval_ms.add(interval_ms)
+        self.jitter_ms.add(abs(interval_ms - expected_ms))
+        self.alive.add(alive)
+
+    def record_paint(self, ms: float):
+        self.paint_ms.add(ms)
+
+    def snapshot(self, counters: dict = None) -> dict:
+        snap = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'uptimeSec': round(time.time() - self.started, 1),
+            'frames': self.frames,
+            'tickMs': self.tick_ms.summary(),
+            'paintMs': self.paint_ms.summary(),
+            'frameIntervalMs': self.interval_ms.summary(),
+            'jitterMs': self.jitter_ms.summary(),
+            'alive': self.alive.summary(),
+        }
+        if counters:
+            snap.update(counters)
+        return snap
+
+    @staticmethod
+    def write(path: str, snapshot: dict):
+        """先写临时文件再替换，避免读取方看到写了一半的 JSON。"""
+        try:
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        except Exception:
+            logger.exception("写入性能快照失败: %s", path)
+
+
+class HudWindow(QtWidgets.QWidget):
+    """屏幕左上角的性能面板：点击穿透，定时从 source() 取快照刷新。"""
+
+    REFRESH_MS = 250
+
+    def __init__(self, source):
+        super().__init__(None, QtCore.Qt.FramelessWindowHint | QtCore.Qt.Tool | QtCore.Qt.WindowStaysOnTopHint)
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground, True)
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents, True)
+        self.setAttribute(QtCore.Qt.WA_ShowWithoutActivating, True)
+        try:
+            self.setWindowFlag(QtCore.Qt.WindowTransparentForInput, True)
+        except Exception:
+            pass
+        self.source = source
+        self._lines = []
+        self._font = QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(self.REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._timer.stop()
+
+    @staticmethod
+    def format_lines(snap: dict) -> list:
+        def hist(name, key, unit=''):
+            h = snap.get(key, {})
+            if not h.get('count'):
+                return f"{name:<7} -"
+            return f"{name:<7} avg {h['mean']:7.2f}{unit}  p95 {h['p95']:7.2f}{unit}  max {h['max']:7.2f}{unit}"
+
+        inp = snap.get('input', {})
+        return [
+            hist('tick', 'tickMs', 'ms'),
+            hist('paint', 'paintMs', 'ms'),
+            hist('jitter', 'jitterMs', 'ms'),
+            hist('alive', 'alive'),
+            f"spawned {snap.get('spawned', 0)}  evicted {snap.get('evicted', 0)}",
+            f"input   dropped {inp.get('droppedMoves', 0)}/{inp.get('droppedClicks', 0)}  coalesced {inp.get('coalesced', 0)}",
+            f"quality level {snap.get('qualityLevel', 0)}  cost {snap.get('frameCostMs', 0.0):.2f}ms",
+            f"state   {'idle' if snap.get('idle') else 'running'}",
+        ]
+
+    def refresh(self):
+        try:
+            self._lines = self.format_lines(self.source())
+        except Exception:
+            logger.exception("刷新性能面板失败")
+            return
+        fm = QtGui.QFontMetrics(self._font)
+        w = max(fm.horizontalAdvance(line) for line in self._lines) + 20
+        h = fm.height() * len(self._lines) + 16
+        screen = QtGui.QGuiApplication.primaryScreen()
+        origin = screen.availableGeometry().topLeft() if screen is not None else QtCore.QPoint(0, 0)
+        self.setGeometry(origin.x() + 16, origin.y() + 16, w, h)
+        self.update()
+
+    def paintEvent(self, ev: QtGui.QPaintEvent):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(QtGui.QColor(0, 0, 0, 170))
+        painter.drawRoundedRect(QtCore.QRectF(self.rect()), 6, 6)
+        painter.setFont(self._font)
+        painter.setPen(QtGui.QColor('#E0F7FA'))
+        fm = painter.fontMetrics()
+        y = 8 + fm.ascent()
+        for line in self._lines:
+            painter.drawText(10, y, line)
+            y += fm.height()
+        painter.end()
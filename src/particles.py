@@ -0,0 +1,239 @@
+import hashlib
+import numpy as np
+from PySide6 import QtGui
+
+# 形状编号（与 paintEvent 中的分支一一对应）
+SHAPE_TEXT = 0
+SHAPE_CIRCLE = 1
+SHAPE_STAR = 2
+SHAPE_FLOWER = 3
+SHAPE_TRAIL = 4
+SHAPE_RECT = 5
+SHAPE_NAMES = ('text', 'circle', 'star', 'flower', 'trail', 'rect')
+
+# 列定义：名称 -> (每行宽度, dtype)
+_FIELDS = {
+    'pos': (2, np.float32),
+    'prev': (2, np.float32),  # 上一步的位置，供固定步长模式绘制时插值
+    'vel': (2, np.float32),
+    'age': (1, np.float32),
+    'life': (1, np.float32),
+    'size': (1, np.float32),
+    'rotation': (1, np.float32),
+    'spin': (1, np.float32),
+    'gravity': (1, np.float32),  # 每个粒子的竖直加速度与阻力（由发射定义决定）
+    'drag': (1, np.float32),
+    'opacity': (1, np.float32),
+    'shape': (1, np.int8),
+    'color': (1, np.int16),
+    'glyph': (1, np.int16),
+    'group': (1, np.int32),
+    # 发射记录（解析模式只读这些列，按当前时刻直接求出位置/角度/透明度）
+    'origin': (2, np.float32),
+    'rot0': (1, np.float32),
+    'decay': (1, np.float32),  # 连续阻力系数 λ = -ln(drag) / DRAG_STEP（每秒）
+    'birth': (1, np.float64),  # 发射时的模拟时钟（秒）
+}
+
+
+class ParticleStore:
+    """结构化数组（SoA）粒子存储。
+
+    每个字段是一列预分配的 NumPy 数组，前 ``count`` 行为存活粒子；
+    重力、阻力、淡出与死亡清理都按整列批量完成，不再逐个对象更新。
+    颜色与文字以调色板/字形表下标存放，绘制时再查表。
+    ``group`` 列记录粒子所属的爆发簇或拖拽笔画，用于按簇求包围盒。
+
+    两种推进方式：``update`` 逐步积分（阻力按每 10ms 一步施加）；``evaluate`` 由发射记录
+    与当前时刻按闭式解直接求值，不依赖步长，推进时除了时钟外不修改任何状态。
+    """
+
+    GRAVITY = 300.0
+    DRAG = 0.98  # 每 DRAG_STEP 秒的速度保留比例
+    DRAG_STEP = 0.01
+    DEATH_OPACITY = 0.05  # 与旧实现一致：透明度低于此值即视为死亡
+    MAX_DECAY = 1.0e4  # drag 为 0 时的 λ 上限，避免出现无穷大
+
+    def __init__(self, capacity: int = 512):
+        self.count = 0
+        self.capacity = 0
+        self.palette = []  # QColor 列表，下标即 color 列的值
+        self._palette_ids = {}
+        self.glyphs = []  # 文本符号列表，下标即 glyph 列的值
+        self._glyph_ids = {}
+        self.spawned = 0  # 累计发射粒子数
+        self.time = 0.0  # 模拟时钟（秒），由特效层推进，写入新粒子的 birth 列
+        self._resize(max(16, int(capacity)))
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    # ---- 存储管理 ----
+    def _resize(self, capacity: int):
+        for name, (width, dtype) in _FIELDS.items():
+            shape = (capacity, width) if width > 1 else (capacity,)
+            arr = np.zeros(shape, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None and self.count:
+                arr[:self.count] = old[:self.count]
+            setattr(self, name, arr)
+        self.capacity = capacity
+
+    def reserve(self, n: int) -> slice:
+        """为 n 个新粒子预留行，返回对应切片；调用方负责写满该切片的每一列。"""
+        need = self.count + n
+        if need > self.capacity:
+            cap = self.capacity
+            while cap < need:
+                cap *= 2
+            self._resize(cap)
+        sl = slice(self.count, need)
+        self.count = need
+        return sl
+
+    def clear(self):
+        self.count = 0
+
+    def color_ids(self, colors) -> np.ndarray:
+        """把 QColor 列表登记到调色板，返回对应下标数组。"""
+        ids = []
+        for c in colors:
+            key = c.rgba()
+            idx = self._palette_ids.get(key)
+            if idx is None:
+                idx = len(self.palette)
+                self.palette.append(QtGui.QColor(c))
+                self._palette_ids[key] = idx
+            ids.append(idx)
+        return np.asarray(ids, dtype=np.int16)
+
+    def glyph_ids(self, texts) -> np.ndarray:
+        ids = []
+        for t in texts:
+            idx = self._glyph_ids.get(t)
+            if idx is None:
+                idx = len(self.glyphs)
+                self.glyphs.append(t)
+                self._glyph_ids[t] = idx
+            ids.append(idx)
+        return np.asarray(ids, dtype=np.int16)
+
+    # ---- 发射 ----
+    def emit(self, n: int, x, y, vx, vy, life, size, shape: int, color,
+             glyph=-1, opacity=1.0, rotation=0.0, spin=0.0, group=0, gravity=GRAVITY, drag=DRAG) -> slice:
+        """批量追加 n 个粒子；标量参数会广播到整批。"""
+        n = int(n)
+        if n <= 0:
+            return slice(self.count, self.count)
+        sl = self.reserve(n)
+        self.spawned += n
+        self.pos[sl, 0] = x
+        self.pos[sl, 1] = y
+        self.prev[sl] = self.pos[sl]
+        self.vel[sl, 0] = vx
+        self.vel[sl, 1] = vy
+        self.age[sl] = 0.0
+        self.life[sl] = life
+        self.size[sl] = size
+        self.rotation[sl] = rotation
+        self.spin[sl] = spin
+        self.opacity[sl] = opacity
+        self.shape[sl] = shape
+        self.color[sl] = color
+        self.glyph[sl] = glyph
+        self.group[sl] = group
+        self.gravity[sl] = gravity
+        self.drag[sl] = drag
+        self.record_spawn(sl)
+        return sl
+
+    def record_spawn(self, sl: slice):
+        """新行的其余列写好后调用：保存发射时的位置与角度、发射时刻，并换算连续阻力系数。"""
+        self.origin[sl] = self.pos[sl]
+        self.rot0[sl] = self.rotation[sl]
+        self.birth[sl] = self.time
+        decay = self.decay[sl]
+        with np.errstate(divide='ignore'):
+            np.log(self.drag[sl], out=decay)
+        decay *= -1.0 / self.DRAG_STEP
+        np.minimum(decay, self.MAX_DECAY, out=decay)
+
+    # ---- 模拟 ----
+    def update(self, dt: float):
+        """整列推进一步：重力、阻力、位移、淡出与旋转。"""
+        n = self.count
+        if n == 0:
+            return
+        self.prev[:n] = self.pos[:n]
+        vel = self.vel[:n]
+        vel[:, 1] += self.gravity[:n] * dt
+        # 阻力按 10ms 一步定义；固定步长正好 10ms 时省去幂运算
+        drag = self.drag[:n]
+        if abs(dt - self.DRAG_STEP) > 1e-9:
+            drag = drag ** np.float32(dt / self.DRAG_STEP)
+        vel *= drag[:, None]
+        self.pos[:n] += vel * dt
+        age = self.age[:n]
+        age += dt
+        t = np.minimum(age / self.life[:n], 1.0)
+        np.subtract(1.0, t, out=self.opacity[:n])
+        self.rotation[:n] += self.spin[:n] * dt
+
+    def evaluate(self, t: float):
+        """按闭式解求出时刻 t 的状态，写入 pos/age/opacity/rotation 列。
+
+        连续阻力下 dv/dt = g − λv，对发射速度 v0、年龄 a：
+            x = x0 + v0x·k,  y = y0 + v0y·k + g·(a − k)/λ,  k = (1 − e^(−λa))/λ
+        λ 趋近 0 时 k → a、重力项 → g·a²/2。结果与步长无关，可在任意时刻求值。
+        """
+        n = self.count
+        if n == 0:
+            return
+        age = self.age[:n]
+        np.subtract(t, self.birth[:n], out=age, casting='same_kind')
+        lam = self.decay[:n]
+        g = self.gravity[:n]
+        small = lam < 1e-4
+        lam_s = np.where(small, np.float32(1.0), lam)
+        k = -np.expm1(-lam_s * age) / lam_s
+        fall = g * (age - k) / lam_s
+        if small.any():
+            a = age[small]
+            k[small] = a
+            fall[small] = 0.5 * g[small] * a * a
+        pos = self.pos[:n]
+        np.multiply(self.vel[:n], k[:, None], out=pos)
+        pos += self.origin[:n]
+        pos[:, 1] += fall
+        self.prev[:n] = pos
+        np.subtract(1.0, np.minimum(age / self.life[:n], 1.0), out=self.opacity[:n])
+        np.multiply(self.spin[:n], age, out=self.rotation[:n])
+        self.rotation[:n] += self.rot0[:n]
+
+    def alive_mask(self) -> np.ndarray:
+        n = self.count
+        return (self.age[:n] < self.life[:n]) & (self.opacity[:n] > self.DEATH_OPACITY)
+
+    def compact(self, keep: np.ndarray = None):
+        """按布尔掩码一次性移除死亡粒子（默认使用 alive_mask）。"""
+        if keep is None:
+            keep = self.alive_mask()
+        if keep.all():
+            return
+        idx = np.flatnonzero(keep)
+        k = idx.size
+        for name in _FIELDS:
+            arr = getattr(self, name)
+            arr[:k] = arr[idx]
+        self.count = k
+
+    def digest(self) -> str:
+        """存活粒子全部列的摘要，用于比对两次回放/基准运行的模拟状态是否一致。"""
+        h = hashlib.sha1()
+        n = self.count
+        for name in _FIELDS:
+            h.update(np.ascontiguousarray(getattr(self, name)[:n]).tobytes())
+        return h.hexdigest()
@@ -0,0 +1,274 @@
+"""鼠标输入会话的录制与回放。
+
+录制文件为紧凑的二进制格式：文件头之后是定长记录
+(相对时间秒 float64, 物理 x int32, 物理 y int32, 类型 uint8, 按键 uint8)，
+类型沿用 input_queue 的 KIND_*。回放时按 App 的规则（只有左键触发特效，
+按住左键时的移动才算拖拽）把记录交给 EffectLayer.submit_input，
+最终经由 spawn/spawn_trail 生成特效。
+
+    python src/session.py info session.mfxr
+    python src/session.py replay session.mfxr [--speed 2] [--fast] [--seed 1]
+
+--fast 与固定种子一起使用时，同一录制每次回放得到的粒子状态完全一致（stateDigest 相同）。
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+
+from input_queue import KIND_PRESS, KIND_RELEASE, KIND_MOVE
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MFXR'
+VERSION = 1
+# 文件头：魔数、版本、单条记录字节数、录制开始的墙钟时间
+_HEADER = struct.Struct('<4sHHd')
+_RECORD = struct.Struct('<diiBB')
+
+# 按键编号
+BUTTON_NONE = 0
+BUTTON_LEFT = 1
+BUTTON_RIGHT = 2
+BUTTON_MIDDLE = 3
+BUTTON_CODES = {'left': BUTTON_LEFT, 'right': BUTTON_RIGHT, 'middle': BUTTON_MIDDLE}
+
+
+class SessionRecorder:
+    """把 pynput 回调收到的点击与移动写入录制文件。
+
+    ``record`` 在监听线程调用，``start``/``stop`` 在 GUI 线程调用，以锁保护文件句柄；
+    写入经文件缓冲，不会每条记录都触发系统调用。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._t0 = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._file is not None
+
+    def start(self):
+        with self._lock:
+            if self._file is not None:
+                return
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._file = open(self.path, 'wb')
+            self._file.write(_HEADER.pack(MAGIC, VERSION, _RECORD.size, time.time()))
+            self._t0 = time.perf_counter()
+            self.count = 0
+        logger.info("session recording started: %s", self.path)
+
+    def record(self, kind: int, x: int, y: int, button: int = BUTTON_NONE, t: float = None):
+        """追加一条记录；t 为 time.perf_counter() 读数，缺省取当前时间。"""
+        with self._lock:
+            if self._file is None:
+                return
+            now = time.perf_counter() if t is None else t
+            self._file.write(_RECORD.pack(now - self._t0, int(x), int(y), kind, button))
+            self.count += 1
+
+    def stop(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+        logger.info("session recording stopped: %s (%d records)", self.path, self.count)
+
+
+def read_session(path: str):
+    """读取录制文件，返回 (开始墙钟时间, [(t, x, y, kind, button)])。"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"不是有效的录制文件: {path}")
+    magic, version, rec_size, started = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or rec_size != _RECORD.size:
+        raise ValueError(f"不支持的录制文件格式: {path}")
+    body = memoryview(data)[_HEADER.size:]
+    # 录制中断时末尾可能有不完整的记录，直接忽略
+    usable = len(body) - len(body) % rec_size
+    return started, list(_RECORD.iter_unpack(body[:usable]))
+
+
+class SteppedClock:
+    """替代 EffectLayer.last_ts 的 QElapsedTimer：每帧固定报告 step_ms，模拟与机器快慢无关。"""
+
+    def __init__(self, step_ms: float = 10):
+        self.step_ms = step_ms
+
+    def elapsed(self):
+        return self.step_ms
+
+    def restart(self):
+        return self.step_ms
+
+    def start(self):
+        pass
+
+
+class SessionReplayer:
+    """把录制的会话回放到 EffectLayer。
+
+    ``feed_until`` 送入时间戳不超过给定时刻的记录；``start`` 按实时（可调倍速）
+    由 Qt 定时器驱动，``run_fast`` 以固定步长直接推进模拟，尽可能快地跑完。
+    """
+
+    PUMP_MS = 4
+
+    def __init__(self, layer, records, speed: float = 1.0):
+        self.layer = layer
+        self.speed = max(0.01, float(speed))
+        self._records = self._effect_stream(records)
+        self._next = 0
+        self._timer = None
+        self._clock = None
+        self.on_finished = None
+
+    @staticmethod
+    def _effect_stream(records) -> list:
+        """按 App 的规则过滤：只保留左键按下/松开与按住左键时的移动。"""
+        out = []
+        pressed = False
+        for t, x, y, kind, button in records:
+            if kind == KIND_MOVE:
+                if pressed:
+                    out.append((t, x, y, KIND_MOVE))
+            elif button == BUTTON_LEFT:
+                pressed = kind == KIND_PRESS
+                out.append((t, x, y, kind))
+        return out
+
+    @property
+    def duration(self) -> float:
+        return self._records[-1][0] if self._records else 0.0
+
+    def done(self) -> bool:
+        return self._next >= len(self._records)
+
+    def feed_until(self, t: float) -> int:
+        """送入 t 秒之前的全部记录，返回本次送入条数。"""
+        start = self._next
+        records = self._records
+        end = start
+        while end < len(records) and records[end][0] <= t:
+            end += 1
+        if end > start:
+            self._next = end
+            self.layer.submit_input(records[start:end])
+        return end - start
+
+    # ---- 实时回放 ----
+    def start(self):
+        from PySide6 import QtCore
+        self._next = 0
+        self._clock = QtCore.QElapsedTimer()
+        self._clock.start()
+        self._timer = QtCore.QTimer()
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self._pump)
+        self._timer.start(self.PUMP_MS)
+
+    def _pump(self):
+        self.feed_until(self._clock.elapsed() / 1000.0 * self.speed)
+        if self.done():
+            self._timer.stop()
+            if self.on_finished is not None:
+                self.on_finished()
+
+    # ---- 尽快回放 ----
+    def run_fast(self, step_ms: float = 10, on_frame=None, tail_frames: int = 600) -> int:
+        """以固定步长推进：每步先送入到期记录再 tick；记录送完后继续跑到粒子消失（最多 tail_frames 帧）。"""
+        layer = self.layer
+        layer.last_ts = SteppedClock(step_ms)
+        self._next = 0
+        frame = 0
+        tail = 0
+        while not self.done() or (tail < tail_frames and (layer.particles or layer._ribbon)):
+            if self.done():
+                tail += 1
+            self.feed_until((frame + 1) * step_ms / 1000.0 * self.speed)
+            layer.tick()
+            if on_frame is not None:
+                on_frame(frame)
+            frame += 1
+        return frame
+
+
+def _load_config() -> dict:
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MouseFX 输入会话工具')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_info = sub.add_parser('info', help='显示录制文件概况')
+    p_info.add_argument('path')
+    p_replay = sub.add_parser('replay', help='把录制回放到特效层')
+    p_replay.add_argument('path')
+    p_replay.add_argument('--speed', type=float, default=1.0, help='回放倍速')
+    p_replay.add_argument('--fast', action='store_true', help='不按实时节奏，尽快跑完并输出耗时统计')
+    p_replay.add_argument('--seed', type=int, help='随机数种子，覆盖配置中的 simulation.seed')
+    args = parser.parse_args(argv)
+
+    started, records = read_session(args.path)
+    if args.cmd == 'info':
+        kinds = {KIND_PRESS: 0, KIND_RELEASE: 0, KIND_MOVE: 0}
+        for r in records:
+            kinds[r[3]] = kinds.get(r[3], 0) + 1
+        print(json.dumps({
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+            'records': len(records),
+            'durationSec': round(records[-1][0], 3) if records else 0.0,
+            'press': kinds[KIND_PRESS], 'release': kinds[KIND_RELEASE], 'move': kinds[KIND_MOVE],
+        }, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.fast:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6 import QtCore, QtWidgets
+    from effects import EffectLayer
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    config = _load_config()
+    if args.seed is not None:
+        config.setdefault('simulation', {})['seed'] = args.seed
+    if args.fast:
+        # 尽快回放由本进程逐帧 tick，模拟必须留在当前线程
+        config.setdefault('simulation', {})['thread'] = False
+    layer = EffectLayer(config)
+    layer.show()
+    replayer = SessionReplayer(layer, records, args.speed)
+    if args.fast:
+        # 逐帧累积模拟状态摘要，回放结束粒子全部消失后仍能比对整个过程
+        state = hashlib.sha1()
+        t0 = time.perf_counter()
+        frames = replayer.run_fast(on_frame=lambda _: state.update(layer.particles.digest().encode()))
+        snap = layer.metrics_snapshot()
+        print(json.dumps({'frames': frames, 'wallSec': round(time.perf_counter() - t0, 3),
+                          'tickMs': snap['tickMs'], 'spawned': snap['spawned'], 'evicted': snap['evicted'],
+                          'seed': args.seed, 'stateDigest': state.hexdigest()},
+                         ensure_ascii=False, indent=2))
+        return 0
+    # 实时回放结束后再留出粒子消散的时间
+    replayer.on_finished = lambda: QtCore.QTimer.singleShot(3000, app.quit)
+    replayer.start()
+    app.exec()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+from dataclasses import dataclass
+from PySide6 import QtGui
+
+from particles import (ParticleStore, SHAPE_NAMES, SHAPE_TEXT, SHAPE_CIRCLE, SHAPE_STAR,
+                       SHAPE_FLOWER, SHAPE_TRAIL, SHAPE_RECT)
+
+# 与设置界面一致的上限：点击密度、轨迹密度
+MAX_DENSITY = 24
+MAX_TRAIL_DENSITY = 6
+TRAIL_MODES = ('particles', 'ribbon')
+TRAIL_INTERPOLATIONS = ('catmull-rom', 'linear')
+OVERLAY_MODES = ('perScreen', 'virtual', 'pooled')
+RENDER_BACKENDS = ('painter', 'tiled', 'opengl')
+
+
+class SpecError(ValueError):
+    """配置无法编译为 EffectSpec；errors 为逐条的错误说明。"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('特效配置无效：\n' + '\n'.join(f'- {e}' for e in self.errors))
+
+
+@dataclass(frozen=True)
+class EmitterSpec:
+    """一种点击特效的发射参数：各项缩放均相对 EffectSpec 的基础值。
+
+    gravity 为竖直加速度（像素/秒²），drag 为每 10ms 的速度保留比例。
+    """
+    shape: int
+    label: str = ''
+    glyphs: tuple = ()
+    count_scale: float = 1.0
+    count_min: int = 1
+    life_scale: float = 1.0
+    size_scale: tuple = (1.0, 1.0)
+    speed_scale: tuple = (1.0, 1.0)
+    opacity: float = 1.0
+    spin: tuple = (-180.0, 180.0)
+    gravity: float = ParticleStore.GRAVITY
+    drag: float = ParticleStore.DRAG
+
+
+# 内置特效类型；config.json 的 effects.emitters 可覆盖同名定义或新增类型
+EMITTERS = {
+    'heart': EmitterSpec(SHAPE_TEXT, '爱心', glyphs=('❤',)),
+    'star': EmitterSpec(SHAPE_STAR, '星星'),
+    'ripple': EmitterSpec(SHAPE_FLOWER, '小花', count_min=4, life_scale=1.1, size_scale=(1.1, 1.6),
+                          speed_scale=(0.6, 0.9), opacity=0.9),
+    'confetti': EmitterSpec(SHAPE_RECT, '彩纸', count_scale=1.5, life_scale=1.1, size_scale=(0.8, 1.2),
+                            speed_scale=(1.0, 1.2)),
+    # 钱币，支持多种货币符号；旋转稍慢，显得更有分量
+    'coin': EmitterSpec(SHAPE_TEXT, '钱币', glyphs=('￥', '$', '€', '£'), count_min=4, life_scale=1.2,
+                        size_scale=(1.1, 1.6), speed_scale=(0.7, 0.9), opacity=0.95, spin=(-120.0, 120.0)),
+}
+
+
+@dataclass(frozen=True)
+class EffectSpec:
+    """由 config['effects'] 编译出的只读特效参数，spawn/轨迹发射的热路径只读这里。"""
+    enabled: bool
+    trail_enabled: bool
+    density: int
+    duration: float
+    colors: tuple
+    size_range: tuple
+    speed_range: tuple
+    emitters: tuple  # 按 types 顺序的 (类型名, EmitterSpec)，即 spawn 的分派表
+    catalog: tuple  # 全部可选类型的 (类型名, 显示名)，供设置界面列出
+    random_pick: bool
+    burst_templates: int  # 每种发射器预生成的爆发模板数
+    trail_mode: str
+    trail_density: int
+    trail_life: float
+    trail_size_range: tuple
+    trail_flower_chance: float
+    trail_flower_size_range: tuple
+    trail_spacing: float
+    trail_interpolation: str
+    trail_frame_budget: int  # 满画质下每帧最多发射的轨迹点数
+    ribbon_width: float
+    ribbon_sparkles: bool
+    lod: tuple  # 细节层级阈值 (简化尺寸, 简化透明度, 圆点尺寸, 圆点透明度)
+    render_budget: float  # 满画质下的渲染单位预算
+    burst_min_share: float
+    frame_budget_ms: float
+    adaptive_quality: bool
+    start_level: int  # 旧配置的 performanceMode 仅决定画质起始档位
+    overlay_mode: str
+    overlay_pool: tuple  # pooled 模式的 (窗口池大小, 回退面积比例)
+    render_backend: str
+    raster: tuple  # tiled 后端的 (线程数, 瓦片边长)，线程数 0 表示按 CPU 核数
+
+    def sprite_size_ranges(self) -> dict:
+        """各形状可能出现的尺寸范围（供精灵图集选择尺寸档）。"""
+        lo, hi = self.size_range
+        ranges = {SHAPE_CIRCLE: (lo, hi), SHAPE_STAR: (lo, hi), SHAPE_RECT: (lo, hi),
+                  SHAPE_TRAIL: self.trail_size_range, SHAPE_FLOWER: self.trail_flower_size_range}
+        for _, em in self.emitters:
+            if em.shape == SHAPE_TEXT:
+                continue
+            a, b = ranges[em.shape]
+            ranges[em.shape] = (min(a, lo * em.size_scale[0]), max(b, hi * em.size_scale[1]))
+        return ranges
+
+
+def _number(cfg, key, default, errors, kind=float, where=''):
+    value = cfg.get(key, default)
+    if isinstance(value, bool):
+        errors.append(f'{where}{key} 应为数值，实际为 {value!r}')
+        return default
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        errors.append(f'{where}{key} 应为数值，实际为 {value!r}')
+        return default
+
+
+def _range(cfg, key, default, errors, lowest=0.0):
+    """读取 [min, max]；顺序颠倒时自动交换，并夹到不小于 lowest。"""
+    value = cfg.get(key, default)
+    try:
+        a, b = (float(v) for v in value)
+    except (TypeError, ValueError):
+        errors.append(f'{key} 应为两个数值组成的列表，实际为 {value!r}')
+        return tuple(float(v) for v in default)
+    return max(lowest, min(a, b)), max(lowest, a, b)
+
+
+def _pair(value, key, errors, lowest=None):
+    """读取发射定义中的 [a, b]：a 不大于 b，可选下限。"""
+    try:
+        a, b = (float(v) for v in value)
+    except (TypeError, ValueError):
+        errors.append(f'{key} 应为两个数值组成的列表，实际为 {value!r}')
+        return None
+    a, b = min(a, b), max(a, b)
+    if lowest is not None and a < lowest:
+        errors.append(f'{key} 不能小于 {lowest}，实际为 {value!r}')
+        return None
+    return a, b
+
+
+def _emitter(name, definition, errors):
+    """把 config 中的一条发射定义编译为 EmitterSpec；未写的字段取默认值。"""
+    where = f'emitters.{name}'
+    if not isinstance(definition, dict):
+        errors.append(f'{where} 应为对象，实际为 {definition!r}')
+        return None
+    n_errors = len(errors)
+    shape_name = definition.get('shape')
+    if shape_name not in SHAPE_NAMES:
+        errors.append(f'{where}.shape 应为 {" / ".join(SHAPE_NAMES)} 之一，实际为 {shape_name!r}')
+        return None
+    shape = SHAPE_NAMES.index(shape_name)
+    symbols = definition.get('symbols', [])
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    if not isinstance(symbols, (list, tuple)) or not all(isinstance(t, str) and t for t in symbols):
+        errors.append(f'{where}.symbols 应为非空字符串列表，实际为 {symbols!r}')
+        symbols = []
+    if shape == SHAPE_TEXT and not symbols:
+        errors.append(f'{where} 的形状为 text，必须提供 symbols')
+    kwargs = {}
+    for key, field, kind, lowest in (('countScale', 'count_scale', float, 0.0), ('countMin', 'count_min', int, 0),
+                                     ('lifeScale', 'life_scale', float, 0.01), ('opacity', 'opacity', float, 0.0),
+                                     ('gravity', 'gravity', float, None), ('drag', 'drag', float, 0.0)):
+        if key not in definition:
+            continue
+        value = _number(definition, key, None, errors, kind, where + '.')
+        if value is None:
+            continue
+        if lowest is not None and value < lowest:
+            errors.append(f'{where}.{key} 不能小于 {lowest}，实际为 {value!r}')
+        kwargs[field] = value
+    if kwargs.get('opacity', 0.0) > 1.0:
+        errors.append(f'{where}.opacity 不能大于 1')
+    if kwargs.get('drag', 0.0) > 1.0:
+        errors.append(f'{where}.drag 为每 10ms 的速度保留比例，不能大于 1')
+    for key, field, lowest in (('sizeScale', 'size_scale', 0.0), ('speedScale', 'speed_scale', 0.0),
+                               ('spin', 'spin', None)):
+        if key in definition:
+            pair = _pair(definition[key], f'{where}.{key}', errors, lowest)
+            if pair is not None:
+                kwargs[field] = pair
+    if len(errors) > n_errors:
+        return None
+    return EmitterSpec(shape, str(definition.get('label', name)), glyphs=tuple(symbols), **kwargs)
+
+
+def compile_emitters(cfg: dict, errors: list) -> dict:
+    """内置类型合并 effects.emitters 中的定义（同名整体替换），返回 {类型名: EmitterSpec}。"""
+    emitters = dict(EMITTERS)
+    defs = cfg.get('emitters', {})
+    if not isinstance(defs, dict):
+        errors.append(f'emitters 应为 {{类型名: 定义}} 对象，实际为 {defs!r}')
+        return emitters
+    for name, definition in defs.items():
+        em = _emitter(name, definition, errors)
+        if em is not None:
+            emitters[name] = em
+    return emitters
+
+
+def _choice(cfg, key, default, choices, errors):
+    value = cfg.get(key, default)
+    if value not in choices:
+        errors.append(f'{key} 应为 {" / ".join(choices)} 之一，实际为 {value!r}')
+        return default
+    return value
+
+
+def _colors(cfg, key, default, errors):
+    value = cfg.get(key, default)
+    if isinstance(value, str) or not isinstance(value, (list, tuple)) or not value:
+        errors.append(f'{key} 应为非空的颜色列表，实际为 {value!r}')
+        return tuple(QtGui.QColor(c) for c in default)
+    colors = []
+    for c in value:
+        color = QtGui.QColor(c) if isinstance(c, str) else QtGui.QColor()
+        if not color.isValid():
+            errors.append(f'{key} 中的颜色无效：{c!r}')
+            continue
+        colors.append(color)
+    return tuple(colors) or tuple(QtGui.QColor(c) for c in default)
+
+
+def compile_spec(config: dict) -> EffectSpec:
+    """校验并编译特效配置；有任何错误时一次性抛出 SpecError 列出全部问题。"""
+    cfg = config.get('effects', {})
+    errors = []
+    library = compile_emitters(cfg, errors)
+
+    types = cfg.get('types', ['heart'])
+    if isinstance(types, str) or not isinstance(types, (list, tuple)):
+        errors.append(f'types 应为特效类型列表，实际为 {types!r}')
+        types = []
+    emitters = []
+    for name in types:
+        em = library.get(name)
+        if em is None:
+            errors.append(f'未知的特效类型 {name!r}（可选：{", ".join(library)}）')
+        else:
+            emitters.append((name, em))
+
+    density = _number(cfg, 'density', 6, errors, int)
+    duration = _number(cfg, 'duration', 1.6, errors)
+    if duration <= 0:
+        errors.append(f'duration 应大于 0，实际为 {duration!r}')
+    trail_density = _number(cfg, 'trailDensity', 2, errors, int)
+    trail_life = _number(cfg, 'trailLife', 0.5, errors)
+    if trail_life <= 0:
+        errors.append(f'trailLife 应大于 0，实际为 {trail_life!r}')
+    flower_chance = _number(cfg, 'trailFlowerChance', 0.15, errors)
+    templates = _number(cfg, 'burstTemplates', 16, errors, int)
+    if templates < 1:
+        errors.append(f'burstTemplates 应不小于 1，实际为 {templates!r}')
+    trail_mode = _choice(cfg, 'trailMode', 'particles', TRAIL_MODES, errors)
+    trail_spacing = _number(cfg, 'trailSpacing', 8.0, errors)
+    if trail_spacing <= 0:
+        errors.append(f'trailSpacing 应大于 0，实际为 {trail_spacing!r}')
+    trail_budget = _number(cfg, 'trailFrameBudget', 24, errors, int)
+    ribbon_width = _number(cfg, 'ribbonWidth', 10.0, errors)
+    if ribbon_width <= 0:
+        errors.append(f'ribbonWidth 应大于 0，实际为 {ribbon_width!r}')
+    lod = tuple(_number(cfg, key, default, errors) for key, default in
+                (('lodSimpleSize', 8.0), ('lodSimpleOpacity', 0.3), ('lodDotSize', 4.0), ('lodDotOpacity', 0.1)))
+    if min(lod) < 0:
+        errors.append(f'lod* 阈值不能为负数，实际为 {list(lod)!r}')
+    # 未配置 renderBudget 时按 maxParticles 个平均开销约 2 单位的粒子折算
+    render_budget = _number(cfg, 'renderBudget', 2.0 * _number(cfg, 'maxParticles', 300, errors, int), errors)
+    if render_budget <= 0:
+        errors.append(f'renderBudget 应大于 0，实际为 {render_budget!r}')
+    burst_share = _number(cfg, 'burstMinShare', 0.15, errors)
+    frame_budget = _number(cfg, 'frameBudgetMs', 8.0, errors)
+    if frame_budget <= 0:
+        errors.append(f'frameBudgetMs 应大于 0，实际为 {frame_budget!r}')
+    pool_size = _number(cfg, 'overlayPoolSize', 8, errors, int)
+    pool_area = _number(cfg, 'overlayPoolMaxArea', 0.25, errors)
+    if not 0 < pool_area <= 1:
+        errors.append(f'overlayPoolMaxArea 应在 (0, 1] 之间，实际为 {pool_area!r}')
+    raster_threads = _number(cfg, 'rasterThreads', 0, errors, int)
+    if raster_threads < 0:
+        errors.append(f'rasterThreads 不能为负数（0 表示按 CPU 核数），实际为 {raster_threads!r}')
+    raster_tile = _number(cfg, 'rasterTileSize', 256, errors, int)
+
+    spec = EffectSpec(
+        enabled=bool(cfg.get('enabled', True)),
+        trail_enabled=bool(cfg.get('trailEnabled', True)),
+        density=max(1, min(density, MAX_DENSITY)),
+        duration=duration,
+        colors=_colors(cfg, 'colors', ['#FF5252', '#FFC107', '#40C4FF'], errors),
+        size_range=_range(cfg, 'sizeRange', [14, 28], errors, 1.0),
+        speed_range=_range(cfg, 'speedRange', [150, 420], errors),
+        emitters=tuple(emitters),
+        catalog=tuple((name, em.label or name) for name, em in library.items()),
+        random_pick=bool(cfg.get('randomPick', True)),
+        burst_templates=max(1, min(templates, 256)),
+        trail_mode=trail_mode,
+        trail_density=max(0, min(trail_density, MAX_TRAIL_DENSITY)),
+        trail_life=trail_life,
+        trail_size_range=_range(cfg, 'trailSizeRange', [5, 10], errors, 1.0),
+        trail_flower_chance=max(0.0, min(1.0, flower_chance)),
+        trail_flower_size_range=_range(cfg, 'trailFlowerSizeRange', [8, 14], errors, 1.0),
+        trail_spacing=max(1.0, trail_spacing),
+        trail_interpolation=_choice(cfg, 'trailInterpolation', 'catmull-rom', TRAIL_INTERPOLATIONS, errors),
+        trail_frame_budget=max(1, trail_budget),
+        ribbon_width=ribbon_width,
+        ribbon_sparkles=bool(cfg.get('ribbonSparkles', True)),
+        lod=lod,
+        render_budget=max(1.0, render_budget),
+        burst_min_share=max(0.0, min(1.0, burst_share)),
+        frame_budget_ms=frame_budget,
+        adaptive_quality=bool(cfg.get('adaptiveQuality', True)),
+        start_level=2 if cfg.get('performanceMode', False) else 0,
+        overlay_mode=_choice(cfg, 'overlayMode', 'perScreen', OVERLAY_MODES, errors),
+        overlay_pool=(max(1, pool_size), pool_area),
+        render_backend=_choice(cfg, 'renderBackend', 'painter', RENDER_BACKENDS, errors),
+        raster=(max(0, raster_threads), max(64, raster_tile)),
+    )
+    if errors:
+        raise SpecError(errors)
+    return spec
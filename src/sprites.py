@@ -0,0 +1,457 @@
+from PySide6 import QtCore, QtGui
+import math
+import logging
+import numpy as np
+
+from particles import (SHAPE_CIRCLE, SHAPE_STAR, SHAPE_FLOWER,
+                       SHAPE_TRAIL, SHAPE_RECT, SHAPE_NAMES)
+
+logger = logging.getLogger(__name__)
+
+# 尺寸档：BUCKET_BASE * BUCKET_STEP^k，精灵按所在档的上界尺寸预渲染，绘制时只做轻微缩小
+BUCKET_BASE = 4.0
+BUCKET_STEP = 1.25
+_LOG_STEP = math.log(BUCKET_STEP)
+
+# 各形状半边长与尺寸的比例（含旋转与抗锯齿余量）
+_EXTENT = {
+    SHAPE_CIRCLE: 1.0,
+    SHAPE_STAR: 1.0,
+    SHAPE_FLOWER: 0.9,
+    SHAPE_TRAIL: 1.0,
+    SHAPE_RECT: 0.62,
+}
+ATLAS_WIDTH = 1024
+
+# 细节层级（LOD）：完整细节 / 单色简化形状 / 纯色透明圆点
+LOD_FULL = 0
+LOD_SIMPLE = 1
+LOD_DOT = 2
+DOT_SIZE = 8.0  # 圆点精灵的直径（逻辑像素），绘制时按粒子尺寸缩放
+
+
+def bucket_index(size):
+    """尺寸 -> 尺寸档下标（向上取整，保证精灵只会被缩小）。"""
+    return np.ceil(np.log(np.maximum(size, 1.0) / BUCKET_BASE) / _LOG_STEP).astype(np.int32)
+
+
+def bucket_size(k) -> float:
+    return BUCKET_BASE * BUCKET_STEP ** k
+
+
+# ---- 形状绘制（以当前原点为中心，不处理平移/旋转/透明度）----
+def draw_star(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    painter.setBrush(color)
+    painter.setPen(QtCore.Qt.NoPen)
+    path = QtGui.QPainterPath()
+    r = size
+    for i in range(5):
+        angle = i * 72
+        angle2 = angle + 36
+        x1 = math.cos(math.radians(angle)) * r
+        y1 = math.sin(math.radians(angle)) * r
+        x2 = math.cos(math.radians(angle2)) * (r * 0.5)
+        y2 = math.sin(math.radians(angle2)) * (r * 0.5)
+        if i == 0:
+            path.moveTo(x1, y1)
+        else:
+            path.lineTo(x1, y1)
+        path.lineTo(x2, y2)
+    path.closeSubpath()
+    painter.drawPath(path)
+
+
+def draw_circle(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    painter.setBrush(QtGui.QBrush(color.lighter(120)))
+    painter.setPen(QtGui.QPen(color, 1))
+    painter.drawEllipse(QtCore.QPointF(0, 0), size, size)
+
+
+def draw_flower(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    petal_count = 5
+    r = max(4.0, size * 0.6)
+    petal_w = r * 0.9
+    petal_h = r * 1.2
+    base = QtGui.QColor(color)
+    center_color = QtGui.QColor(base).lighter(120)
+    for i in range(petal_count):
+        painter.save()
+        painter.rotate(i * (360.0 / petal_count))
+        grad = QtGui.QRadialGradient(QtCore.QPointF(r * 0.2, 0), petal_h)
+        grad.setColorAt(0.0, base.lighter(150))
+        grad.setColorAt(1.0, base.darker(110))
+        painter.setBrush(QtGui.QBrush(grad))
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.drawEllipse(QtCore.QRectF(r * 0.2, -petal_w * 0.5, petal_h, petal_w))
+        painter.restore()
+    painter.setBrush(center_color)
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawEllipse(QtCore.QPointF(0, 0), r * 0.25, r * 0.25)
+
+
+def draw_trail(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    grad = QtGui.QRadialGradient(QtCore.QPointF(0, 0), size)
+    c1 = QtGui.QColor(color)
+    c1.setAlphaF(0.9)
+    c2 = QtGui.QColor(color)
+    c2.setAlphaF(0.0)
+    grad.setColorAt(0.0, c1)
+    grad.setColorAt(1.0, c2)
+    painter.setBrush(QtGui.QBrush(grad))
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawEllipse(QtCore.QPointF(0, 0), size, size)
+
+
+def draw_rect(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    painter.setBrush(color)
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawRect(QtCore.QRectF(-size * 0.4, -size * 0.1, size, size * 0.2))
+
+
+def draw_flower_flat(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    # 简化花朵：单个实心圆，面积与五瓣轮廓相近
+    r = max(4.0, size * 0.6)
+    painter.setBrush(color)
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawEllipse(QtCore.QPointF(0, 0), r * 1.1, r * 1.1)
+
+
+def draw_circle_flat(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    painter.setBrush(QtGui.QBrush(color.lighter(120)))
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawEllipse(QtCore.QPointF(0, 0), size, size)
+
+
+def draw_dot(painter: QtGui.QPainter, color: QtGui.QColor, size: float):
+    painter.setBrush(color)
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawEllipse(QtCore.QPointF(0, 0), size * 0.5, size * 0.5)
+
+
+SHAPE_PAINTERS = {
+    SHAPE_CIRCLE: draw_circle,
+    SHAPE_STAR: draw_star,
+    SHAPE_FLOWER: draw_flower,
+    SHAPE_TRAIL: draw_trail,
+    SHAPE_RECT: draw_rect,
+}
+
+# 简化层级只对多次绘制的形状单独出图；星形/彩纸/光点本身已是单次填充，直接复用完整精灵
+FLAT_PAINTERS = {
+    SHAPE_FLOWER: draw_flower_flat,
+    SHAPE_CIRCLE: draw_circle_flat,
+}
+
+
+# drawPixmapFragments 的 Python 绑定在不同 PySide6 版本间不一致：
+# 新版本接受片段列表，旧版本（如 6.7）只接受单个片段 + 数量。首次调用时探测一次。
+_fragment_list_api = None
+
+
+def draw_fragments(painter: QtGui.QPainter, fragments, pixmap: QtGui.QPixmap):
+    """批量绘制像素图片段；绑定不支持列表时退化为逐片段调用。"""
+    global _fragment_list_api
+    if not fragments:
+        return
+    if _fragment_list_api is not False:
+        try:
+            painter.drawPixmapFragments(fragments, pixmap)
+            _fragment_list_api = True
+            return
+        except TypeError:
+            if _fragment_list_api:
+                raise
+            _fragment_list_api = False
+            logger.debug("drawPixmapFragments: list form unsupported, drawing per fragment")
+    for f in fragments:
+        painter.drawPixmapFragments(f, 1, pixmap)
+
+
+class SpriteAtlas:
+    """精灵图集：每个 (形状, 调色板颜色, 尺寸档) 只渲染一次，共用一张 QPixmap。
+
+    ``rects[lod, shape, color, bucket]`` 给出完整/简化两个层级的源矩形（像素），
+    ``dot_rects[color]`` 为圆点层级；绘制时按粒子尺寸与所在档的比例缩放。
+    只有调色板、尺寸范围或设备像素比变化时才重建。
+    """
+
+    def __init__(self):
+        self.pixmap = None
+        self.image = None  # 同一图集的 QImage，供 OpenGL 后端上传为纹理
+        self.rects = None  # (2, 形状数, 颜色数, 档数, 4) float32
+        self.dot_rects = None  # (颜色数, 4) float32
+        self.bucket_sizes = None
+        self._k_min = None
+        self._k_max = None
+        self._key = None
+
+    def ensure(self, palette, size_ranges: dict, dpr: float = 1.0) -> bool:
+        """按需重建图集；size_ranges 为 {shape: (min, max)}。返回图集是否可用。"""
+        key = (tuple(c.rgba() for c in palette),
+               tuple(sorted((s, (float(a), float(b))) for s, (a, b) in size_ranges.items())),
+               round(float(dpr), 3))
+        if key == self._key and self.pixmap is not None:
+            return True
+        self._key = key
+        try:
+            self._build(palette, size_ranges, float(dpr))
+        except Exception:
+            logger.exception("sprite atlas build failed")
+            self.pixmap = None
+            self.image = None
+        return self.pixmap is not None
+
+    def _build(self, palette, size_ranges, dpr):
+        n_shapes = len(SHAPE_NAMES)
+        n_colors = max(1, len(palette))
+        k_min = np.zeros(n_shapes, dtype=np.int32)
+        k_max = np.zeros(n_shapes, dtype=np.int32)
+        for shape in SHAPE_PAINTERS:
+            lo, hi = size_ranges.get(shape, (8.0, 32.0))
+            lo, hi = min(lo, hi), max(lo, hi)
+            k_min[shape] = max(0, int(bucket_index(lo)))
+            k_max[shape] = max(k_min[shape], int(bucket_index(hi)))
+        n_buckets = int(k_max.max()) + 1
+
+        # 先计算每个格子的像素尺寸，再按行（shelf）排布；cell = (painter, 写入位置, 尺寸, 边长)
+        cells = []
+        for shape, paint in SHAPE_PAINTERS.items():
+            flat = FLAT_PAINTERS.get(shape)
+            for k in range(k_min[shape], k_max[shape] + 1):
+                side = int(math.ceil(2 * _EXTENT[shape] * bucket_size(k) * dpr)) + 2
+                for ci in range(len(palette)):
+                    cells.append((paint, (LOD_FULL, shape, ci, k), ci, bucket_size(k), side))
+                    if flat is not None:
+                        cells.append((flat, (LOD_SIMPLE, shape, ci, k), ci, bucket_size(k), side))
+        dot_side = int(math.ceil(DOT_SIZE * dpr)) + 2
+        for ci in range(len(palette)):
+            cells.append((draw_dot, ci, ci, DOT_SIZE, dot_side))
+        cells.sort(key=lambda c: -c[4])
+        rects = np.zeros((2, n_shapes, n_colors, n_buckets, 4), dtype=np.float32)
+        dot_rects = np.zeros((n_colors, 4), dtype=np.float32)
+        x = y = row_h = 0
+        placed = []
+        for paint, where, ci, size, side in cells:
+            if x + side > ATLAS_WIDTH:
+                x = 0
+                y += row_h
+                row_h = 0
+            placed.append((paint, ci, size, side, x, y))
+            if paint is draw_dot:
+                dot_rects[where] = (x, y, side, side)
+            else:
+                rects[where] = (x, y, side, side)
+            x += side
+            row_h = max(row_h, side)
+        height = max(1, y + row_h)
+        for shape in SHAPE_PAINTERS:
+            if shape not in FLAT_PAINTERS:
+                rects[LOD_SIMPLE, shape] = rects[LOD_FULL, shape]
+
+        image = QtGui.QImage(ATLAS_WIDTH, height, QtGui.QImage.Format_ARGB32_Premultiplied)
+        image.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(image)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+        for paint, ci, size, side, cx, cy in placed:
+            painter.save()
+            painter.setClipRect(QtCore.QRect(cx, cy, side, side))
+            painter.translate(cx + side * 0.5, cy + side * 0.5)
+            painter.scale(dpr, dpr)
+            paint(painter, palette[ci], size)
+            painter.restore()
+        painter.end()
+
+        self.pixmap = QtGui.QPixmap.fromImage(image)
+        self.image = image
+        self.rects = rects
+        self.dot_rects = dot_rects
+        self.bucket_sizes = np.array([bucket_size(k) for k in range(n_buckets)], dtype=np.float32)
+        self._k_min = k_min
+        self._k_max = k_max
+        self._dpr = dpr
+        logger.debug("sprite atlas rebuilt: %d cells, %dx%d px", len(placed), ATLAS_WIDTH, height)
+
+    def lookup(self, shape, color, size, lod=LOD_FULL):
+        """批量查询源矩形与缩放系数，返回 (rects[N,4], scale[N])；lod 取 FULL/SIMPLE。"""
+        k = np.clip(bucket_index(size), self._k_min[shape], self._k_max[shape])
+        rects = self.rects[lod, shape, color, k]
+        scale = size / self.bucket_sizes[k] / self._dpr
+        return rects, scale
+
+    def lookup_dot(self, color, size):
+        """圆点层级：直径与粒子尺寸相同。"""
+        return self.dot_rects[color], size / DOT_SIZE / self._dpr
+
+
+class GlyphCache:
+    """文字粒子（爱心/货币符号）的字形像素图缓存。
+
+    以 (符号, 颜色, 尺寸档) 为键预先光栅化，绘制时直接贴图，避免每帧重新
+    排版与光栅化字形。字形以基线原点为旋转中心放在像素图正中，与
+    ``drawText(QPointF(0, 0), text)`` 加旋转的效果一致。
+    """
+
+    MAX_ENTRIES = 512
+    MAX_BUCKET = 20
+
+    def __init__(self, font: QtGui.QFont = None):
+        self.font = QtGui.QFont(font) if font is not None else QtGui.QFont()
+        self.dpr = 1.0
+        self.logical_dpi = 96.0
+        self._entries = {}
+        self._images = {}
+
+    def clear(self):
+        self._entries.clear()
+        self._images.clear()
+
+    def configure(self, dpr: float, logical_dpi: float):
+        """设备像素比或逻辑 DPI 变化时丢弃已缓存字形。"""
+        dpr = float(dpr)
+        logical_dpi = float(logical_dpi)
+        if dpr != self.dpr or logical_dpi != self.logical_dpi:
+            self.dpr = dpr
+            self.logical_dpi = logical_dpi
+            self.clear()
+
+    def get(self, text: str, color: QtGui.QColor, k: int) -> QtGui.QPixmap:
+        key = (text, color.rgba(), int(k))
+        pm = self._entries.get(key)
+        if pm is None:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                self._entries.clear()
+            pm = QtGui.QPixmap.fromImage(self.get_image(text, color, k))
+            self._entries[key] = pm
+        return pm
+
+    def get_image(self, text: str, color: QtGui.QColor, k: int) -> QtGui.QImage:
+        """同一字形的 QImage 版本：可在非 GUI 线程绘制，也用于拼入字形图集。"""
+        key = (text, color.rgba(), int(k))
+        image = self._images.get(key)
+        if image is None:
+            if len(self._images) >= self.MAX_ENTRIES:
+                self._images.clear()
+            image = self._render(text, color, int(k))
+            self._images[key] = image
+        return image
+
+    def _render(self, text, color, k) -> QtGui.QImage:
+        dots_per_meter = int(round(self.logical_dpi / 0.0254))
+        font = QtGui.QFont(self.font)
+        font.setPointSizeF(bucket_size(k))
+        probe = QtGui.QImage(1, 1, QtGui.QImage.Format_ARGB32_Premultiplied)
+        probe.setDotsPerMeterX(dots_per_meter)
+        probe.setDotsPerMeterY(dots_per_meter)
+        br = QtGui.QFontMetricsF(font, probe).boundingRect(text)
+        half = max(abs(br.left()), abs(br.right()), abs(br.top()), abs(br.bottom())) + 2
+        side = max(2, int(math.ceil(2 * half * self.dpr)))
+        image = QtGui.QImage(side, side, QtGui.QImage.Format_ARGB32_Premultiplied)
+        image.setDotsPerMeterX(dots_per_meter)
+        image.setDotsPerMeterY(dots_per_meter)
+        image.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(image)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+        painter.setRenderHint(QtGui.QPainter.TextAntialiasing, True)
+        painter.translate(side * 0.5, side * 0.5)
+        painter.scale(self.dpr, self.dpr)
+        painter.setFont(font)
+        painter.setPen(QtGui.QPen(color, 1))
+        painter.drawText(QtCore.QPointF(0, 0), text)
+        painter.end()
+        return image
+
+    def keys(self, glyph, color, size, n_colors: int):
+        """批量求尺寸档、(符号, 颜色, 尺寸档) 组合键与源像素到逻辑像素的缩放。"""
+        k = np.clip(bucket_index(size), 0, self.MAX_BUCKET)
+        keys = (glyph.astype(np.int64) * max(1, n_colors) + color) * (self.MAX_BUCKET + 1) + k
+        scale = size / (BUCKET_BASE * BUCKET_STEP ** k.astype(np.float32)) / self.dpr
+        return k, keys, scale
+
+    def groups(self, glyph, color, size, glyphs, palette, images: bool = False):
+        """按 (符号, 颜色, 尺寸档) 分组，逐组产出 (像素图, 组内下标, 组内缩放系数)。
+
+        images 为 True 时产出 QImage，供线程池中的瓦片光栅化使用。
+        """
+        get = self.get_image if images else self.get
+        k, keys, scale = self.keys(glyph, color, size, len(palette))
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        for gi in range(uniq.size):
+            sel = np.flatnonzero(inverse == gi)
+            first = sel[0]
+            yield get(glyphs[glyph[first]], palette[color[first]], k[first]), sel, scale[sel]
+
+    def draw(self, painter: QtGui.QPainter, xs, ys, glyph, color, size, rotation, opacity,
+             glyphs, palette):
+        """按 (符号, 颜色, 尺寸档) 分组，每组一次 drawPixmapFragments。"""
+        if len(xs) == 0:
+            return
+        create = QtGui.QPainter.PixmapFragment.create
+        QPointF = QtCore.QPointF
+        for pm, sel, scale in self.groups(glyph, color, size, glyphs, palette):
+            src = QtCore.QRectF(0, 0, pm.width(), pm.height())
+            fragments = [
+                create(QPointF(x, y), src, sc, sc, rot, op)
+                for x, y, sc, rot, op in zip(xs[sel].tolist(), ys[sel].tolist(), scale.tolist(),
+                                             rotation[sel].tolist(), opacity[sel].tolist())
+            ]
+            draw_fragments(painter, fragments, pm)
+
+
+class GlyphAtlas:
+    """把 GlyphCache 光栅化的字形按行拼进一张图，供 OpenGL 后端作为一张纹理整批提交。
+
+    字形按需加入；图满时清空重排，只保留当前帧用到的字形。
+    """
+
+    WIDTH = 1024
+    HEIGHT = 1024
+
+    def __init__(self, cache: GlyphCache):
+        self.cache = cache
+        self.image = QtGui.QImage(self.WIDTH, self.HEIGHT, QtGui.QImage.Format_ARGB32_Premultiplied)
+        self._reset()
+
+    def _reset(self):
+        self.image.fill(QtCore.Qt.transparent)
+        self._rects = {}
+        self._x = self._y = self._row_h = 0
+
+    def _place(self, glyph: QtGui.QImage):
+        w, h = glyph.width(), glyph.height()
+        if w > self.WIDTH or h > self.HEIGHT:
+            return (0.0, 0.0, 0.0, 0.0)
+        if self._x + w > self.WIDTH:
+            self._x = 0
+            self._y += self._row_h
+            self._row_h = 0
+        if self._y + h > self.HEIGHT:
+            return None
+        painter = QtGui.QPainter(self.image)
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+        painter.drawImage(self._x, self._y, glyph)
+        painter.end()
+        rect = (float(self._x), float(self._y), float(w), float(h))
+        self._x += w
+        self._row_h = max(self._row_h, h)
+        return rect
+
+    def lookup(self, glyph, color, size, glyphs, palette):
+        """批量查询字形在图中的源矩形与缩放系数，返回 (rects[N,4], scale[N])。"""
+        k, keys, scale = self.cache.keys(glyph, color, size, len(palette))
+        uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        for attempt in range(2):
+            rects = np.zeros((uniq.size, 4), dtype=np.float32)
+            for gi, (key, i) in enumerate(zip(uniq.tolist(), first.tolist())):
+                rect = self._rects.get(key)
+                if rect is None:
+                    rect = self._place(self.cache.get_image(glyphs[glyph[i]], palette[color[i]], k[i]))
+                    if rect is None:
+                        break
+                    self._rects[key] = rect
+                rects[gi] = rect
+            else:
+                return rects[inverse], scale
+            # 图已满：清空后只放入本帧用到的字形
+            logger.debug("glyph atlas full, repacking %d glyphs", uniq.size)
+            self._reset()
+        return rects[inverse], scale
@@ -0,0 +1,143 @@
+import logging
+import numpy as np
+from PySide6 import QtCore, QtGui
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentLayer:
+    """一组共用同一张 QImage 的片段（参数与 drawPixmapFragments 一一对应），附带全局坐标包围盒。
+
+    在 GUI 线程构造，工作线程只读。QPixmap 只能在 GUI 线程使用，所以源图一律为 QImage。
+    """
+
+    __slots__ = ('image', 'x', 'y', 'rects', 'scale', 'rotation', 'opacity', 'x0', 'y0', 'x1', 'y1')
+
+    def __init__(self, image, x, y, rects, scale, rotation, opacity, bounds):
+        self.image = image
+        self.x = x
+        self.y = y
+        self.rects = rects
+        self.scale = scale
+        self.rotation = rotation
+        self.opacity = opacity
+        self.x0, self.y0, self.x1, self.y1 = bounds
+
+    def draw(self, painter: QtGui.QPainter, rect: QtCore.QRect):
+        """只绘制包围盒与 rect（全局坐标）相交的片段。
+
+        与 drawPixmapFragments 相同的变换（平移到中心、旋转、缩放）由 numpy 一次求出，
+        循环内只剩设置变换与 drawImage。
+        """
+        sel = np.flatnonzero((self.x1 >= rect.left()) & (self.x0 <= rect.right() + 1)
+                             & (self.y1 >= rect.top()) & (self.y0 <= rect.bottom() + 1))
+        if not sel.size:
+            return
+        image = self.image
+        painter.save()
+        # 片段矩阵（缩放·旋转·平移到中心）与瓦片的基础变换预先合成，逐片段直接 setTransform
+        base = painter.transform()
+        b11, b12, b21, b22 = base.m11(), base.m12(), base.m21(), base.m22()
+        theta = np.radians(self.rotation[sel].astype(np.float64))
+        scale = self.scale[sel].astype(np.float64)
+        c = np.cos(theta) * scale
+        s = np.sin(theta) * scale
+        x = self.x[sel].astype(np.float64)
+        y = self.y[sel].astype(np.float64)
+        columns = (c * b11 + s * b21, c * b12 + s * b22, c * b21 - s * b11, c * b22 - s * b12,
+                   x * b11 + y * b21 + base.dx(), x * b12 + y * b22 + base.dy())
+        QTransform = QtGui.QTransform
+        QPointF = QtCore.QPointF
+        QRectF = QtCore.QRectF
+        for m11, m12, m21, m22, tx, ty, r, op in zip(*(col.tolist() for col in columns), self.rects[sel].tolist(),
+                                                     self.opacity[sel].tolist()):
+            painter.setTransform(QTransform(m11, m12, m21, m22, tx, ty))
+            painter.setOpacity(op)
+            painter.drawImage(QPointF(-0.5 * r[2], -0.5 * r[3]), image, QRectF(r[0], r[1], r[2], r[3]))
+        painter.restore()
+
+
+class _TileJob(QtCore.QRunnable):
+    """在线程池中把与一个瓦片相交的片段光栅化到该瓦片自己的 QImage。"""
+
+    def __init__(self, image: QtGui.QImage, rect: QtCore.QRect, layers):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.image = image
+        self.rect = rect
+        self.layers = layers
+
+    def run(self):
+        try:
+            self.image.fill(0)
+            painter = QtGui.QPainter(self.image)
+            painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+            painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform, True)
+            painter.translate(-self.rect.x(), -self.rect.y())
+            for layer in self.layers:
+                layer.draw(painter, self.rect)
+            painter.end()
+        except Exception:
+            logger.exception("tile raster failed: %s", self.rect)
+
+
+class TileRasterizer:
+    """把损伤区域切成瓦片，由专用 QThreadPool 并行光栅化到各瓦片的 QImage，GUI 线程只做合成。
+
+    QImage 上的 QPainter 可以在非 GUI 线程使用；片段的源 QImage 由 GUI 线程预先准备好，
+    工作线程只读。瓦片图像按槽位复用，尺寸或设备像素比变化时才重新分配。
+    """
+
+    def __init__(self):
+        self.pool = QtCore.QThreadPool()
+        self.tile = 256
+        self._images = []
+
+    def configure(self, threads: int, tile: int):
+        """threads 为 0 时使用 CPU 核数；tile 为瓦片边长（逻辑像素）。
+
+        线程数不超过 CPU 核数：瓦片光栅化是纯计算，超订只会增加调度与 GIL 争用。
+        单核机器上线程数为 1，tiled 后端随之退回 GUI 线程直接绘制。
+        """
+        cores = max(1, QtCore.QThread.idealThreadCount())
+        threads = min(int(threads), cores) if threads and int(threads) > 0 else cores
+        self.pool.setMaxThreadCount(threads)
+        self.tile = max(64, int(tile))
+
+    @property
+    def threads(self) -> int:
+        return self.pool.maxThreadCount()
+
+    def tiles(self, region: QtGui.QRegion, origin: QtCore.QPoint, size: QtCore.QSize) -> list:
+        """按窗口本地的瓦片网格切分损伤区域（窗口本地坐标），返回与之相交的全局坐标瓦片。"""
+        bounds = region.boundingRect().intersected(QtCore.QRect(QtCore.QPoint(0, 0), size))
+        if bounds.isEmpty():
+            return []
+        t = self.tile
+        out = []
+        for ty in range(bounds.top() // t, bounds.bottom() // t + 1):
+            for tx in range(bounds.left() // t, bounds.right() // t + 1):
+                cell = QtCore.QRect(tx * t, ty * t, t, t).intersected(bounds)
+                if not cell.isEmpty() and region.intersects(cell):
+                    out.append(cell.translated(origin))
+        return out
+
+    def _image(self, slot: int, rect: QtCore.QRect, dpr: float) -> QtGui.QImage:
+        w = int(np.ceil(rect.width() * dpr))
+        h = int(np.ceil(rect.height() * dpr))
+        while len(self._images) <= slot:
+            self._images.append(None)
+        image = self._images[slot]
+        if image is None or image.width() != w or image.height() != h or image.devicePixelRatio() != dpr:
+            image = QtGui.QImage(w, h, QtGui.QImage.Format_ARGB32_Premultiplied)
+            image.setDevicePixelRatio(dpr)
+            self._images[slot] = image
+        return image
+
+    def render(self, tiles, dpr: float, layers) -> list:
+        """并行光栅化全部瓦片并等待完成，返回 [(全局坐标瓦片, QImage)]。"""
+        jobs = [_TileJob(self._image(i, rect, dpr), rect, layers) for i, rect in enumerate(tiles)]
+        for job in jobs:
+            self.pool.start(job)
+        self.pool.waitForDone()
+        return [(job.rect, job.image) for job in jobs]
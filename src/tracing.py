@@ -0,0 +1,125 @@
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+
+class TraceRecorder:
+    """飞行记录器：把最近的耗时区间写入定长环形缓冲，按需导出为 Chrome/Perfetto trace JSON。
+
+    记录时只做一次序号自增与几个数组元素赋值，不加锁、不分配对象；
+    多线程同时写入依赖 GIL 保证序号唯一。缓冲写满后覆盖最旧的记录。
+    关闭时 ``begin`` 直接返回 0，``end`` 立即返回。
+    """
+
+    def __init__(self, capacity: int = 16384, enabled: bool = True):
+        self.enabled = bool(enabled)
+        self._names = []
+        self._name_ids = {}
+        self._thread_names = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        cap = 1
+        while cap < max(16, int(capacity)):
+            cap <<= 1
+        self.capacity = cap
+        self._mask = cap - 1
+        self._start = array('q', bytes(8 * cap))  # 起始时间（纳秒）
+        self._dur = array('q', bytes(8 * cap))    # 持续时间（纳秒），-1 表示瞬时事件
+        self._name = array('H', bytes(2 * cap))
+        self._tid = array('q', bytes(8 * cap))
+        self._seq = itertools.count()
+        self._written = 0
+
+    def configure(self, capacity: int, enabled: bool):
+        self.enabled = bool(enabled)
+        if int(capacity) != self.capacity:
+            self._allocate(capacity)
+
+    def _intern(self, name: str) -> int:
+        idx = self._name_ids.get(name)
+        if idx is None:
+            idx = len(self._names)
+            self._names.append(name)
+            self._name_ids[name] = idx
+        return idx
+
+    def begin(self) -> int:
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def end(self, name: str, start: int):
+        """记录从 start（begin 的返回值）到现在的区间。"""
+        if not start:
+            return
+        self._record(name, start, time.perf_counter_ns() - start)
+
+    def instant(self, name: str):
+        """记录一个瞬时事件（画质档位切换、录制起止等标记）。"""
+        if self.enabled:
+            self._record(name, time.perf_counter_ns(), -1)
+
+    def _record(self, name, start, dur):
+        i = next(self._seq) & self._mask
+        tid = threading.get_ident()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        self._start[i] = start
+        self._dur[i] = dur
+        self._name[i] = self._intern(name)
+        self._tid[i] = tid
+        self._written += 1
+
+    def events(self) -> list:
+        """按时间顺序返回缓冲中的 Chrome trace 事件。"""
+        n = min(self._written, self.capacity)
+        pid = os.getpid()
+        events = []
+        for i in range(n):
+            start = self._start[i]
+            dur = self._dur[i]
+            ev = {'name': self._names[self._name[i]], 'cat': 'mousefx', 'pid': pid,
+                  'tid': self._tid[i], 'ts': start / 1000.0}
+            if dur < 0:
+                ev.update(ph='i', s='t')
+            else:
+                ev.update(ph='X', dur=dur / 1000.0)
+            events.append(ev)
+        events.sort(key=lambda e: e['ts'])
+        for tid, tname in self._thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': tname}})
+        return events
+
+    def dump(self, path: str) -> int:
+        """把缓冲导出为 trace JSON（可用 chrome://tracing 或 ui.perfetto.dev 打开），返回事件数。"""
+        events = self.events()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        logger.info("trace dumped: %s (%d events)", path, len(events))
+        return len(events)
+
+
+# 进程内唯一的记录器，由 App 按配置调整容量与开关
+tracer = TraceRecorder()
+
+
+def traced(name: str):
+    """装饰器：把函数调用记录为一个区间。"""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer._record(name, start, time.perf_counter_ns() - start)
+        return inner
+    return wrap
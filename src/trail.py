@@ -0,0 +1,190 @@
+import math
+import numpy as np
+
+
+class TrailEmitter:
+    """拖拽轨迹发射器：沿插值后的光标路径按固定空间间距放置发射点。
+
+    ``add_point`` 记录新的光标采样并把新增路径段按 ``spacing`` 切分成待发射点；
+    ``take`` 在每帧调用一次，按帧预算取出待发射点。快速拖动不再出现断档，
+    慢速拖动也不会在同一位置反复堆积粒子。
+    """
+
+    # 两次采样间隔超过该时长（秒）视为新的一笔，避免把上一笔的终点连到新起点
+    STROKE_GAP = 0.15
+
+    def __init__(self, spacing: float = 8.0, interpolation: str = 'catmull-rom'):
+        self.spacing = max(1.0, float(spacing))
+        self.interpolation = interpolation
+        self._points = []  # 最近的控制点 [(x, y)]，最多保留 3 个
+        self._last_t = None
+        self._carry = 0.0  # 自上一个发射点以来已走过的路径长度
+        self._pending = []  # 待发射点数组列表，每项形如 (k, 2)
+
+    def configure(self, spacing: float, interpolation: str):
+        self.spacing = max(1.0, float(spacing))
+        self.interpolation = interpolation
+
+    def reset(self):
+        """结束当前笔画（松开左键或长时间无采样）。"""
+        self._points.clear()
+        self._last_t = None
+        self._carry = 0.0
+
+    def add_point(self, x: float, y: float, t: float):
+        if self._last_t is not None and t - self._last_t > self.STROKE_GAP:
+            self.reset()
+        self._last_t = t
+        pts = self._points
+        if pts and abs(pts[-1][0] - x) < 1e-6 and abs(pts[-1][1] - y) < 1e-6:
+            return
+        if not pts:
+            # 笔画起点直接发射一次
+            pts.append((x, y))
+            self._pending.append(np.array([[x, y]], dtype=np.float64))
+            self._carry = 0.0
+            return
+        p1 = pts[-1]
+        p0 = pts[-2] if len(pts) >= 2 else p1
+        p2 = (x, y)
+        # 末端切线按最新一段外推，新采样到达即可发射，无需等待下一个控制点
+        p3 = (2 * x - p1[0], 2 * y - p1[1])
+        self._segment(p0, p1, p2, p3)
+        pts.append(p2)
+        if len(pts) > 3:
+            del pts[0]
+
+    def _segment(self, p0, p1, p2, p3):
+        chord = math.hypot(p2[0] - p1[0], p2[1] - p1[1])
+        m = int(min(64, max(2, math.ceil(chord / max(1.0, self.spacing * 0.5)))))
+        t = np.linspace(0.0, 1.0, m + 1)[:, None]
+        a0, a1, a2, a3 = (np.asarray(p, dtype=np.float64) for p in (p0, p1, p2, p3))
+        if self.interpolation == 'linear':
+            curve = a1 + (a2 - a1) * t
+        else:
+            # Catmull-Rom 样条（Hermite 形式），切线按相邻弦长缩放：
+            # 采样间距不均匀（快慢交替）时不会出现回环或过冲，均匀时与标准形式一致
+            d01 = max(1e-6, math.hypot(p1[0] - p0[0], p1[1] - p0[1]))
+            d12 = max(1e-6, chord)
+            d23 = max(1e-6, math.hypot(p3[0] - p2[0], p3[1] - p2[1]))
+            m1 = (a2 - a0) * (d12 / (d01 + d12)) if d01 > 1e-6 else (a2 - a1)
+            m2 = (a3 - a1) * (d12 / (d12 + d23))
+            t2 = t * t
+            t3 = t2 * t
+            curve = ((2 * t3 - 3 * t2 + 1) * a1 + (t3 - 2 * t2 + t) * m1
+                     + (-2 * t3 + 3 * t2) * a2 + (t3 - t2) * m2)
+        seg = np.hypot(np.diff(curve[:, 0]), np.diff(curve[:, 1]))
+        cum = np.concatenate(([0.0], np.cumsum(seg)))
+        total = cum[-1]
+        dist = np.arange(self.spacing - self._carry, total + 1e-9, self.spacing)
+        if dist.size:
+            xs = np.interp(dist, cum, curve[:, 0])
+            ys = np.interp(dist, cum, curve[:, 1])
+            self._pending.append(np.column_stack((xs, ys)))
+            self._carry = total - dist[-1]
+        else:
+            self._carry += total
+
+    def take(self, budget: int) -> np.ndarray:
+        """取出本帧要发射的点；超出预算时在整段路径上均匀抽样，保持分布均匀。"""
+        if not self._pending:
+            return np.empty((0, 2), dtype=np.float64)
+        pts = np.concatenate(self._pending) if len(self._pending) > 1 else self._pending[0]
+        self._pending = []
+        budget = max(1, int(budget))
+        if len(pts) > budget:
+            idx = np.linspace(0, len(pts) - 1, budget).round().astype(np.intp)
+            pts = pts[idx]
+        return pts
+
+
+class RibbonTrail:
+    """丝带轨迹：拖拽采样点存放在定长环形缓冲中，每点带年龄。
+
+    绘制时把同一笔画的连续点展开成一条由新到旧逐渐变细、变透明的多边形，
+    每笔只需一次填充，开销与拖拽长度无关。
+    """
+
+    def __init__(self, capacity: int = 512):
+        self.capacity = int(capacity)
+        self.xy = np.zeros((self.capacity, 2), dtype=np.float32)
+        self.age = np.zeros(self.capacity, dtype=np.float32)
+        self.stroke = np.zeros(self.capacity, dtype=np.int32)
+        self._start = 0  # 最旧点的位置
+        self.count = 0
+        self._stroke_id = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self._start = 0
+        self.count = 0
+
+    def break_stroke(self):
+        """开始新的一笔，新旧笔画之间不相连。"""
+        self._stroke_id += 1
+
+    def push(self, pts: np.ndarray):
+        """追加一批点（按时间顺序），写满时覆盖最旧的点。"""
+        k = len(pts)
+        if k == 0:
+            return
+        cap = self.capacity
+        if k > cap:
+            pts = pts[-cap:]
+            k = cap
+        end = (self._start + self.count) % cap
+        idx = (end + np.arange(k)) % cap
+        self.xy[idx] = pts
+        self.age[idx] = 0.0
+        self.stroke[idx] = self._stroke_id
+        overflow = max(0, self.count + k - cap)
+        self._start = (self._start + overflow) % cap
+        self.count = min(cap, self.count + k)
+
+    def update(self, dt: float, life: float):
+        """推进年龄并丢弃超过寿命的最旧点（点按时间顺序存放，只需移动起点）。"""
+        if self.count == 0:
+            return
+        order = self._order()
+        self.age[order] += dt
+        expired = int(np.searchsorted(-self.age[order], -life, side='right'))
+        if expired:
+            self._start = (self._start + expired) % self.capacity
+            self.count -= expired
+
+    def _order(self) -> np.ndarray:
+        return (self._start + np.arange(self.count)) % self.capacity
+
+    def bounds(self, half_width: float):
+        """所有点的包围盒数组 (x0, y0, x1, y1)。"""
+        xy = self.xy[self._order()]
+        return (xy[:, 0] - half_width, xy[:, 1] - half_width,
+                xy[:, 0] + half_width, xy[:, 1] + half_width)
+
+    def polygons(self, width: float, life: float):
+        """按笔画生成锥形轮廓，返回 [(轮廓点数组 (2k, 2), 笔画点数组 (k, 2))]。"""
+        if self.count < 2:
+            return []
+        order = self._order()
+        xy = self.xy[order].astype(np.float64)
+        age = self.age[order]
+        stroke = self.stroke[order]
+        cuts = np.flatnonzero(np.diff(stroke)) + 1
+        out = []
+        for seg in np.split(np.arange(self.count), cuts):
+            if seg.size < 2:
+                continue
+            p = xy[seg]
+            # 切线用中心差分，端点用单侧差分
+            tangent = np.gradient(p, axis=0)
+            norm = np.hypot(tangent[:, 0], tangent[:, 1])
+            norm[norm < 1e-6] = 1.0
+            normal = np.column_stack((-tangent[:, 1], tangent[:, 0])) / norm[:, None]
+            # 越旧越细：最新点为全宽，到寿命时收为 0
+            half = 0.5 * width * np.clip(1.0 - age[seg] / max(1e-6, life), 0.0, 1.0)
+            left = p + normal * half[:, None]
+            right = p - normal * half[:, None]
+            out.append((np.concatenate((left, right[::-1])), p))
+        return out
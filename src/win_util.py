@@ -3,8 +3,29 @@ import subprocess
 from ctypes import wintypes
 import logging
 
-user32 = ctypes.windll.user32
-kernel32 = ctypes.windll.kernel32
+
+class _MissingDll:
+    """非 Windows 平台上的 DLL 占位：任意函数调用都返回 0。
+
+    使本模块在 Linux（如无头基准测试）下也能导入，调用 Win32 API 时退化为空操作。
+    """
+
+    def __getattr__(self, name):
+        def _unavailable(*args, **kwargs):
+            return 0
+        _unavailable.__name__ = name
+        return _unavailable
+
+
+def _load_dll(name: str):
+    try:
+        return getattr(ctypes.windll, name)
+    except (AttributeError, OSError):
+        return _MissingDll()
+
+
+user32 = _load_dll('user32')
+kernel32 = _load_dll('kernel32')
 
 HWND = wintypes.HWND
 LPARAM = wintypes.LPARAM
@@ -25,7 +46,7 @@ import ctypes
 from ctypes import wintypes
 import logging
 
-user32 = ctypes.windll.user32
+user32 = _load_dll('user32')
 
 HWND = wintypes.HWND
 LONG = wintypes.LONG